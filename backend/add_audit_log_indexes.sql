@@ -0,0 +1,5 @@
+-- Indexes backing /api/logs/search keyset pagination and filters
+CREATE INDEX ix_audit_logs_created_id ON audit_logs (created_at, id);
+CREATE INDEX ix_audit_logs_action_created ON audit_logs (action, created_at);
+CREATE INDEX ix_audit_logs_resource_created ON audit_logs (resource_type, created_at);
+CREATE INDEX ix_audit_logs_email_created ON audit_logs (user_email, created_at);
@@ -0,0 +1,22 @@
+-- Canonical colleges and the normalized spellings that map to them
+CREATE TABLE IF NOT EXISTS colleges (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255),
+    normalized_name VARCHAR(255),
+    created_at DATETIME,
+    UNIQUE KEY ix_colleges_normalized_name (normalized_name)
+);
+
+CREATE TABLE IF NOT EXISTS college_aliases (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    normalized_name VARCHAR(255),
+    college_id INT,
+    created_at DATETIME,
+    UNIQUE KEY ix_college_aliases_normalized_name (normalized_name),
+    KEY ix_college_aliases_college_id (college_id)
+);
+
+-- Filled in by the clustering job (python colleges.py --apply)
+ALTER TABLE users ADD COLUMN college_id INT NULL;
+CREATE INDEX ix_users_college_id ON users (college_id);
+CREATE INDEX ix_users_event_college ON users (eventId, college_id);
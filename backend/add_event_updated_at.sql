@@ -0,0 +1,3 @@
+-- Lets ETags of user listings and event analytics change when an event is renamed
+ALTER TABLE events
+ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
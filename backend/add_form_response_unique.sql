@@ -0,0 +1,31 @@
+-- Enforce one response per user per form and remember the Idempotency-Key of the submitting request
+--
+-- WARNING: the constraint cannot be added while duplicates exist, so this script DELETES every
+-- response except the earliest one for each (form_id, user_email). The deleted rows are copied to
+-- form_responses_duplicates first; check that table before dropping it.
+--
+-- Dry run: see what would be removed without changing anything
+--   SELECT r1.* FROM form_responses r1
+--   JOIN form_responses r2
+--     ON r1.form_id = r2.form_id
+--    AND r1.user_email = r2.user_email
+--    AND r1.id > r2.id;
+
+CREATE TABLE IF NOT EXISTS form_responses_duplicates LIKE form_responses;
+
+INSERT IGNORE INTO form_responses_duplicates
+SELECT DISTINCT r1.* FROM form_responses r1
+JOIN form_responses r2
+  ON r1.form_id = r2.form_id
+ AND r1.user_email = r2.user_email
+ AND r1.id > r2.id;
+
+DELETE r1 FROM form_responses r1
+JOIN form_responses r2
+  ON r1.form_id = r2.form_id
+ AND r1.user_email = r2.user_email
+ AND r1.id > r2.id;
+
+ALTER TABLE form_responses
+ADD COLUMN idempotency_key VARCHAR(64) NULL,
+ADD CONSTRAINT uq_form_responses_form_user UNIQUE (form_id, user_email);
@@ -0,0 +1,12 @@
+-- Daily registration counts served to the dashboard charts.
+-- Fill it for existing users with: python registration_rollup.py --rebuild
+CREATE TABLE IF NOT EXISTS registration_daily_rollup (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    event_id INT NOT NULL DEFAULT 0,
+    day DATE NOT NULL,
+    dimension VARCHAR(20) NOT NULL,
+    value VARCHAR(255) NOT NULL DEFAULT '',
+    registrations INT NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_registration_rollup_key (event_id, day, dimension, value),
+    KEY ix_registration_rollup_day (dimension, day)
+);
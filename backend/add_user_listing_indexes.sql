@@ -0,0 +1,3 @@
+-- Indexes backing keyset pagination of /api/users and /api/students
+CREATE INDEX ix_users_created_id ON users (created_at, id);
+CREATE INDEX ix_users_event_id ON users (eventId, id);
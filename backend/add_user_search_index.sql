@@ -0,0 +1,2 @@
+-- Lets the in-process user search index pick up edited users without a full scan
+CREATE INDEX ix_users_updated_at ON users (updated_at);
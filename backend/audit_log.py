@@ -0,0 +1,108 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, AuditLog
+from app_logging import get_logger
+
+logger = get_logger("audit_log")
+
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000"))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "500"))
+AUDIT_LOG_FLUSH_SECONDS = float(os.getenv("AUDIT_LOG_FLUSH_SECONDS", "2"))
+
+class AuditLogWriter:
+    """Queues audit events in memory and bulk-inserts them from a background task"""
+
+    def __init__(self, maxsize: int = AUDIT_LOG_QUEUE_SIZE, batch_size: int = AUDIT_LOG_BATCH_SIZE):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self.failed_batches = 0
+        self._queue = deque()
+        self._lock = threading.Lock()
+
+    def log(self, user_email: str, user_role: str, action: str, resource_type: str, resource_id=None, details: str = None, ip_address: str = None) -> bool:
+        """Queue an event; returns False if the queue is full and the event was dropped"""
+        event = {
+            "user_email": user_email,
+            "user_name": user_email,
+            "user_role": user_role,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": str(resource_id) if resource_id else None,
+            "details": details,
+            "ip_address": ip_address,
+            "created_at": datetime.now()
+        }
+        with self._lock:
+            if len(self._queue) >= self.maxsize:
+                self.dropped += 1
+                return False
+            self._queue.append(event)
+        return True
+
+    def _take_batch(self) -> list:
+        with self._lock:
+            return [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+    def flush(self, db: Session) -> int:
+        """Write every queued event in batches; returns the number of rows inserted"""
+        inserted = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return inserted
+            try:
+                db.bulk_insert_mappings(AuditLog, batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self.failed_batches += 1
+                # Requeue at the front so order is kept; anything past the bound is dropped
+                with self._lock:
+                    room = self.maxsize - len(self._queue)
+                    kept = batch[:max(room, 0)]
+                    self.dropped += len(batch) - len(kept)
+                    self._queue.extendleft(reversed(kept))
+                raise
+            inserted += len(batch)
+            with self._lock:
+                self.written += len(batch)
+
+    def flush_now(self) -> None:
+        db = SessionLocal()
+        try:
+            self.flush(db)
+        except Exception:
+            logger.exception("Error writing audit logs")
+        finally:
+            db.close()
+
+    async def run_periodic_flush(self, interval: float = AUDIT_LOG_FLUSH_SECONDS) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if self._queue:
+                await loop.run_in_executor(None, self.flush_now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "max_queue_size": self.maxsize,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed_batches": self.failed_batches
+            }
+
+audit_log_writer = AuditLogWriter()
+
+def log_audit_action(user_email: str, user_role: str, action: str, resource_type: str, resource_id=None, details: str = None, ip_address: str = None):
+    """Record an audited action; the row is written asynchronously"""
+    audit_log_writer.log(user_email, user_role, action, resource_type, resource_id, details, ip_address)
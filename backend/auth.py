@@ -4,14 +4,20 @@ from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
 
+from database import get_db, Admin
+from ttl_cache import TTLCache
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+# Role changes made on another worker show up after at most this many seconds
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
 
 
 security = HTTPBearer()
@@ -48,4 +54,33 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+
+class Principal:
+    """Authenticated caller; ``role`` is None when the token subject has no admin account"""
+
+    def __init__(self, email: str, admin_id: Optional[int] = None, role: Optional[str] = None):
+        self.email = email
+        self.admin_id = admin_id
+        self.role = role
+
+    @property
+    def is_admin_account(self) -> bool:
+        return self.admin_id is not None
+
+# Principals keyed by email, including negative entries for tokens without an admin account
+_principals = TTLCache(maxsize=1024, ttl=PRINCIPAL_CACHE_TTL)
+
+def get_current_principal(current_user: str = Depends(verify_token), db: Session = Depends(get_db)) -> Principal:
+    principal = _principals.get(current_user)
+    if principal is None:
+        admin = db.query(Admin.id, Admin.role).filter(Admin.email == current_user).first()
+        if admin:
+            principal = Principal(current_user, admin.id, admin.role)
+        else:
+            principal = Principal(current_user)
+        _principals.set(current_user, principal)
+    return principal
+
+def invalidate_principal(email: str) -> None:
+    _principals.pop(email)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Hot Path Micro-benchmarks
+Times the CPU-bound functions on request paths (form hashes, quiz scoring, Excel
+import, QR codes, email personalization, event date parsing, response JSON, and
+rendering a 1000-user /api/users page the old stdlib way and with orjson) and
+compares them with stored baselines. Exits with status 1 if any benchmark is
+more than --threshold percent slower than its baseline.
+
+Timings are stored relative to a fixed pure-Python calibration loop, so a
+baseline recorded on one machine stays meaningful on another.
+
+    python bench_hot_paths.py --save          # record bench_baseline.json
+    python bench_hot_paths.py                 # compare with it
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# main creates its engine on import; the benchmarks never touch it
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import io
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+BENCH_BASELINE_FILE = os.getenv("BENCH_BASELINE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json"))
+BENCH_REGRESSION_THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "30"))
+
+def _calibration() -> Callable[[], object]:
+    values = list(range(1000))
+    return lambda: sum(value * value for value in values if value % 3)
+
+def _form_hash() -> Callable[[], object]:
+    from form_utils import generate_form_hash
+    form = SimpleNamespace(id=4821, created_at=datetime(2024, 3, 14, 10, 30, 5, 123456), title="AI Fundamentals Quiz - Day 2")
+    return lambda: generate_form_hash(form)
+
+def _quiz_scoring() -> Callable[[], object]:
+    from form_scoring import AnswerKey
+    rng = random.Random(1)
+    questions = [SimpleNamespace(id=100 + i, question_type="single_choice", points=1 + i % 3, correct_answer=f"Option {'ABCD'[i % 4]}")
+                 for i in range(20)]
+    answer_key = AnswerKey(1, questions)
+    responses = {str(q.id): f"Option {rng.choice('ABCD')}" for q in questions}
+    return lambda: answer_key.score(responses)
+
+def _excel_import() -> Callable[[], object]:
+    import pandas as pd
+    from form_utils import parse_excel_to_questions
+    rows = [{"Question": f"Question {i} about retrieval augmented generation?", "Type": "single_choice",
+             "Options": "Option A, Option B, Option C, Option D", "Correct_Answer": "Option B", "Points": 2, "Required": "yes"}
+            for i in range(50)]
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    content = buffer.getvalue()
+    return lambda: parse_excel_to_questions(content, "quiz")
+
+def _qr_code() -> Callable[[], object]:
+    from form_utils import generate_qr_code_with_branding
+    return lambda: generate_qr_code_with_branding(
+        "https://events.kambaa.ai/form/3f9a1c2b7d4e", "AI Fundamentals Quiz", event_title="AI Workshop 2024",
+        description="Scan the code to answer ten quick questions about today's sessions and see your score instantly.")
+
+def _email_personalization() -> Callable[[], object]:
+    from main import personalize_template
+    template = ("<p>Hi {{name}},</p><p>Thanks for registering with {{email}}. We will call {{phone}} if anything changes.</p>"
+                "<p>Students from {{college}} get priority seating on Day 1.</p>" + "<p>Agenda and venue details follow.</p>" * 20)
+    user = SimpleNamespace(name=None, first_name="Priya", last_name="Krishnan", email="priya.krishnan42@example.com",
+                           phone_number="9876543210", college_name="PSG College of Technology")
+    return lambda: personalize_template(template, user)
+
+def _event_dates() -> Callable[[], object]:
+    from main import format_event_date
+    dates = ["2024-03-14 09:30:00", "2024-03-14 09:30", "2024-03-14", None, "14 March 2024"] * 20
+    return lambda: [format_event_date(value) for value in dates]
+
+def _response_json() -> Callable[[], object]:
+    answers = {str(100 + i): f"Option {'ABCD'[i % 4]}" for i in range(10)}
+    answers["200"] = "The hands-on session was the most useful part of the day. " * 4
+    payload = json.dumps(answers)
+    return lambda: json.loads(payload)
+
+def _users_page(created_at) -> dict:
+    users = [{"id": str(i), "name": f"Student {i}", "email": f"student{i}@example.com", "college": "PSG College of Technology",
+              "phone": "9876543210", "event_id": 3, "event": "AI Workshop", "registered_at": created_at(i), "created_date": created_at(i)}
+             for i in range(1000)]
+    return {"users": users, "next_cursor": "WyJpZCIsIDEwMDAsIDEwMDBd", "total_count": 50000, "total_count_estimated": False}
+
+def _users_page_stdlib() -> Callable[[], object]:
+    """The /api/users page as it was rendered before: str() dates, jsonable_encoder, then json.dumps"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    registered = datetime(2024, 3, 14, 9, 30, 5)
+    response = JSONResponse(None)
+    return lambda: response.render(jsonable_encoder(_users_page(lambda i: str(registered))))
+
+def _users_page_orjson() -> Callable[[], object]:
+    from json_response import FastJSONResponse
+    registered = datetime(2024, 3, 14, 9, 30, 5)
+    response = FastJSONResponse(None)
+    return lambda: response.render(_users_page(lambda i: registered))
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {
+    "calibration": _calibration,
+    "form_hash": _form_hash,
+    "quiz_scoring": _quiz_scoring,
+    "excel_import": _excel_import,
+    "qr_code": _qr_code,
+    "email_personalization": _email_personalization,
+    "event_dates": _event_dates,
+    "response_json": _response_json,
+    "users_page_stdlib": _users_page_stdlib,
+    "users_page_orjson": _users_page_orjson,
+}
+
+def time_function(function: Callable[[], object], rounds: int = 7, min_round_seconds: float = 0.05) -> float:
+    """Median seconds per call over several rounds, each long enough to swamp timer overhead"""
+    function()  # Warm caches and lazy imports
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_seconds:
+            break
+        iterations *= 2 if elapsed == 0 else max(2, int(min_round_seconds / elapsed * 1.2))
+    timings = [elapsed / iterations]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        timings.append((time.perf_counter() - started) / iterations)
+    return statistics.median(timings)
+
+def run_benchmarks(names: Optional[List[str]] = None, rounds: int = 7) -> dict:
+    """{name: {"us": microseconds per call, "relative": time / calibration time}}, or {"error": ...}
+    for a benchmark that cannot run here (such as a missing optional library)"""
+    selected = ["calibration"] + [name for name in (names or BENCHMARKS) if name != "calibration"]
+    results = {}
+    calibration = None
+    for name in selected:
+        try:
+            seconds = time_function(BENCHMARKS[name](), rounds)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            continue
+        calibration = calibration or seconds
+        results[name] = {"us": round(seconds * 1e6, 3), "relative": round(seconds / calibration, 4)}
+    return results
+
+def compare_results(results: dict, baseline: dict, threshold: float = BENCH_REGRESSION_THRESHOLD) -> List[dict]:
+    """Benchmarks whose relative time grew by more than threshold percent"""
+    regressions = []
+    for name, result in results.items():
+        if name == "calibration" or "error" in result or "relative" not in baseline.get(name, {}):
+            continue
+        change = (result["relative"] / baseline[name]["relative"] - 1) * 100
+        if change > threshold:
+            regressions.append({"name": name, "change_pct": round(change, 1),
+                                "baseline": baseline[name]["relative"], "current": result["relative"]})
+    return regressions
+
+def load_baseline(path: str = BENCH_BASELINE_FILE) -> dict:
+    with open(path) as f:
+        return json.load(f)["benchmarks"]
+
+def save_baseline(results: dict, path: str = BENCH_BASELINE_FILE) -> None:
+    with open(path, "w") as f:
+        json.dump({"python": sys.version.split()[0], "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                   "benchmarks": results}, f, indent=2)
+        f.write("\n")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the CPU-bound hot functions against stored baselines")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--rounds", type=int, default=7, help="Timing rounds per benchmark")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--baseline", default=BENCH_BASELINE_FILE, help="Baseline file")
+    parser.add_argument("--threshold", type=float, default=BENCH_REGRESSION_THRESHOLD, help="Allowed slowdown in percent")
+
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    results = run_benchmarks(args.names, args.rounds)
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        baseline = load_baseline(args.baseline)
+
+    print(f"{'benchmark':<24}{'us/call':>12}{'relative':>12}{'baseline':>12}{'change':>10}")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<24}{'skipped':>12}  {result['error'][:80]}")
+            continue
+        base = baseline.get(name, {}).get("relative")
+        change = f"{(result['relative'] / base - 1) * 100:+.1f}%" if base and name != "calibration" else ""
+        print(f"{name:<24}{result['us']:>12.2f}{result['relative']:>12.3f}{base or '':>12}{change:>10}")
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        sys.exit(0)
+    regressions = compare_results(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: {regression['change_pct']:+.1f}% (threshold {args.threshold:.0f}%)")
+    sys.exit(1 if regressions else 0)
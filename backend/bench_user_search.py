@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+User Search Benchmark
+Builds the in-process search index over synthetic users and reports query latency.
+Exits with status 1 if the p95 latency is above the target.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+import statistics
+import time
+
+from user_search import UserSearchIndex
+
+FIRST_NAMES = ["Arun", "Priya", "Karthik", "Divya", "Suresh", "Lakshmi", "Vignesh", "Deepa", "Rahul", "Anitha",
+               "Mohan", "Keerthana", "Praveen", "Sowmya", "Naveen", "Harini", "Gokul", "Meena", "Ajay", "Nithya"]
+LAST_NAMES = ["Kumar", "Raj", "Sharma", "Subramanian", "Krishnan", "Natarajan", "Iyer", "Pillai", "Reddy", "Menon"]
+COLLEGES = ["PSG College of Technology", "Kumaraguru College of Technology", "Anna University", "Amrita Vishwa Vidyapeetham",
+            "Sri Krishna College of Engineering", "Coimbatore Institute of Technology", "Karunya University",
+            "SNS College of Technology", "Bannari Amman Institute of Technology", "Sri Ramakrishna Engineering College"]
+
+def build_index(user_count: int, seed: int = 42) -> UserSearchIndex:
+    rng = random.Random(seed)
+    index = UserSearchIndex()
+    for user_id in range(1, user_count + 1):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        index.add(user_id, f"{first} {last}", f"{first.lower()}.{last.lower()}{user_id}@example.com", rng.choice(COLLEGES))
+    return index
+
+def run_benchmark(user_count: int = 200_000, rounds: int = 20, target_ms: float = 20.0) -> bool:
+    started = time.perf_counter()
+    index = build_index(user_count)
+    print(f"Indexed {len(index)} users in {time.perf_counter() - started:.1f}s")
+
+    queries = ["a", "pr", "kar", "priya", "kumar", "psg", "technology", "divya.k", "@example", "12345",
+               "suresh raj", "amrita", "nithya menon", "college of", "199999"]
+    timings = []
+    for query in queries:
+        samples = []
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            index.search_ids(query, limit=20)
+            samples.append((time.perf_counter() - t0) * 1000)
+        timings.extend(samples)
+        print(f"  {query!r:16} median {statistics.median(samples):6.2f} ms  max {max(samples):6.2f} ms")
+
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"p50 {p50:.2f} ms, p95 {p95:.2f} ms (target {target_ms} ms)")
+    return p95 <= target_ms
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the in-process user search index")
+    parser.add_argument("--users", type=int, default=200_000, help="Number of synthetic users")
+    parser.add_argument("--rounds", type=int, default=20, help="Repetitions per query")
+    parser.add_argument("--target-ms", type=float, default=20.0, help="p95 latency target")
+
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.users, args.rounds, args.target_ms) else 1)
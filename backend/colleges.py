@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+College De-duplication
+Clusters the free-text college names users enter ("PSG Tech", "P.S.G. College of
+Technology", ...) into canonical colleges and fills users.college_id so college
+statistics can group on an indexed integer. Runs from the command line or
+periodically inside the API process.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, User, College, CollegeAlias
+from ttl_cache import TTLCache
+
+# Minimum similarity for a new spelling to join an existing college
+COLLEGE_MATCH_THRESHOLD = float(os.getenv("COLLEGE_MATCH_THRESHOLD", "0.88"))
+# 0 disables the in-process job; run this script from cron instead
+COLLEGE_CLUSTER_INTERVAL_MINUTES = int(os.getenv("COLLEGE_CLUSTER_INTERVAL_MINUTES", "60"))
+COLLEGE_UPDATE_BATCH_SIZE = 500
+
+ABBREVIATIONS = {
+    "tech": "technology", "technological": "technology",
+    "engg": "engineering", "eng": "engineering",
+    "univ": "university", "uni": "university",
+    "inst": "institute", "instt": "institute",
+    "coll": "college", "clg": "college",
+    "govt": "government", "sci": "science", "sciences": "science",
+    "mgmt": "management", "intl": "international", "natl": "national",
+}
+STOPWORDS = {"of", "the", "and", "at", "in", "for"}
+# Words that say what kind of institution it is rather than which one
+GENERIC_TOKENS = {
+    "college", "university", "institute", "technology", "engineering", "science", "arts",
+    "government", "school", "management", "national", "international", "academy", "polytechnic",
+}
+# Words that may be dropped from a name without changing the institution
+FILLER_TOKENS = {"college", "university", "institute", "campus"}
+
+def normalize_college_name(name: Optional[str]) -> str:
+    """Lowercase, strip punctuation, expand common abbreviations and join dotted initials"""
+    if not name:
+        return ""
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower().replace("&", " and ")).split()
+    tokens = []
+    initials = ""
+    for word in words:
+        # "p s g" (from "P.S.G.") becomes "psg"
+        if len(word) == 1 and word.isalpha():
+            initials += word
+            continue
+        if initials:
+            tokens.append(initials)
+            initials = ""
+        word = ABBREVIATIONS.get(word, word)
+        if word not in STOPWORDS:
+            tokens.append(word)
+    if initials:
+        tokens.append(initials)
+    return " ".join(tokens)[:255]
+
+def college_similarity(a: str, b: str) -> float:
+    """Similarity of two normalized names in [0, 1]"""
+    if a == b:
+        return 1.0
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    # Same distinctive words, differing only by filler: "psg technology" / "psg college technology"
+    if (tokens_a & tokens_b) - GENERIC_TOKENS and (tokens_a ^ tokens_b) <= FILLER_TOKENS:
+        return 0.95
+    # Otherwise rely on character similarity, which catches typos
+    return SequenceMatcher(None, a, b).ratio()
+
+def _blocking_keys(key: str) -> set:
+    distinctive = [token for token in key.split() if token not in GENERIC_TOKENS]
+    if not distinctive:
+        return {key}
+    # Whole tokens, plus prefixes so a typo late in a word still lands in the same block
+    return set(distinctive) | {token[:3] for token in distinctive}
+
+class CollegeMatcher:
+    """Finds the most similar known college, only comparing names that share a blocking key"""
+
+    def __init__(self, threshold: float = COLLEGE_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._keys: Dict[int, str] = {}
+        self._blocks = defaultdict(set)
+
+    def add(self, college_id: int, key: str) -> None:
+        self._keys[college_id] = key
+        for block in _blocking_keys(key):
+            self._blocks[block].add(college_id)
+
+    def match(self, key: str) -> Optional[int]:
+        candidates = set().union(*(self._blocks.get(block, ()) for block in _blocking_keys(key)))
+        best_id, best_score = None, self.threshold
+        for college_id in candidates:
+            score = college_similarity(key, self._keys[college_id])
+            if score >= best_score:
+                best_id, best_score = college_id, score
+        return best_id
+
+def cluster_colleges(db: Session, threshold: float = COLLEGE_MATCH_THRESHOLD, dry_run: bool = False) -> dict:
+    """Map every distinct users.college_name to a college and backfill users.college_id.
+
+    Spellings already in college_aliases keep their mapping, so corrections made
+    in the table survive later runs. New spellings join the most similar college
+    or start a new one named after their most common raw form.
+    """
+    aliases = {alias.normalized_name: alias.college_id for alias in db.query(CollegeAlias).all()}
+    matcher = CollegeMatcher(threshold)
+    names = {}
+    for college in db.query(College).all():
+        matcher.add(college.id, college.normalized_name)
+        names[college.id] = college.name
+
+    variants = db.query(User.college_name, func.count(User.id).label("count")).filter(
+        User.college_name.isnot(None),
+        User.college_name != ''
+    ).group_by(User.college_name).order_by(func.count(User.id).desc()).all()
+
+    # Most common spellings first, so they become the canonical names
+    raw_by_key = defaultdict(list)
+    for variant in variants:
+        key = normalize_college_name(variant.college_name)
+        if key:
+            raw_by_key[key].append(variant.college_name)
+
+    colleges_created = aliases_created = 0
+    for key, raw_names in raw_by_key.items():
+        if key in aliases:
+            continue
+        college_id = matcher.match(key)
+        if college_id is None:
+            college = College(name=raw_names[0].strip()[:255], normalized_name=key)
+            db.add(college)
+            db.flush()
+            college_id = college.id
+            matcher.add(college_id, key)
+            names[college_id] = college.name
+            colleges_created += 1
+        db.add(CollegeAlias(normalized_name=key, college_id=college_id))
+        aliases[key] = college_id
+        aliases_created += 1
+
+    raw_by_college = defaultdict(list)
+    for key, raw_names in raw_by_key.items():
+        raw_by_college[aliases[key]].extend(raw_names)
+
+    users_updated = 0
+    for college_id, raw_names in raw_by_college.items():
+        for i in range(0, len(raw_names), COLLEGE_UPDATE_BATCH_SIZE):
+            users_updated += db.query(User).filter(
+                User.college_name.in_(raw_names[i:i + COLLEGE_UPDATE_BATCH_SIZE]),
+                or_(User.college_id.is_(None), User.college_id != college_id)
+            # Keep updated_at: this is not an edit by the user
+            ).update({User.college_id: college_id, User.updated_at: User.updated_at}, synchronize_session=False)
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        _college_ids.clear()
+
+    return {
+        "variants": len(variants),
+        "colleges_created": colleges_created,
+        "aliases_created": aliases_created,
+        "users_updated": users_updated,
+        "clusters": {names[college_id]: raw_names for college_id, raw_names in raw_by_college.items() if len(raw_names) > 1}
+    }
+
+_college_ids = TTLCache(maxsize=4096, ttl=300)
+
+def resolve_college_id(db: Session, college_name: Optional[str]) -> Optional[int]:
+    """College for a spelling that has been seen before; new spellings wait for the next clustering run"""
+    key = normalize_college_name(college_name)
+    if not key:
+        return None
+    college_id = _college_ids.get(key)
+    if college_id is None:
+        alias = db.query(CollegeAlias.college_id).filter(CollegeAlias.normalized_name == key).first()
+        if not alias:
+            return None
+        college_id = alias.college_id
+        _college_ids.set(key, college_id)
+    return college_id
+
+def college_filter(db: Session, college: str):
+    """Filter criterion for a college name from the UI, matching every spelling of that college"""
+    college_id = resolve_college_id(db, college)
+    if college_id is None:
+        return User.college_name == college
+    return User.college_id == college_id
+
+def run_college_clustering() -> None:
+    db = SessionLocal()
+    try:
+        result = cluster_colleges(db)
+        if result["colleges_created"] or result["users_updated"]:
+            print(f"College clustering: {result['colleges_created']} new colleges, {result['users_updated']} users updated")
+    except Exception as e:
+        db.rollback()
+        print(f"Error clustering colleges: {e}")
+    finally:
+        db.close()
+
+async def run_periodic_college_clustering(interval_minutes: int = COLLEGE_CLUSTER_INTERVAL_MINUTES) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await loop.run_in_executor(None, run_college_clustering)
+        await asyncio.sleep(interval_minutes * 60)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cluster college name variants and fill users.college_id")
+    parser.add_argument("--apply", action="store_true", help="Write colleges, aliases and users.college_id (default is a dry run)")
+    parser.add_argument("--threshold", type=float, default=COLLEGE_MATCH_THRESHOLD, help="Minimum similarity to merge spellings")
+
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        result = cluster_colleges(db, threshold=args.threshold, dry_run=not args.apply)
+        for name, raw_names in sorted(result["clusters"].items()):
+            print(f"{name}:")
+            for raw_name in raw_names:
+                print(f"    {raw_name}")
+        print(f"{result['variants']} spellings, {result['colleges_created']} new colleges, "
+              f"{result['aliases_created']} new aliases, {result['users_updated']} users to update")
+        if not args.apply:
+            print("Dry run; pass --apply to write the changes")
+    finally:
+        db.close()
@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# anyio is a pytest plugin, so pytest rewrites its modules on import; doing that on
+# the first TestClient's portal thread trips a CPython 3.11 AST bug ("recursion depth
+# mismatch"), so load the backend here on the main thread
+import anyio._backends._asyncio
+import pytest
+from sqlalchemy import create_engine
+
+from database import Base, SessionLocal, Admin, engine as database_engine
+from query_budget import assert_query_budget
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(max_queries=5): ...`` fails the test if the block runs more
+    statements than that, or repeats one statement shape (a likely N+1)"""
+    return assert_query_budget
+
+def _reset_caches():
+    """Forget per-process caches keyed by ids, which every throwaway database reuses"""
+    from form_cache import form_hash_index, public_form_cache
+    from form_scoring import _answer_keys
+    from forms_routes import submission_results
+    from submission_index import submission_index
+    from colleges import _college_ids
+    for cache in (public_form_cache, _answer_keys, submission_results, submission_index._forms, _college_ids):
+        cache.clear()
+    form_hash_index.clear()
+
+@pytest.fixture
+def api_client(tmp_path):
+    """(TestClient for main.app signed in as an admin, session) backed by a throwaway SQLite database"""
+    from fastapi.testclient import TestClient
+    import payment_model, chat_models  # Register their tables on Base
+    from auth import create_access_token
+    from main import app
+    
+    _reset_caches()
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    Base.metadata.create_all(engine)
+    # Every module shares this sessionmaker, so rebinding it moves the whole app to SQLite
+    SessionLocal.configure(bind=engine)
+    db = SessionLocal()
+    db.add(Admin(email="admin@example.com", role="admin", hashed_password="-"))
+    db.commit()
+    
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': 'admin@example.com'})}"
+    try:
+        yield client, db
+    finally:
+        db.close()
+        SessionLocal.configure(bind=database_engine)
+        engine.dispose()
+
+@pytest.fixture
+def seeded_db(tmp_path):
+    """(engine, summary) of a throwaway SQLite database filled by seed_data with two small events"""
+    import payment_model, chat_models  # Register their tables on Base
+    from seed_data import seed_database
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'seeded.db'}")
+    summary = seed_database(engine, events=2, users_per_event=200, batch_size=150)
+    try:
+        yield engine, summary
+    finally:
+        engine.dispose()
@@ -0,0 +1,199 @@
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import User, Event, College, Form, FormResponse
+from payment_model import Payment
+from registration_rollup import registration_total, daily_registrations
+from ttl_cache import TTLCache
+from app_logging import get_logger
+
+logger = get_logger("dashboard")
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+class DashboardContext:
+    """Intermediate results shared by the widgets computed in one request"""
+
+    def __init__(self, db: Session, event_id: Optional[int] = None):
+        self.db = db
+        self.event_id = event_id
+        self.now = datetime.now()
+        self._daily = None
+
+    @property
+    def daily(self) -> dict:
+        """Registrations per day over the 9-month chart window, which covers every shorter window"""
+        if self._daily is None:
+            since = (self.now - timedelta(days=270)).date().replace(day=1)
+            self._daily = daily_registrations(self.db, self.event_id, since=since)
+        return self._daily
+
+    def registrations_since(self, day) -> int:
+        return sum(count for registered_on, count in self.daily.items() if registered_on >= day)
+
+def stats_widget(ctx: DashboardContext) -> dict:
+    today = ctx.now.date()
+    week_start = today - timedelta(days=today.weekday())
+    return {
+        "total_registrations": registration_total(ctx.db, ctx.event_id),
+        "today_registrations": ctx.registrations_since(today),
+        "week_registrations": ctx.registrations_since(week_start),
+        "total_events": ctx.db.query(func.count(Event.id)).scalar() or 0
+    }
+
+def registration_chart_widget(ctx: DashboardContext) -> dict:
+    """Registrations per day for the last 7 days"""
+    seven_days_ago = ctx.now.date() - timedelta(days=6)
+    days = [seven_days_ago + timedelta(days=i) for i in range(7)]
+    return {
+        "labels": [day.strftime('%a') for day in days],  # Mon, Tue, etc.
+        "data": [ctx.daily.get(day, 0) for day in days]
+    }
+
+def monthly_registrations_widget(ctx: DashboardContext) -> dict:
+    """Registrations per month for the last 9 months"""
+    monthly = {}
+    for day, count in ctx.daily.items():
+        monthly[(day.year, day.month)] = monthly.get((day.year, day.month), 0) + count
+
+    labels = []
+    data = []
+    for i in range(9):
+        target_date = ctx.now - timedelta(days=30 * (8 - i))
+        labels.append(MONTH_NAMES[target_date.month - 1])
+        data.append(monthly.get((target_date.year, target_date.month), 0))
+    return {"labels": labels, "data": data}
+
+def event_payments_widget(ctx: DashboardContext) -> dict:
+    """Completed payments per event (not filtered by event_id)"""
+    try:
+        event_payments = ctx.db.query(
+            Event.name,
+            func.count(Payment.payment_id).label('paid_count')
+        ).outerjoin(
+            User, User.eventId == Event.id
+        ).outerjoin(
+            Payment, Payment.user_email == User.email
+        ).filter(
+            Payment.payment_status == "completed"
+        ).group_by(Event.id, Event.name).order_by(Event.created_at).all()
+
+        return {
+            "labels": [event.name for event in event_payments],
+            "data": [event.paid_count for event in event_payments]
+        }
+    except Exception:
+        logger.exception("Error in event payments widget")
+        # Return empty data if there's an error
+        return {"labels": [], "data": []}
+
+def attendance_stats_widget(ctx: DashboardContext) -> dict:
+    forms_query = ctx.db.query(Form.id).filter(Form.type == "attendance")
+    if ctx.event_id:
+        forms_query = forms_query.filter(Form.event_id == ctx.event_id)
+    form_ids = [form.id for form in forms_query.all()]
+
+    if not form_ids:
+        return {"labels": ["No Data"], "data": [0]}
+
+    # Attendance forms each user responded to, in one query; emails match case-insensitively
+    responded = {}
+    for response in ctx.db.query(FormResponse.form_id, FormResponse.user_email).filter(
+        FormResponse.form_id.in_(form_ids)
+    ).distinct():
+        responded.setdefault((response.user_email or "").lower(), set()).add(response.form_id)
+
+    users_query = ctx.db.query(User.email)
+    if ctx.event_id:
+        users_query = users_query.filter(User.eventId == ctx.event_id)
+    attendance_counts = {"attended": 0, "partially_attended": 0, "not_attended": 0}
+    for user in users_query:
+        user_responses = len(responded.get((user.email or "").lower(), ()))
+        if user_responses == len(form_ids):
+            attendance_counts["attended"] += 1
+        elif user_responses > 0:
+            attendance_counts["partially_attended"] += 1
+        else:
+            attendance_counts["not_attended"] += 1
+
+    return {
+        "labels": ["Attended", "Partially Attended", "Not Attended"],
+        "data": [attendance_counts["attended"], attendance_counts["partially_attended"], attendance_counts["not_attended"]]
+    }
+
+def colleges_widget(ctx: DashboardContext) -> dict:
+    """Top 5 colleges by registrations and the number of distinct colleges.
+
+    Spellings not yet clustered into a college count under the name as entered,
+    as in /api/colleges and the event analytics.
+    """
+    base_query = ctx.db.query(User)
+    if ctx.event_id:
+        base_query = base_query.filter(User.eventId == ctx.event_id)
+
+    clustered = base_query.filter(User.college_id.isnot(None)).with_entities(
+        User.college_id,
+        func.count(User.id).label('count')
+    ).group_by(User.college_id).all()
+    names = dict(ctx.db.query(College.id, College.name).filter(
+        College.id.in_([college.college_id for college in clustered])
+    ).all())
+    unclustered = base_query.filter(
+        User.college_id.is_(None),
+        User.college_name.isnot(None),
+        User.college_name != ''
+    ).with_entities(User.college_name, func.count(User.id).label('count')).group_by(User.college_name).all()
+
+    counts = {}
+    for college in clustered:
+        name = names.get(college.college_id, "Unknown")
+        counts[name] = counts.get(name, 0) + college.count
+    for college in unclustered:
+        name = college.college_name.strip()
+        if name:
+            counts[name] = counts.get(name, 0) + college.count
+    top = sorted(counts.items(), key=lambda item: -item[1])[:5]
+
+    return {
+        "colleges": [{"name": name, "count": count} for name, count in top],
+        "total_colleges": len(counts)
+    }
+
+# Widget name -> (builder, cache TTL in seconds, whether it depends on event_id)
+DASHBOARD_WIDGETS: Dict[str, tuple] = {
+    "stats": (stats_widget, float(os.getenv("DASHBOARD_STATS_TTL", "15")), True),
+    "registration_chart": (registration_chart_widget, float(os.getenv("DASHBOARD_REGISTRATION_CHART_TTL", "30")), True),
+    "monthly_registrations": (monthly_registrations_widget, float(os.getenv("DASHBOARD_MONTHLY_TTL", "300")), True),
+    "event_payments": (event_payments_widget, float(os.getenv("DASHBOARD_PAYMENTS_TTL", "60")), False),
+    "attendance_stats": (attendance_stats_widget, float(os.getenv("DASHBOARD_ATTENDANCE_TTL", "30")), True),
+    "colleges": (colleges_widget, float(os.getenv("DASHBOARD_COLLEGES_TTL", "300")), True),
+}
+
+_widget_cache = TTLCache(maxsize=1024)
+
+def parse_widgets(widgets: Optional[str]) -> List[str]:
+    """Widget names from a comma-separated ?widgets= value; all widgets when empty"""
+    if not widgets:
+        return list(DASHBOARD_WIDGETS)
+    names = [name.strip() for name in widgets.split(",") if name.strip()]
+    unknown = [name for name in names if name not in DASHBOARD_WIDGETS]
+    if unknown:
+        raise ValueError(f"Unknown widgets: {', '.join(unknown)}")
+    return names
+
+def get_widget(ctx: DashboardContext, name: str):
+    build, ttl, per_event = DASHBOARD_WIDGETS[name]
+    key = (name, ctx.event_id if per_event else None)
+    value = _widget_cache.get(key)
+    if value is None:
+        value = build(ctx)
+        _widget_cache.set(key, value, ttl=ttl)
+    return value
+
+def dashboard_summary(db: Session, event_id: Optional[int], widgets: List[str]) -> dict:
+    ctx = DashboardContext(db, event_id)
+    return {name: get_widget(ctx, name) for name in widgets}
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -36,9 +36,20 @@ class Event(Base):
     event_date = Column(String(50))
     qa_active = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Listing endpoints page by (sort column, id) and filter by event
+        Index("ix_users_created_id", "created_at", "id"),
+        Index("ix_users_event_id", "eventId", "id"),
+        # The search index catches up on edited users by updated_at
+        Index("ix_users_updated_at", "updated_at"),
+        # College aggregations group on the integer id, overall and per event
+        Index("ix_users_college_id", "college_id"),
+        Index("ix_users_event_college", "eventId", "college_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255))
@@ -48,6 +59,7 @@ class User(Base):
     phone_number = Column(String(20))
     primary_email = Column(String(255))
     college_name = Column(String(255))
+    college_id = Column(Integer)  # colleges.id, assigned by the college clustering job
     year_semester = Column(String(100))
     course = Column(String(255))
     specify_course = Column(String(255))
@@ -66,6 +78,37 @@ class User(Base):
     eventId = Column(Integer)
     utm_source = Column(String(255))
 
+class College(Base):
+    __tablename__ = "colleges"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255))  # Canonical display name
+    normalized_name = Column(String(255), unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+class CollegeAlias(Base):
+    __tablename__ = "college_aliases"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    normalized_name = Column(String(255), unique=True, index=True)  # Normalized spelling as entered by users
+    college_id = Column(Integer, index=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+class RegistrationDailyRollup(Base):
+    """Registrations per event and day, in total and broken down by source, gender and user type"""
+    __tablename__ = "registration_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("event_id", "day", "dimension", "value", name="uq_registration_rollup_key"),
+        Index("ix_registration_rollup_day", "dimension", "day"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, nullable=False, default=0)  # 0 for users without an event
+    day = Column(Date, nullable=False)
+    dimension = Column(String(20), nullable=False)  # all, source, gender or user_type
+    value = Column(String(255), nullable=False, default="")  # "" for the "all" dimension
+    registrations = Column(Integer, nullable=False, default=0)
+
 class Student(Base):
     __tablename__ = "students"
     
@@ -136,6 +179,10 @@ class FormQuestion(Base):
 
 class FormResponse(Base):
     __tablename__ = "form_responses"
+    __table_args__ = (
+        # One response per user per form; also serves (form_id, user_email) lookups
+        UniqueConstraint("form_id", "user_email", name="uq_form_responses_form_user"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     form_id = Column(Integer)
@@ -144,6 +191,7 @@ class FormResponse(Base):
     responses = Column(String(5000))  # JSON string
     score = Column(Integer, default=0)
     time_taken = Column(Integer, default=0)
+    idempotency_key = Column(String(64))  # Idempotency-Key header of the submitting request
     submitted_at = Column(DateTime, default=datetime.now)
 
 class FormAnalytics(Base):
@@ -155,6 +203,9 @@ class FormAnalytics(Base):
     average_score = Column(String(10), default="0.00")
     average_time = Column(Integer, default=0)
     completion_rate = Column(String(10), default="0.00")
+    total_accessed = Column(Integer, default=0)  # Public form views, flushed from form_views
+    unique_visitors = Column(Integer, default=0)  # Estimate from visitor_sketch
+    visitor_sketch = Column(LargeBinary)  # HyperLogLog registers
     last_updated = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
 class QAQuestion(Base):
@@ -196,6 +247,13 @@ class OTP(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id); the filtered variants keep the same order
+        Index("ix_audit_logs_created_id", "created_at", "id"),
+        Index("ix_audit_logs_action_created", "action", "created_at"),
+        Index("ix_audit_logs_resource_created", "resource_type", "created_at"),
+        Index("ix_audit_logs_email_created", "user_email", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_email = Column(String(255))
@@ -79,23 +79,6 @@ def fix_analytics_data():
                 analytics.average_time = 0
                 print("  No responses found")
             
-            # Estimate total accessed for completion rate
-            if not hasattr(analytics, 'total_accessed') or not analytics.total_accessed:
-                # Estimate based on form type
-                if form.type == "attendance":
-                    estimated_accessed = max(analytics.total_responses, int(analytics.total_responses * 1.1))
-                elif form.type == "quiz":
-                    estimated_accessed = max(analytics.total_responses, int(analytics.total_responses * 1.3))
-                elif form.type == "feedback":
-                    estimated_accessed = max(analytics.total_responses, int(analytics.total_responses * 1.25))
-                else:  # poll
-                    estimated_accessed = max(analytics.total_responses, int(analytics.total_responses * 1.15))
-                
-                # Set the estimated accessed count
-                if hasattr(analytics, 'total_accessed'):
-                    analytics.total_accessed = estimated_accessed
-                print(f"  Estimated accessed: {estimated_accessed}")
-            
             analytics.last_updated = datetime.utcnow()
         
         # Commit all changes
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy.orm import Session
+
+from database import Form
+from form_utils import generate_form_hash
+from ttl_cache import TTLCache
+
+# Other workers only learn about form edits when their copy expires
+PUBLIC_FORM_CACHE_TTL = int(os.getenv("PUBLIC_FORM_CACHE_TTL", "30"))
+# Unknown hashes between full rescans look for forms edited this many seconds back
+RECENT_FORM_WINDOW = int(os.getenv("RECENT_FORM_WINDOW", "300"))
+
+class FormHashIndex:
+    """Maps public form hashes to form ids so lookups don't scan every active form"""
+
+    def __init__(self, min_rescan_interval: float = 1.0):
+        self.min_rescan_interval = min_rescan_interval
+        self._ids = {}
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+
+    def form_id(self, form_hash: str) -> Optional[int]:
+        return self._ids.get(form_hash)
+
+    def rescan(self, db: Session) -> None:
+        rows = db.query(Form.id, Form.created_at, Form.title).filter(Form.is_active == 1).all()
+        ids = {generate_form_hash(row): row.id for row in rows}
+        with self._lock:
+            self._ids = ids
+            self._last_scan = time.monotonic()
+
+    def scan_recent(self, db: Session) -> None:
+        """Index the active forms created or edited (e.g. re-activated) shortly before now"""
+        since = datetime.now() - timedelta(seconds=RECENT_FORM_WINDOW)
+        rows = db.query(Form.id, Form.created_at, Form.title).filter(Form.is_active == 1, Form.updated_at >= since).all()
+        with self._lock:
+            self._ids = {**self._ids, **{generate_form_hash(row): row.id for row in rows}}
+
+    def find_active_form(self, db: Session, form_hash: str):
+        """Return the active form for a hash, or None"""
+        form_id = self._ids.get(form_hash)
+        if form_id is None:
+            # Unknown hash: the form may have been created or activated since the last scan, possibly on
+            # another worker. Full rescans are rate limited; in between, only recently edited forms are read.
+            if time.monotonic() - self._last_scan < self.min_rescan_interval:
+                self.scan_recent(db)
+            else:
+                self.rescan(db)
+            form_id = self._ids.get(form_hash)
+            if form_id is None:
+                return None
+
+        form = db.query(Form).filter(Form.id == form_id).first()
+        if not form or not form.is_active or generate_form_hash(form) != form_hash:
+            self.forget(form_id)
+            return None
+        return form
+
+    def forget(self, form_id: int) -> None:
+        with self._lock:
+            self._ids = {h: i for h, i in self._ids.items() if i != form_id}
+            # Let the next unknown hash rescan right away (e.g. the form was just re-activated)
+            self._last_scan = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids = {}
+            self._last_scan = 0.0
+
+form_hash_index = FormHashIndex()
+
+class CachedPublicForm:
+    """Serialized public form payload with its strong ETag"""
+
+    def __init__(self, payload: dict):
+        self.form_id = payload["id"]
+        self.body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+# Rendered public form payloads keyed by form id
+public_form_cache = TTLCache(maxsize=512, ttl=PUBLIC_FORM_CACHE_TTL)
+
+def get_cached_public_form(db: Session, form_hash: str) -> Optional[CachedPublicForm]:
+    form_id = form_hash_index.form_id(form_hash)
+    if form_id is None:
+        return None
+    cached = public_form_cache.get(form_id)
+    # Deactivation on another worker doesn't reach this cache, so confirm with a primary key lookup
+    if cached is not None and not db.query(Form.is_active).filter(Form.id == form_id).scalar():
+        invalidate_public_form(form_id)
+        return None
+    return cached
+
+def cache_public_form(form_id: int, payload: dict) -> CachedPublicForm:
+    cached = CachedPublicForm(payload)
+    public_form_cache.set(form_id, cached)
+    return cached
+
+def public_form_response(cached: CachedPublicForm, if_none_match: Optional[str]) -> Response:
+    """Build the response for a cached form, answering 304 when the client copy is current"""
+    headers = {
+        "ETag": cached.etag,
+        # Browsers and proxies may store the form but must revalidate before reuse
+        "Cache-Control": "public, no-cache",
+    }
+    if if_none_match:
+        client_etags = [tag.strip() for tag in if_none_match.split(",")]
+        if cached.etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+def invalidate_public_form(form_id: int) -> None:
+    public_form_cache.pop(form_id)
+    form_hash_index.forget(form_id)
@@ -0,0 +1,50 @@
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+
+from database import FormQuestion
+from ttl_cache import TTLCache
+
+class AnswerKey:
+    """Scoring plan compiled from the questions of one version of a form"""
+
+    def __init__(self, form_id: int, questions):
+        self.form_id = form_id
+        self.question_ids = [str(q.id) for q in questions]
+        self.question_types = {str(q.id): q.question_type for q in questions}
+        self.points = {str(q.id): q.points or 0 for q in questions}
+        # Only questions with a correct answer take part in scoring
+        self.correct_answers = {str(q.id): str(q.correct_answer) for q in questions if q.correct_answer}
+        self.text_question_ids = [str(q.id) for q in questions if q.question_type == "text"]
+        self.total_points = sum(self.points.values())
+
+    def score(self, responses: Dict[str, Any]) -> int:
+        """Score a quiz submission"""
+        score = 0
+        for question_id, correct_answer in self.correct_answers.items():
+            if question_id in responses and str(responses[question_id]) == correct_answer:
+                score += self.points[question_id]
+        return score
+
+    def feedback_chars(self, responses: Dict[str, Any]) -> int:
+        """Total characters written across the text questions"""
+        return sum(
+            len(str(responses[question_id]).strip())
+            for question_id in self.text_question_ids
+            if question_id in responses
+        )
+
+# Compiled answer keys keyed by (form id, updated_at); update_form bumps updated_at
+_answer_keys = TTLCache(maxsize=512, ttl=None)
+
+def get_answer_key(db: Session, form) -> AnswerKey:
+    """Return the cached answer key for a form, compiling it on first use"""
+    cache_key = (form.id, form.updated_at)
+    answer_key = _answer_keys.get(cache_key)
+    if answer_key is None:
+        questions = db.query(FormQuestion).filter(FormQuestion.form_id == form.id).all()
+        answer_key = AnswerKey(form.id, questions)
+        _answer_keys.set(cache_key, answer_key)
+    return answer_key
+
+def invalidate_answer_key(form_id: int) -> None:
+    _answer_keys.pop_where(lambda key: key[0] == form_id)
@@ -7,6 +7,12 @@ import json
 import os
 from typing import List, Dict, Any
 import uuid
+import hashlib
+
+def generate_form_hash(form) -> str:
+    """Generate consistent hash for form"""
+    hash_input = f"{form.id}_{form.created_at}_{form.title}"
+    return hashlib.md5(hash_input.encode()).hexdigest()[:12]
 
 def parse_excel_to_questions(file_content: bytes, form_type: str) -> List[Dict[str, Any]]:
     """Parse Excel file and convert to form questions"""
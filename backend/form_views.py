@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import math
+import os
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, FormAnalytics
+from app_logging import get_logger
+
+logger = get_logger("form_views")
+
+FORM_VIEW_FLUSH_SECONDS = int(os.getenv("FORM_VIEW_FLUSH_SECONDS", "30"))
+# Behind a reverse proxy every request comes from the proxy's address, so take the client from
+# X-Forwarded-For. Clients can forge the header, but it only feeds the unique visitor estimate.
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "true").lower() == "true"
+
+def visitor_key(request) -> str:
+    """Client address and user agent of a public form view"""
+    host = request.client.host if request.client else ""
+    forwarded_for = request.headers.get("x-forwarded-for") if TRUST_FORWARDED_FOR else None
+    if forwarded_for:
+        host = forwarded_for.split(",")[0].strip()
+    return f"{host}|{request.headers.get('user-agent', '')}"
+
+class HyperLogLog:
+    """Approximate distinct counter with 2**p one-byte registers (~1.04/sqrt(2**p) standard error)"""
+
+    def __init__(self, p: int = 10, registers: Optional[bytes] = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers and len(registers) == self.m else bytearray(self.m)
+
+    def add(self, value: str) -> None:
+        x = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = x >> (64 - self.p)
+        remaining = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+class FormViewCounter:
+    """Buffers public form views in memory and periodically adds them to form_analytics"""
+
+    def __init__(self):
+        self._pending: Dict[int, list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, form_id: int, visitor: str) -> None:
+        with self._lock:
+            entry = self._pending.get(form_id)
+            if entry is None:
+                entry = self._pending[form_id] = [0, HyperLogLog()]
+            entry[0] += 1
+            entry[1].add(visitor)
+
+    def stats(self, form_id: int, analytics: Optional[FormAnalytics]):
+        """Return (total views, unique visitors) for a form, including views not yet flushed"""
+        views = (analytics.total_accessed or 0) if analytics else 0
+        sketch = HyperLogLog(registers=analytics.visitor_sketch if analytics else None)
+        with self._lock:
+            entry = self._pending.get(form_id)
+            if entry:
+                views += entry[0]
+                sketch.merge(entry[1])
+        return views, sketch.count()
+
+    def flush(self, db: Session) -> int:
+        """Write buffered views to the database; returns the number of forms updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            for form_id, (views, sketch) in pending.items():
+                # Other workers flush the same rows: lock the row for the sketch merge and add views in SQL
+                analytics = db.query(FormAnalytics).filter(FormAnalytics.form_id == form_id).with_for_update().first()
+                if not analytics:
+                    analytics = FormAnalytics(form_id=form_id, total_accessed=views)
+                    db.add(analytics)
+                else:
+                    db.query(FormAnalytics).filter(FormAnalytics.id == analytics.id).update(
+                        {FormAnalytics.total_accessed: func.coalesce(FormAnalytics.total_accessed, 0) + views},
+                        synchronize_session=False
+                    )
+                    sketch.merge(HyperLogLog(registers=analytics.visitor_sketch))
+                analytics.visitor_sketch = sketch.to_bytes()
+                analytics.unique_visitors = sketch.count()
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the views back so the next flush retries them
+            with self._lock:
+                for form_id, (views, sketch) in pending.items():
+                    entry = self._pending.setdefault(form_id, [0, HyperLogLog()])
+                    entry[0] += views
+                    entry[1].merge(sketch)
+            raise
+        return len(pending)
+
+    def flush_now(self) -> None:
+        db = SessionLocal()
+        try:
+            self.flush(db)
+        except Exception:
+            logger.exception("Error flushing form views")
+        finally:
+            db.close()
+
+    async def run_periodic_flush(self, interval: int = FORM_VIEW_FLUSH_SECONDS) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.flush_now)
+
+form_view_counter = FormViewCounter()
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header, Query, Request
 from fastapi.responses import StreamingResponse
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional, Dict, Any
@@ -7,37 +9,39 @@ from datetime import datetime
 import json
 import uuid
 import io
+import os
 
 from database import get_db, Form, FormQuestion, FormResponse, FormAnalytics, User
-from auth import verify_token
+from auth import verify_token, Principal, get_current_principal
+from ttl_cache import TTLCache
+from form_scoring import get_answer_key, invalidate_answer_key
+from form_cache import (
+    form_hash_index,
+    get_cached_public_form,
+    cache_public_form,
+    public_form_response,
+    invalidate_public_form
+)
+from form_views import form_view_counter, visitor_key
+from submission_index import submission_index
+from audit_log import log_audit_action
+from app_logging import get_logger
+from streaming_export import iter_query, json_array_chunks, export_response
+from http_caching import check_etag, with_etag, form_responses_version
 from form_utils import (
+    generate_form_hash,
     parse_excel_to_questions, 
     generate_qr_code_with_branding, 
     save_uploaded_file,
     create_form_template_excel
 )
 
-# Import audit logging function
-def log_audit_action(db: Session, user_email: str, user_role: str, action: str, resource_type: str, resource_id: str = None, details: str = None):
-    from database import AuditLog, Admin
-    import json
-    
-    admin = db.query(Admin).filter(Admin.email == user_email).first()
-    user_name = admin.email if admin else user_email
-    
-    audit_log = AuditLog(
-        user_email=user_email,
-        user_name=user_name,
-        user_role=user_role,
-        action=action,
-        resource_type=resource_type,
-        resource_id=str(resource_id) if resource_id else None,
-        details=details
-    )
-    db.add(audit_log)
-    db.commit()
-
 router = APIRouter()
+logger = get_logger("forms")
+
+# Results of completed submissions keyed by Idempotency-Key, so client retries replay the original result
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+submission_results = TTLCache(maxsize=10000, ttl=IDEMPOTENCY_TTL_SECONDS)
 
 # Test database connection
 @router.get("/test/db")
@@ -57,25 +61,16 @@ def test_authentication(current_user: str = Depends(verify_token)):
     return {"status": "success", "message": "Authentication is working", "user": current_user}
 
 # Helper function to check admin privileges
-def check_admin_privileges(current_user: str, db: Session):
+def check_admin_privileges(principal: Principal):
     """Check if current user is an admin, manager, or presenter"""
-    from database import Admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not admin:
-        print(f"No admin record found for user: {current_user}")
+    if not principal.is_admin_account:
+        logger.debug("No admin record found", user=principal.email, sample=0.1)
         return False
     
-    has_privileges = admin.role in ["admin", "manager", "presenter"]
-    print(f"User {current_user} has role: {admin.role}, has privileges: {has_privileges}")
+    has_privileges = principal.role in ["admin", "manager", "presenter"]
+    logger.debug("Checked admin privileges", user=principal.email, role=principal.role, has_privileges=has_privileges, sample=0.1)
     return has_privileges
 
-# Helper function to generate form hash
-def generate_form_hash(form):
-    """Generate consistent hash for form"""
-    import hashlib
-    hash_input = f"{form.id}_{form.created_at}_{form.title}"
-    return hashlib.md5(hash_input.encode()).hexdigest()[:12]
-
 # Pydantic models
 class QuestionCreate(BaseModel):
     question_text: str
@@ -122,23 +117,25 @@ class ResponseSubmit(BaseModel):
 
 # Get all forms
 @router.get("/forms")
-def get_forms(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_forms(current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check user privileges
-    has_admin_privileges = check_admin_privileges(current_user, db)
-    print(f"User {current_user} has admin privileges: {has_admin_privileges}")
+    has_admin_privileges = check_admin_privileges(principal)
     
     # Admins and managers can see all forms, others see only their own
     if has_admin_privileges:
         forms = db.query(Form).order_by(Form.created_at.desc()).all()
-        print(f"Returning {len(forms)} forms for admin/manager user")
     else:
         forms = db.query(Form).filter(Form.created_by == current_user).order_by(Form.created_at.desc()).all()
-        print(f"Returning {len(forms)} forms for regular user")
+    logger.debug("Listing forms", user=current_user, admin=has_admin_privileges, forms=len(forms), sample=0.1)
+    
+    # Response counts for all forms in one grouped query
+    response_counts = dict(db.query(FormResponse.form_id, func.count(FormResponse.id)).filter(
+        FormResponse.form_id.in_([form.id for form in forms])
+    ).group_by(FormResponse.form_id).all()) if forms else {}
     
     result = []
     for form in forms:
-        # Get response count
-        response_count = db.query(FormResponse).filter(FormResponse.form_id == form.id).count()
+        response_count = response_counts.get(form.id, 0)
         
         # Generate form hash and link
         form_hash = generate_form_hash(form)
@@ -161,16 +158,14 @@ def get_forms(current_user: str = Depends(verify_token), db: Session = Depends(g
 
 # Create form
 @router.post("/forms")
-def create_form(form_data: FormCreate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def create_form(form_data: FormCreate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     try:
         # Check if user exists
-        from database import Admin
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if not admin:
+        if not principal.is_admin_account:
             raise HTTPException(status_code=403, detail="User not found")
         
         # Presenter role has view-only access
-        if admin.role == "presenter":
+        if principal.role == "presenter":
             raise HTTPException(status_code=403, detail="View Only - Presenters cannot create forms")
         
         # Validate form data
@@ -224,7 +219,7 @@ def create_form(form_data: FormCreate, current_user: str = Depends(verify_token)
         db.refresh(new_form)
         
         # Log audit action
-        log_audit_action(db, current_user, admin.role, "create_form", "form", new_form.id, f"Created form: {form_data.title}")
+        log_audit_action(current_user, principal.role, "create_form", "form", new_form.id, f"Created form: {form_data.title}")
         
         # Generate form hash and link for response
         form_hash = generate_form_hash(new_form)
@@ -245,9 +240,9 @@ def create_form(form_data: FormCreate, current_user: str = Depends(verify_token)
 
 # Get form by ID
 @router.get("/forms/{form_id}")
-def get_form(form_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_form(form_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Admins can access all forms, others only their own
-    if check_admin_privileges(current_user, db):
+    if check_admin_privileges(principal):
         form = db.query(Form).filter(Form.id == form_id).first()
     else:
         form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
@@ -256,10 +251,8 @@ def get_form(form_id: int, current_user: str = Depends(verify_token), db: Sessio
         raise HTTPException(status_code=404, detail="Form not found")
     
     # Log audit action
-    from database import Admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "view_form", "form", form_id, f"Viewed form: {form.title}")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "view_form", "form", form_id, f"Viewed form: {form.title}")
     
     questions = db.query(FormQuestion).filter(FormQuestion.form_id == form_id).order_by(FormQuestion.order_index).all()
     
@@ -292,15 +285,13 @@ def get_form(form_id: int, current_user: str = Depends(verify_token), db: Sessio
 
 # Update form
 @router.put("/forms/{form_id}")
-def update_form(form_id: int, form_data: FormUpdate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def update_form(form_id: int, form_data: FormUpdate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if user is presenter (view-only)
-    from database import Admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if admin and admin.role == "presenter":
+    if principal.role == "presenter":
         raise HTTPException(status_code=403, detail="View Only - Presenters cannot edit forms")
     
     # Admins can update all forms, others only their own
-    if check_admin_privileges(current_user, db):
+    if check_admin_privileges(principal):
         form = db.query(Form).filter(Form.id == form_id).first()
     else:
         form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
@@ -348,26 +339,24 @@ def update_form(form_id: int, form_data: FormUpdate, current_user: str = Depends
     
     form.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_answer_key(form_id)
+    invalidate_public_form(form_id)
     
     # Log audit action
-    from database import Admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "edit_form", "form", form_id, f"Updated form: {form.title}")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "edit_form", "form", form_id, f"Updated form: {form.title}")
     
     return {"message": "Form updated successfully"}
 
 # Delete form
 @router.delete("/forms/{form_id}")
-def delete_form(form_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def delete_form(form_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if user is presenter (view-only)
-    from database import Admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if admin and admin.role == "presenter":
+    if principal.role == "presenter":
         raise HTTPException(status_code=403, detail="View Only - Presenters cannot delete forms")
     
     # Admins can delete all forms, others only their own
-    if check_admin_privileges(current_user, db):
+    if check_admin_privileges(principal):
         form = db.query(Form).filter(Form.id == form_id).first()
     else:
         form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
@@ -376,11 +365,9 @@ def delete_form(form_id: int, current_user: str = Depends(verify_token), db: Ses
         raise HTTPException(status_code=404, detail="Form not found")
     
     # Log audit action before deletion
-    from database import Admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
+    user_role = principal.role or "unknown"
     form_title = form.title
-    log_audit_action(db, current_user, user_role, "delete_form", "form", form_id, f"Deleted form: {form_title}")
+    log_audit_action(current_user, user_role, "delete_form", "form", form_id, f"Deleted form: {form_title}")
     
     # Delete related data
     db.query(FormQuestion).filter(FormQuestion.form_id == form_id).delete()
@@ -389,18 +376,25 @@ def delete_form(form_id: int, current_user: str = Depends(verify_token), db: Ses
     db.delete(form)
     
     db.commit()
+    invalidate_answer_key(form_id)
+    invalidate_public_form(form_id)
+    submission_index.forget(form_id)
     return {"message": "Form deleted successfully"}
 
 # Get public form by hash
 @router.get("/public/forms/{form_hash}")
-def get_public_form(form_hash: str, db: Session = Depends(get_db)):
+def get_public_form(form_hash: str, request: Request, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    # Track the view in memory; counts are flushed to form_analytics in the background
+    visitor = visitor_key(request)
+    
+    # Serve the rendered form from cache; it is identical for every attendee
+    cached = get_cached_public_form(db, form_hash)
+    if cached is not None:
+        form_view_counter.record(cached.form_id, visitor)
+        return public_form_response(cached, if_none_match)
+    
     # Find form by hash
-    forms = db.query(Form).filter(Form.is_active == 1).all()
-    form = None
-    for f in forms:
-        if generate_form_hash(f) == form_hash:
-            form = f
-            break
+    form = form_hash_index.find_active_form(db, form_hash)
     
     if not form:
         raise HTTPException(status_code=404, detail="Form not found or inactive")
@@ -409,24 +403,6 @@ def get_public_form(form_hash: str, db: Session = Depends(get_db)):
     if not form.is_active:
         raise HTTPException(status_code=403, detail="This form is currently disabled")
     
-    # Track form access for better completion rate calculation
-    try:
-        analytics = db.query(FormAnalytics).filter(FormAnalytics.form_id == form.id).first()
-        if analytics:
-            # Increment access count (we'll add this field to track form views)
-            if not hasattr(analytics, 'total_accessed'):
-                # For backward compatibility, estimate accessed count
-                current_responses = db.query(FormResponse).filter(FormResponse.form_id == form.id).count()
-                # Estimate that accessed is typically 20-30% higher than responses
-                estimated_accessed = max(current_responses, int(current_responses * 1.25))
-            else:
-                analytics.total_accessed = (analytics.total_accessed or 0) + 1
-            db.commit()
-    except Exception as e:
-        print(f"Error updating form access analytics: {e}")
-        # Don't fail the request if analytics update fails
-        pass
-    
     questions = db.query(FormQuestion).filter(FormQuestion.form_id == form.id).order_by(FormQuestion.order_index).all()
     
     # Get event name if form has event_id
@@ -438,7 +414,7 @@ def get_public_form(form_hash: str, db: Session = Depends(get_db)):
             event_name = event.name
     
     # Don't include correct answers in public view
-    return {
+    payload = {
         "id": form.id,
         "title": form.title,
         "description": form.description,
@@ -461,17 +437,46 @@ def get_public_form(form_hash: str, db: Session = Depends(get_db)):
             "order_index": q.order_index
         } for q in questions]
     }
+    cached = cache_public_form(form.id, payload)
+    form_view_counter.record(form.id, visitor)
+    return public_form_response(cached, if_none_match)
+
+# Helper function to build the submit response for a stored submission
+def build_submission_result(form, score: int, answer_key):
+    """Build the result returned to the user for a submission"""
+    result = {"message": "Response submitted successfully"}
+    if form.type == "quiz":
+        result["score"] = score
+        result["total_points"] = answer_key.total_points
+    elif form.type == "attendance":
+        result["message"] = "Attendance Marked"
+    return result
+
+def raise_duplicate_submission(form):
+    if form.type == "attendance":
+        raise HTTPException(status_code=400, detail="Attendance Already Marked")
+    raise HTTPException(status_code=400, detail="You have already submitted a response to this form")
 
 # Submit form response
 @router.post("/public/forms/{form_hash}/submit")
-async def submit_form_response(form_hash: str, response_data: ResponseSubmit, db: Session = Depends(get_db)):
+async def submit_form_response(
+    form_hash: str,
+    response_data: ResponseSubmit,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    # Replay the original result for a retried request
+    cache_key = None
+    if idempotency_key:
+        if len(idempotency_key) > 64:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 64 characters")
+        cache_key = (form_hash, response_data.user_email.lower(), idempotency_key)
+        cached_result = submission_results.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+    
     # Find form by hash
-    forms = db.query(Form).filter(Form.is_active == 1).all()
-    form = None
-    for f in forms:
-        if generate_form_hash(f) == form_hash:
-            form = f
-            break
+    form = form_hash_index.find_active_form(db, form_hash)
     
     if not form:
         raise HTTPException(status_code=404, detail="Form not found or inactive")
@@ -492,41 +497,33 @@ async def submit_form_response(form_hash: str, response_data: ResponseSubmit, db
         if str(user.registration_id) != str(response_data.registration_id):
             raise HTTPException(status_code=400, detail="Registration ID does not match your account")
     
+    # Compiled answer key for scoring and validation (cached per form version)
+    answer_key = get_answer_key(db, form) if form.type in ["quiz", "feedback"] else None
+    
     # For feedback forms, validate minimum character count
     if form.type == "feedback":
-        questions = db.query(FormQuestion).filter(FormQuestion.form_id == form_id).all()
-        total_feedback_chars = 0
-        for question in questions:
-            if question.question_type == "text":
-                question_id = str(question.id)
-                if question_id in response_data.responses:
-                    text_response = str(response_data.responses[question_id]).strip()
-                    total_feedback_chars += len(text_response)
-        
-        if total_feedback_chars < 150:
+        if answer_key.feedback_chars(response_data.responses) < 150:
             raise HTTPException(status_code=400, detail="Feedback must contain at least 150 characters in total across all text fields")
     
-    # Check if user already submitted
-    existing_response = db.query(FormResponse).filter(
-        FormResponse.form_id == form_id,
-        FormResponse.user_email == response_data.user_email
-    ).first()
+    # Check if user already submitted; first-time submitters are answered from memory
+    existing_response = None
+    if submission_index.has_submitted(db, form_id, response_data.user_email):
+        existing_response = db.query(FormResponse).filter(
+            FormResponse.form_id == form_id,
+            FormResponse.user_email == response_data.user_email
+        ).first()
     if existing_response:
-        if form.type == "attendance":
-            raise HTTPException(status_code=400, detail="Attendance Already Marked")
-        else:
-            raise HTTPException(status_code=400, detail="You have already submitted a response to this form")
+        # Same Idempotency-Key means this is a retry of the stored submission (possibly served by another worker)
+        if idempotency_key and existing_response.idempotency_key == idempotency_key:
+            result = build_submission_result(form, existing_response.score, answer_key)
+            submission_results.set(cache_key, result)
+            return result
+        raise_duplicate_submission(form)
     
     # Calculate score for quiz
     score = 0
     if form.type == "quiz":
-        questions = db.query(FormQuestion).filter(FormQuestion.form_id == form_id).all()
-        for question in questions:
-            question_id = str(question.id)
-            if question_id in response_data.responses:
-                user_answer = response_data.responses[question_id]
-                if question.correct_answer and str(user_answer) == str(question.correct_answer):
-                    score += question.points
+        score = answer_key.score(response_data.responses)
     
     # Save response
     new_response = FormResponse(
@@ -535,12 +532,27 @@ async def submit_form_response(form_hash: str, response_data: ResponseSubmit, db
         user_name=response_data.user_name,
         responses=json.dumps(response_data.responses),
         score=score,
-        time_taken=response_data.time_taken
+        time_taken=response_data.time_taken,
+        idempotency_key=idempotency_key
     )
     db.add(new_response)
     
-    # Commit the new response first
-    db.commit()
+    # Commit the new response first; the unique (form_id, user_email) constraint catches concurrent double submits
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        submission_index.add(form_id, response_data.user_email)
+        existing_response = db.query(FormResponse).filter(
+            FormResponse.form_id == form_id,
+            FormResponse.user_email == response_data.user_email
+        ).first()
+        if existing_response and idempotency_key and existing_response.idempotency_key == idempotency_key:
+            result = build_submission_result(form, existing_response.score, answer_key)
+            submission_results.set(cache_key, result)
+            return result
+        raise_duplicate_submission(form)
+    submission_index.add(form_id, response_data.user_email)
     
     # Update analytics after committing the response
     analytics = db.query(FormAnalytics).filter(FormAnalytics.form_id == form_id).first()
@@ -588,20 +600,25 @@ async def submit_form_response(form_hash: str, response_data: ResponseSubmit, db
     except Exception as e:
         print(f"WebSocket broadcast error: {e}")
     
-    result = {"message": "Response submitted successfully"}
-    if form.type == "quiz":
-        result["score"] = score
-        result["total_points"] = sum(q.points for q in db.query(FormQuestion).filter(FormQuestion.form_id == form_id).all())
-    elif form.type == "attendance":
-        result["message"] = "Attendance Marked"
+    result = build_submission_result(form, score, answer_key)
+    if cache_key:
+        submission_results.set(cache_key, result)
     
     return result
 
+def user_colleges(db: Session, emails) -> Dict[str, str]:
+    """College of the earliest registered user for each email; emails may be a list or a subquery"""
+    colleges = {}
+    # Newest first, so the earliest registration wins
+    for email, college in db.query(User.email, User.college_name).filter(User.email.in_(emails)).order_by(User.id.desc()):
+        colleges[email] = college
+    return colleges
+
 # Get form analytics
 @router.get("/forms/{form_id}/analytics")
-def get_form_analytics(form_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_form_analytics(form_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Admins can access all forms, others only their own
-    if check_admin_privileges(current_user, db):
+    if check_admin_privileges(principal):
         form = db.query(Form).filter(Form.id == form_id).first()
     else:
         form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
@@ -626,8 +643,6 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
             elif question.id in response_data:
                 question_responses.append(response_data[question.id])
         
-        print(f"Question {question.id} ({question.question_text}): Found {len(question_responses)} responses")
-        
         # Calculate statistics based on question type
         stats = {"question_text": question.question_text, "question_type": question.question_type}
         
@@ -635,10 +650,6 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
             options = json.loads(question.options) if question.options else []
             option_counts = {}
             
-            # Debug: Print the actual responses
-            print(f"Question {question.id} responses: {question_responses}")
-            print(f"Question options: {options}")
-            
             for option in options:
                 # Count exact matches and also check for string/type variations
                 count = 0
@@ -646,7 +657,6 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
                     if str(response).strip() == str(option).strip():
                         count += 1
                 option_counts[option] = count
-                print(f"Option '{option}' count: {count}")
             
             stats["option_counts"] = option_counts
         elif question.question_type == "rating":
@@ -666,6 +676,7 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
                 stats["responses"] = question_responses[:10]  # Show first 10 responses
         
         question_analytics.append(stats)
+    logger.debug("Computed question analytics", form_id=form_id, questions=len(questions), responses=len(responses))
     
     # Response timeline
     response_timeline = {}
@@ -674,25 +685,29 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
         response_timeline[date] = response_timeline.get(date, 0) + 1
     
     # College statistics
+    colleges_by_email = user_colleges(db, db.query(FormResponse.user_email).filter(FormResponse.form_id == form_id))
     college_stats = {}
     for response in responses:
-        user = db.query(User).filter(User.email == response.user_email).first()
-        if user and user.college_name:
-            college = user.college_name
+        college = colleges_by_email.get(response.user_email)
+        if college:
             if college not in college_stats:
                 college_stats[college] = {"registered": 0, "attended": 0, "filled": 0}
             college_stats[college]["filled"] += 1
     
     # Get registration and attendance data for colleges
-    all_users = db.query(User).all()
-    for user in all_users:
-        if user.college_name:
-            college = user.college_name
-            if college not in college_stats:
-                college_stats[college] = {"registered": 0, "attended": 0, "filled": 0}
-            college_stats[college]["registered"] += 1
-            if form.event_id and user.eventId == form.event_id:
-                college_stats[college]["attended"] += 1
+    registrations = db.query(
+        User.college_name,
+        func.count(User.id),
+        func.sum(case((User.eventId == form.event_id, 1), else_=0)) if form.event_id else func.sum(0)
+    ).filter(
+        User.college_name.isnot(None),
+        User.college_name != ''
+    ).group_by(User.college_name).all()
+    for college, registered, attended in registrations:
+        if college not in college_stats:
+            college_stats[college] = {"registered": 0, "attended": 0, "filled": 0}
+        college_stats[college]["registered"] += registered
+        college_stats[college]["attended"] += int(attended or 0)
     
     # Top 10 students for quiz forms
     top_students = []
@@ -700,58 +715,25 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
         top_responses = db.query(FormResponse).filter(
             FormResponse.form_id == form_id
         ).order_by(FormResponse.score.desc()).limit(10).all()
+        top_colleges = user_colleges(db, [response.user_email for response in top_responses])
         
         for response in top_responses:
-            user = db.query(User).filter(User.email == response.user_email).first()
             top_students.append({
                 "user_name": response.user_name,
                 "user_email": response.user_email,
                 "score": response.score,
-                "college": user.college_name if user else "N/A",
+                "college": top_colleges.get(response.user_email, "N/A"),
                 "time_taken": response.time_taken,
                 "submitted_at": response.submitted_at.isoformat()
             })
     
-    # Calculate completion rate based on actual data
+    # Calculate completion rate from tracked views vs. submissions
     total_responses = len(responses)
+    total_views, unique_visitors = form_view_counter.stats(form_id, analytics)
     
-    # Get total unique users who accessed the form (from analytics or estimate)
-    # For now, we'll calculate based on form type and actual engagement patterns
-    if form.type == "attendance":
-        # For attendance, completion rate is typically high
-        if total_responses == 0:
-            completion_rate = 0.0
-        else:
-            # Estimate based on typical attendance patterns
-            estimated_accessed = max(total_responses, int(total_responses * 1.1))
-            completion_rate = min((total_responses / estimated_accessed) * 100, 100.0)
-    elif form.type == "quiz":
-        # Quiz forms typically have lower completion rates due to difficulty
-        if total_responses == 0:
-            completion_rate = 0.0
-        else:
-            # Estimate based on quiz engagement patterns
-            estimated_accessed = int(total_responses * 1.3)  # 30% drop-off rate
-            completion_rate = (total_responses / estimated_accessed) * 100
-    elif form.type == "feedback":
-        # Feedback forms have moderate completion rates
-        if total_responses == 0:
-            completion_rate = 0.0
-        else:
-            # Estimate based on feedback engagement patterns
-            estimated_accessed = int(total_responses * 1.25)  # 25% drop-off rate
-            completion_rate = (total_responses / estimated_accessed) * 100
-    else:  # poll
-        # Polls typically have good completion rates
-        if total_responses == 0:
-            completion_rate = 0.0
-        else:
-            # Estimate based on poll engagement patterns
-            estimated_accessed = int(total_responses * 1.15)  # 15% drop-off rate
-            completion_rate = (total_responses / estimated_accessed) * 100
-    
-    # Ensure completion rate is realistic (between 0 and 100)
-    completion_rate = max(0.0, min(completion_rate, 100.0))
+    # Forms opened before view tracking existed can have fewer visitors than responses
+    visitors = max(unique_visitors, total_responses)
+    completion_rate = (total_responses / visitors) * 100 if visitors else 0.0
     
     # Calculate more accurate average time (exclude outliers)
     if responses:
@@ -780,6 +762,8 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
         "average_score": float(analytics.average_score) if analytics and analytics.average_score else 0,
         "average_time": actual_average_time,
         "completion_rate": round(completion_rate, 1),
+        "total_views": total_views,
+        "unique_visitors": unique_visitors,
         "question_analytics": question_analytics,
         "response_timeline": response_timeline,
         "college_statistics": college_stats,
@@ -793,11 +777,34 @@ def get_form_analytics(form_id: int, current_user: str = Depends(verify_token),
         } for r in responses[-10:]]  # Last 10 responses
     }
 
+FORM_RESPONSE_FIELDS = ["id", "user_name", "user_email", "score", "time_taken", "submitted_at", "responses"]
+
+def form_responses_query(db: Session, form_id: int):
+    return db.query(FormResponse).filter(FormResponse.form_id == form_id).order_by(FormResponse.submitted_at.desc())
+
+def serialize_form_response(r):
+    return {
+        "id": r.id,
+        "user_name": r.user_name,
+        "user_email": r.user_email,
+        "responses": json.loads(r.responses),
+        "score": r.score,
+        "time_taken": r.time_taken,
+        "submitted_at": r.submitted_at
+    }
+
+def form_response_csv_row(r):
+    row = serialize_form_response(r)
+    answers = row.pop("responses") or {}
+    for question_id, answer in answers.items():
+        row[f"q_{question_id}"] = answer if isinstance(answer, str) else json.dumps(answer)
+    return row
+
 # Get form responses
 @router.get("/forms/{form_id}/responses")
-def get_form_responses(form_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_form_responses(form_id: int, request: Request, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Admins can access all forms, others only their own
-    if check_admin_privileges(current_user, db):
+    if check_admin_privileges(principal):
         form = db.query(Form).filter(Form.id == form_id).first()
     else:
         form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
@@ -805,39 +812,50 @@ def get_form_responses(form_id: int, current_user: str = Depends(verify_token),
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
     
-    responses = db.query(FormResponse).filter(FormResponse.form_id == form_id).order_by(FormResponse.submitted_at.desc()).all()
+    etag, not_modified = check_etag(request, form_responses_version(db, form_id))
+    if not_modified:
+        return not_modified
     
-    return [{
-        "id": r.id,
-        "user_name": r.user_name,
-        "user_email": r.user_email,
-        "responses": json.loads(r.responses),
-        "score": r.score,
-        "time_taken": r.time_taken,
-        "submitted_at": r.submitted_at.isoformat()
-    } for r in responses]
+    # Streamed so forms with many responses never sit in memory as one list
+    rows = iter_query(lambda session: form_responses_query(session, form_id))
+    return with_etag(StreamingResponse(json_array_chunks(rows, serialize_form_response), media_type="application/json"), etag)
+
+# Export form responses
+@router.get("/forms/{form_id}/responses/export")
+def export_form_responses(form_id: int, format: str = Query("csv", pattern="^(ndjson|csv)$"), current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
+    # Admins can export all forms, others only their own
+    if check_admin_privileges(principal):
+        form = db.query(Form).filter(Form.id == form_id).first()
+    else:
+        form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
+    
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+    
+    if format == "csv":
+        # One column per question; answers stay JSON-encoded in their cells
+        question_ids = [str(q.id) for q in db.query(FormQuestion.id).filter(FormQuestion.form_id == form_id).order_by(FormQuestion.order_index)]
+        fieldnames = FORM_RESPONSE_FIELDS[:-1] + [f"q_{question_id}" for question_id in question_ids]
+        serialize = form_response_csv_row
+    else:
+        fieldnames = None
+        serialize = serialize_form_response
+    
+    rows = iter_query(lambda session: form_responses_query(session, form_id))
+    filename = f"form_{form_id}_responses_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return export_response(rows, serialize, format, fieldnames=fieldnames, filename=filename)
 
 # Check if user has already submitted
 @router.get("/public/forms/{form_hash}/check-submission/{user_email}")
 def check_user_submission(form_hash: str, user_email: str, db: Session = Depends(get_db)):
     # Find form by hash
-    forms = db.query(Form).filter(Form.is_active == 1).all()
-    form = None
-    for f in forms:
-        if generate_form_hash(f) == form_hash:
-            form = f
-            break
+    form = form_hash_index.find_active_form(db, form_hash)
     
     if not form:
         raise HTTPException(status_code=404, detail="Form not found or inactive")
     
     # Check if user already submitted
-    existing_response = db.query(FormResponse).filter(
-        FormResponse.form_id == form.id,
-        FormResponse.user_email == user_email
-    ).first()
-    
-    return {"hasSubmitted": existing_response is not None}
+    return {"hasSubmitted": submission_index.has_submitted(db, form.id, user_email)}
 
 # Alternative endpoint for checking submission (URL encoded email)
 @router.get("/public/forms/{form_hash}/check-submission/{user_email:path}")
@@ -846,36 +864,24 @@ def check_user_submission_encoded(form_hash: str, user_email: str, db: Session =
     decoded_email = unquote(user_email)
     
     # Find form by hash
-    forms = db.query(Form).filter(Form.is_active == 1).all()
-    form = None
-    for f in forms:
-        if generate_form_hash(f) == form_hash:
-            form = f
-            break
+    form = form_hash_index.find_active_form(db, form_hash)
     
     if not form:
         raise HTTPException(status_code=404, detail="Form not found or inactive")
     
     # Check if user already submitted
-    existing_response = db.query(FormResponse).filter(
-        FormResponse.form_id == form.id,
-        FormResponse.user_email == decoded_email
-    ).first()
-    
-    return {"hasSubmitted": existing_response is not None}
+    return {"hasSubmitted": submission_index.has_submitted(db, form.id, decoded_email)}
 
 # Clone form
 @router.post("/forms/{form_id}/clone")
-def clone_form(form_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def clone_form(form_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     try:
         # Check if user exists
-        from database import Admin
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if not admin:
+        if not principal.is_admin_account:
             raise HTTPException(status_code=403, detail="User not found")
         
         # Find the original form (admins and managers can clone all forms, others only their own)
-        if admin.role in ["admin", "manager"]:
+        if principal.role in ["admin", "manager"]:
             original_form = db.query(Form).filter(Form.id == form_id).first()
         else:
             original_form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
@@ -920,7 +926,7 @@ def clone_form(form_id: int, current_user: str = Depends(verify_token), db: Sess
         db.refresh(cloned_form)
         
         # Log audit action
-        log_audit_action(db, current_user, admin.role, "clone_form", "form", cloned_form.id, f"Cloned form '{original_form.title}' to '{cloned_form.title}'")
+        log_audit_action(current_user, principal.role, "clone_form", "form", cloned_form.id, f"Cloned form '{original_form.title}' to '{cloned_form.title}'")
         
         return {"id": cloned_form.id, "message": "Form cloned successfully"}
     except HTTPException:
@@ -932,9 +938,9 @@ def clone_form(form_id: int, current_user: str = Depends(verify_token), db: Sess
 
 # Generate form link
 @router.get("/forms/{form_id}/link")
-def get_form_link(form_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_form_link(form_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Admins can access all forms, others only their own
-    if check_admin_privileges(current_user, db):
+    if check_admin_privileges(principal):
         form = db.query(Form).filter(Form.id == form_id).first()
     else:
         form = db.query(Form).filter(Form.id == form_id, Form.created_by == current_user).first()
@@ -956,20 +962,17 @@ def get_form_link(form_id: int, current_user: str = Depends(verify_token), db: S
 
 # Check user privileges
 @router.get("/user/privileges")
-def get_user_privileges(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_user_privileges(current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Get current user's role and privileges"""
-    from database import Admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    
-    if not admin:
+    if not principal.is_admin_account:
         raise HTTPException(status_code=404, detail="User not found")
     
     return {
-        "email": admin.email,
-        "role": admin.role,
-        "is_admin": admin.role == "admin",
-        "is_manager": admin.role == "manager",
-        "can_manage_all_forms": admin.role in ["admin", "manager"]
+        "email": principal.email,
+        "role": principal.role,
+        "is_admin": principal.role == "admin",
+        "is_manager": principal.role == "manager",
+        "can_manage_all_forms": principal.role in ["admin", "manager"]
     }
 
 # Excel Import Endpoints
@@ -1114,17 +1117,15 @@ def generate_form_qr_code(
 
 # Enhanced form creation with branding
 @router.post("/forms/create-with-branding")
-def create_form_with_branding(form_data: FormCreate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def create_form_with_branding(form_data: FormCreate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Create form with branding options"""
     try:
         # Check if user exists
-        from database import Admin
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if not admin:
+        if not principal.is_admin_account:
             raise HTTPException(status_code=403, detail="User not found")
         
         # Presenter role has view-only access
-        if admin.role == "presenter":
+        if principal.role == "presenter":
             raise HTTPException(status_code=403, detail="View Only - Presenters cannot create forms")
         
         # Validate form data
@@ -1179,7 +1180,7 @@ def create_form_with_branding(form_data: FormCreate, current_user: str = Depends
         db.refresh(new_form)
         
         # Log audit action
-        log_audit_action(db, current_user, admin.role, "create_form", "form", new_form.id, f"Created form with branding: {form_data.title}")
+        log_audit_action(current_user, principal.role, "create_form", "form", new_form.id, f"Created form with branding: {form_data.title}")
         
         # Generate form hash and link for response
         form_hash = generate_form_hash(new_form)
@@ -1200,12 +1201,10 @@ def create_form_with_branding(form_data: FormCreate, current_user: str = Depends
 
 # Test form creation endpoint
 @router.post("/forms/test")
-def test_form_creation(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def test_form_creation(current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Test endpoint to verify form creation is working"""
     try:
-        from database import Admin
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if not admin:
+        if not principal.is_admin_account:
             raise HTTPException(status_code=403, detail="User not found")
         
         # Create a simple test form
@@ -1226,7 +1225,7 @@ def test_form_creation(current_user: str = Depends(verify_token), db: Session =
         )
         
         # Use the existing create_form function
-        result = create_form(test_form_data, current_user, db)
+        result = create_form(test_form_data, current_user, principal, db)
         
         return {
             "status": "success",
@@ -0,0 +1,192 @@
+import gzip
+import hashlib
+import os
+import zlib
+from datetime import date
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import User, Event, Form, FormResponse, RegistrationDailyRollup
+from payment_model import Payment
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are sent as they are; compressing them saves less than it costs
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Quality 4 compresses JSON better than gzip -6 at a similar speed; 11 is far too slow per request
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """"br" or "gzip" from an Accept-Encoding header, by q-value and preferring br on a tie"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        q = offered.get(encoding, offered.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.flush = self._compressor.process, self._compressor.finish
+        else:
+            # wbits 31 writes the gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self.flush = self._compressor.compress, self._compressor.flush
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+class CompressionMiddleware:
+    """ASGI middleware compressing text and JSON responses with brotli or gzip, as the client accepts.
+
+    Bodies sent in one message are only compressed from minimum_size bytes up;
+    streamed bodies are always compressed, chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = choose_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = next((value for name, value in headers if name == b"content-type"), b"").decode("latin-1")
+                passthrough = (message["status"] < 200 or message["status"] in (204, 304)
+                               or any(name == b"content-encoding" for name, _ in headers)
+                               or not content_type.startswith(COMPRESSIBLE_TYPES))
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held back until the first body message shows whether it is worth compressing
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = [(name, value) for name, value in start.get("headers", []) if name != b"content-length"]
+                headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    await send(message)
+                    return
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    passthrough = True
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                compressor = _Compressor(encoding)
+                await send({**start, "headers": headers})
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.flush()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+def etag_for(request: Request, *version) -> str:
+    """Weak ETag of a resource version, distinct per path and query string"""
+    key = repr((request.url.path, request.url.query, version)).encode()
+    return f'W/"{hashlib.sha1(key).hexdigest()[:24]}"'
+
+def check_etag(request: Request, *version) -> Tuple[str, Optional[Response]]:
+    """(etag, 304 response if the client's If-None-Match already names it, else None)"""
+    etag = etag_for(request, *version)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison: W/"x" and "x" name the same representation
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return etag, Response(status_code=304, headers=etag_headers(etag))
+    return etag, None
+
+def etag_headers(etag: str) -> dict:
+    # no-cache makes browsers revalidate every poll instead of reusing a stale copy
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers.update(etag_headers(etag))
+    return response
+
+def _aggregates(db: Session, *queries) -> tuple:
+    """Run several single-row aggregates as scalar subqueries of one SELECT"""
+    return tuple(db.query(*(query.scalar_subquery() for query in queries)).one())
+
+def users_version(db: Session) -> tuple:
+    """Changes whenever a user is added, updated, deleted or assigned a college, or an event is added or edited"""
+    # College clustering sets college_id without touching updated_at
+    return _aggregates(db,
+        db.query(func.count(User.id)), db.query(func.max(User.id)), db.query(func.max(User.updated_at)),
+        db.query(func.count(User.college_id)), db.query(func.sum(User.college_id)),
+        db.query(func.count(Event.id)), db.query(func.max(Event.id)), db.query(func.max(Event.updated_at)))
+
+def event_analytics_version(db: Session, event_id: int) -> tuple:
+    """Changes with the event itself and its users, colleges, forms, attendance responses, payments and registration rollups"""
+    form_ids = db.query(Form.id).filter(Form.event_id == event_id)
+    responses = db.query(FormResponse).filter(FormResponse.form_id.in_(form_ids))
+    users = db.query(User).filter(User.eventId == event_id)
+    forms = db.query(Form).filter(Form.event_id == event_id)
+    # The registration trend covers the last 30 days, so it moves on by itself each day
+    return (date.today(),) + _aggregates(db,
+        db.query(Event.updated_at).filter(Event.id == event_id),
+        users.with_entities(func.count(User.id)), users.with_entities(func.max(User.updated_at)),
+        users.with_entities(func.count(User.college_id)), users.with_entities(func.sum(User.college_id)),
+        forms.with_entities(func.count(Form.id)), forms.with_entities(func.max(Form.updated_at)),
+        responses.with_entities(func.count(FormResponse.id)), responses.with_entities(func.max(FormResponse.id)),
+        db.query(func.count(Payment.payment_id)), db.query(func.max(Payment.updated_at)),
+        db.query(func.sum(RegistrationDailyRollup.registrations)).filter(RegistrationDailyRollup.event_id == event_id))
+
+def form_responses_version(db: Session, form_id: int) -> tuple:
+    return tuple(db.query(func.count(FormResponse.id), func.max(FormResponse.id)).filter(FormResponse.form_id == form_id).one())
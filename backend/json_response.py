@@ -0,0 +1,31 @@
+import decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+# Analytics dicts are sometimes keyed by ids or dates
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+def dumps(value: Any) -> bytes:
+    """orjson encoding with datetimes as ISO 8601, Decimals as numbers and anything else unknown as str()"""
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+class FastJSONResponse(ORJSONResponse):
+    """The API's default response class.
+
+    Endpoints returning dicts still go through FastAPI's jsonable_encoder
+    first; large ones return FastJSONResponse(payload) themselves, which skips
+    that pass, so their payloads must hold only JSON types, datetimes, dates
+    and Decimals.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
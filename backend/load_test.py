@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Event-Day Load Test
+Starts the API in-process (uvicorn on a local port) against a throwaway SQLite
+database, or any DATABASE_URL such as a local MySQL, seeds an event and replays
+event-day traffic patterns:
+
+  registration   OTP generation, OTP verification and registration of new users
+  attendance     every attendee submits the same attendance form at once
+  quiz           quiz submissions with live WebSocket dashboards attached
+  qa             Q/A question storm while a manager and an admin moderate
+  dashboard      admins polling the dashboard
+
+Results (throughput and p50/p95/p99 per endpoint) are printed and written as JSON,
+and --compare prints the change against an earlier result file.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import json
+import platform
+import random
+import secrets
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SCENARIOS = ["registration", "attendance", "quiz", "qa", "dashboard"]
+
+def configure_environment(database_url: Optional[str]) -> str:
+    """Point the app at the load-test database and switch off background jobs; must run before importing main"""
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'loadtest.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(16))
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "600")
+    os.environ["MAINTENANCE_INTERVAL_MINUTES"] = "0"
+    os.environ["COLLEGE_CLUSTER_INTERVAL_MINUTES"] = "0"
+    os.environ["SLOW_QUERY_DUMP_SECONDS"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    return database_url
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def latency_summary(samples: List[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(samples)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round((len(ordered) - errors) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0
+    }
+
+class ScenarioRecorder:
+    """Latencies and failures per endpoint label for one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.error_examples: Dict[str, str] = {}
+        self.extra: Dict[str, object] = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, label: str, seconds: float, ok: bool, detail: str = "") -> None:
+        self.samples.setdefault(label, []).append(seconds)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            self.error_examples.setdefault(label, detail[:200])
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        all_samples = [value for values in self.samples.values() for value in values]
+        result = {
+            "duration_s": round(elapsed, 2),
+            **latency_summary(all_samples, sum(self.errors.values()), elapsed),
+            "endpoints": {
+                label: latency_summary(values, self.errors.get(label, 0), elapsed)
+                for label, values in sorted(self.samples.items())
+            }
+        }
+        if self.error_examples:
+            result["error_examples"] = self.error_examples
+        result.update(self.extra)
+        return result
+
+async def timed(client, recorder: ScenarioRecorder, label: str, method: str, url: str, **kwargs):
+    """Send one request and record its latency; returns the response, or None on a transport error"""
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except Exception as e:
+        recorder.record(label, time.perf_counter() - start, False, repr(e))
+        return None
+    recorder.record(label, time.perf_counter() - start, response.status_code < 400, f"{response.status_code} {response.text}")
+    return response
+
+async def gather_limited(concurrency: int, jobs) -> None:
+    """Run coroutines with at most concurrency of them in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            await job
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+class LoadTestContext:
+    """Event, forms, attendees and tokens seeded for a run"""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.event_id = None
+        self.event_slug = None
+        self.attendance_hash = None
+        self.quiz_form_id = None
+        self.quiz_hash = None
+        self.quiz_answers: Dict[str, str] = {}
+        self.users: List[dict] = []
+        self.admin_token = None
+        self.manager_token = None
+
+def seed(ctx: LoadTestContext, users: int) -> None:
+    """Create the event, an attendance form, a quiz and registered attendees for this run"""
+    from auth import create_access_token, get_password_hash
+    from database import SessionLocal, Admin, Event, Form, FormQuestion, FormAnalytics, User, create_tables
+    from form_utils import generate_form_hash
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        # Only one event can run Q/A at a time
+        db.query(Event).filter(Event.qa_active == 1).update({Event.qa_active: 0})
+        event = Event(name=f"Load test {ctx.tag}", slug=f"loadtest-{ctx.tag}", event_date=str(datetime.now().date()), qa_active=1)
+        db.add(event)
+        password = get_password_hash(secrets.token_hex(8))
+        admin_email, manager_email = f"admin-{ctx.tag}@loadtest.example.com", f"manager-{ctx.tag}@loadtest.example.com"
+        db.add_all([Admin(email=admin_email, role="admin", hashed_password=password),
+                    Admin(email=manager_email, role="manager", hashed_password=password)])
+        db.flush()
+
+        attendance = Form(title=f"Attendance {ctx.tag}", type="attendance", event_id=event.id, created_by=admin_email, is_active=1)
+        quiz = Form(title=f"Quiz {ctx.tag}", type="quiz", event_id=event.id, created_by=admin_email, is_active=1)
+        db.add_all([attendance, quiz])
+        db.flush()
+        for index in range(10):
+            options = [f"Option {letter}" for letter in "ABCD"]
+            db.add(FormQuestion(form_id=quiz.id, question_text=f"Question {index + 1}", question_type="single_choice",
+                                options=json.dumps(options), correct_answer=options[index % 4], points=1, order_index=index))
+        db.add_all([FormAnalytics(form_id=attendance.id), FormAnalytics(form_id=quiz.id)])
+
+        db.bulk_insert_mappings(User, [{
+            "name": f"Attendee {i}",
+            "first_name": "Attendee",
+            "last_name": str(i),
+            "email": f"user{i}-{ctx.tag}@loadtest.example.com",
+            "college_name": f"College {i % 40}",
+            "registration_id": f"REG-{ctx.tag}-{i}",
+            "user_type": "student",
+            "eventId": event.id,
+            "email_verified": 1,
+            "created_at": datetime.now()
+        } for i in range(users)])
+        db.commit()
+
+        # Hashes must be computed from the stored rows, whose timestamps may be truncated
+        db.expire_all()
+        ctx.event_id, ctx.event_slug = event.id, event.slug
+        ctx.attendance_hash = generate_form_hash(db.get(Form, attendance.id))
+        ctx.quiz_form_id = quiz.id
+        ctx.quiz_hash = generate_form_hash(db.get(Form, quiz.id))
+        ctx.quiz_answers = {str(q.id): q.correct_answer for q in db.query(FormQuestion).filter(FormQuestion.form_id == quiz.id)}
+        ctx.users = [{"email": u.email, "name": u.name, "registration_id": u.registration_id}
+                     for u in db.query(User).filter(User.eventId == event.id).order_by(User.id)]
+        ctx.admin_token = create_access_token({"sub": admin_email})
+        ctx.manager_token = create_access_token({"sub": manager_email})
+    finally:
+        db.close()
+
+def latest_otp(email: str) -> Optional[str]:
+    from database import SessionLocal, OTP
+    db = SessionLocal()
+    try:
+        otp = db.query(OTP).filter(OTP.email == email, OTP.is_used == 0).order_by(OTP.id.desc()).first()
+        return otp.otp_code if otp else None
+    finally:
+        db.close()
+
+async def registration_scenario(client, ctx: LoadTestContext, recorder: ScenarioRecorder, args) -> None:
+    from main import STATIC_TOKEN
+    headers = {"Authorization": f"Bearer {STATIC_TOKEN}"}
+
+    async def register(index: int):
+        email = f"wave{index}-{ctx.tag}@loadtest.example.com"
+        if not await timed(client, recorder, "POST /generate-otp", "POST", "/generate-otp", json={"email": email}, headers=headers):
+            return
+        # Read the code the way the attendee would from their inbox (not timed)
+        otp = await asyncio.to_thread(latest_otp, email)
+        response = await timed(client, recorder, "POST /verify-otp", "POST", "/verify-otp",
+                               json={"email": email, "otp": otp or ""}, headers=headers)
+        if response is None or response.status_code >= 400:
+            return
+        await timed(client, recorder, "POST /register", "POST", "/register", headers=headers, json={
+            "name": f"Wave {index}",
+            "firstName": "Wave",
+            "lastName": str(index),
+            "email": email,
+            "phone_number": f"9{index:09d}",
+            "eventId": ctx.event_slug,
+            "custom_fields": {
+                "collegeName": f"College {index % 40}",
+                "userType": "student",
+                "registrationId": f"WAVE-{ctx.tag}-{index}",
+                "gender": random.choice(["Male", "Female"]),
+                "howDidYouHear": random.choice(["Instagram", "LinkedIn", "Friend"]),
+                "agreeToTerms": "yes"
+            }
+        })
+
+    await gather_limited(args.concurrency, [register(i) for i in range(args.users)])
+
+async def attendance_scenario(client, ctx: LoadTestContext, recorder: ScenarioRecorder, args) -> None:
+    url = f"/api/public/forms/{ctx.attendance_hash}/submit"
+
+    async def attend(user):
+        await timed(client, recorder, "GET /api/public/forms/{hash}", "GET", f"/api/public/forms/{ctx.attendance_hash}")
+        await timed(client, recorder, "POST /api/public/forms/{hash}/submit", "POST", url, json={
+            "form_id": 0,
+            "user_email": user["email"],
+            "user_name": user["name"],
+            "registration_id": user["registration_id"],
+            "responses": {}
+        })
+
+    await gather_limited(args.concurrency, [attend(user) for user in ctx.users])
+
+async def quiz_scenario(client, ctx: LoadTestContext, recorder: ScenarioRecorder, args) -> None:
+    import websockets
+
+    ws_url = f"{args.base_url.replace('http', 'ws', 1)}/ws/forms/{ctx.quiz_form_id}"
+    dashboards = [await websockets.connect(ws_url) for _ in range(args.dashboards)]
+    received = 0
+    expected = len(ctx.users) * len(dashboards)
+    done = asyncio.Event()
+
+    async def watch(ws):
+        nonlocal received
+        try:
+            async for message in ws:
+                data = json.loads(message)
+                if data.get("type") != "new_response":
+                    continue
+                # submitted_at is stamped (UTC) right before the broadcast starts
+                lag = (datetime.utcnow() - datetime.fromisoformat(data["submitted_at"])).total_seconds()
+                recorder.record("WS new_response broadcast", max(lag, 0), True)
+                received += 1
+                if received >= expected:
+                    done.set()
+        except websockets.ConnectionClosed:
+            pass
+
+    watchers = [asyncio.create_task(watch(ws)) for ws in dashboards]
+    url = f"/api/public/forms/{ctx.quiz_hash}/submit"
+
+    async def answer(user):
+        responses = {qid: (answer if random.random() < 0.7 else "Option A") for qid, answer in ctx.quiz_answers.items()}
+        await timed(client, recorder, "POST /api/public/forms/{hash}/submit", "POST", url, json={
+            "form_id": ctx.quiz_form_id,
+            "user_email": user["email"],
+            "user_name": user["name"],
+            "registration_id": user["registration_id"],
+            "responses": responses,
+            "time_taken": random.randint(60, 600)
+        })
+
+    await gather_limited(args.concurrency, [answer(user) for user in ctx.users])
+    try:
+        await asyncio.wait_for(done.wait(), timeout=10)
+    except asyncio.TimeoutError:
+        pass
+    for ws in dashboards:
+        await ws.close()
+    await asyncio.gather(*watchers, return_exceptions=True)
+    recorder.extra["websocket"] = {"dashboards": len(dashboards), "messages_expected": expected, "messages_received": received}
+
+async def qa_scenario(client, ctx: LoadTestContext, recorder: ScenarioRecorder, args) -> None:
+    manager_headers = {"Authorization": f"Bearer {ctx.manager_token}"}
+    admin_headers = {"Authorization": f"Bearer {ctx.admin_token}"}
+    submitting = True
+
+    async def ask(user):
+        await timed(client, recorder, "POST /api/qa/validate-user", "POST", "/api/qa/validate-user",
+                    json={"email": user["email"], "registration_id": user["registration_id"]})
+        await timed(client, recorder, "POST /api/qa/submit-question", "POST", "/api/qa/submit-question", json={
+            "user_email": user["email"],
+            "user_name": user["name"],
+            "registration_id": user["registration_id"],
+            "question": f"What about topic {random.randint(1, 50)}?"
+        })
+
+    async def moderate():
+        # The manager approves pending questions while the admin answers approved ones, until the storm is over
+        while True:
+            finished = not submitting
+            response = await timed(client, recorder, "GET /api/qa/manager-questions/{event_id}", "GET",
+                                   f"/api/qa/manager-questions/{ctx.event_id}", headers=manager_headers)
+            pending = response.json() if response is not None and response.status_code == 200 else []
+            for question in pending[:20]:
+                await timed(client, recorder, "POST /api/qa/manager-approve/{question_id}", "POST",
+                            f"/api/qa/manager-approve/{question['id']}", headers=manager_headers)
+            response = await timed(client, recorder, "GET /api/qa/admin-questions/{event_id}", "GET",
+                                   f"/api/qa/admin-questions/{ctx.event_id}", headers=admin_headers)
+            approved = response.json() if response is not None and response.status_code == 200 else []
+            for question in approved[:10]:
+                await timed(client, recorder, "POST /api/qa/admin-action", "POST", "/api/qa/admin-action",
+                            headers=admin_headers, json={"question_id": question["id"], "action": "answered", "response": "Answered live"})
+            if finished:
+                return
+            await asyncio.sleep(args.poll_interval)
+
+    moderator = asyncio.create_task(moderate())
+    await gather_limited(args.concurrency, [ask(user) for user in ctx.users])
+    submitting = False
+    await moderator
+
+async def dashboard_scenario(client, ctx: LoadTestContext, recorder: ScenarioRecorder, args) -> None:
+    headers = {"Authorization": f"Bearer {ctx.admin_token}"}
+    deadline = time.perf_counter() + args.duration
+    endpoints = [
+        ("GET /api/dashboard/summary", "/api/dashboard/summary"),
+        ("GET /api/dashboard/summary?event_id", f"/api/dashboard/summary?event_id={ctx.event_id}"),
+        ("GET /api/dashboard/stats", "/api/dashboard/stats"),
+        ("GET /api/events/{event_id}/analytics", f"/api/events/{ctx.event_id}/analytics"),
+        ("GET /api/forms", "/api/forms"),
+    ]
+
+    async def poll():
+        # Spread the pollers out like browsers opened at different times
+        await asyncio.sleep(random.random() * args.poll_interval)
+        while time.perf_counter() < deadline:
+            for label, path in endpoints:
+                await timed(client, recorder, label, "GET", path, headers=headers)
+            await asyncio.sleep(args.poll_interval)
+
+    await asyncio.gather(*(poll() for _ in range(args.pollers)))
+
+SCENARIO_RUNNERS = {
+    "registration": registration_scenario,
+    "attendance": attendance_scenario,
+    "quiz": quiz_scenario,
+    "qa": qa_scenario,
+    "dashboard": dashboard_scenario,
+}
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int):
+    """Serve main.app with uvicorn on a background thread; returns the server once it accepts connections"""
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, name="load-test-server", daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("API server did not start")
+        time.sleep(0.05)
+    return server, thread
+
+async def run_scenarios(args, ctx: LoadTestContext) -> Dict[str, dict]:
+    import httpx
+
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency + args.pollers + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        for name in args.scenarios:
+            recorder = ScenarioRecorder(name)
+            await SCENARIO_RUNNERS[name](client, ctx, recorder, args)
+            recorder.finished = time.perf_counter()
+            results[name] = recorder.summary()
+            print_scenario(name, results[name])
+    return results
+
+def print_scenario(name: str, result: dict) -> None:
+    print(f"\n{name}: {result['requests']} requests in {result['duration_s']}s, "
+          f"{result['throughput_rps']} req/s, {result['errors']} errors")
+    for label, stats in result["endpoints"].items():
+        print(f"  {label:48} n={stats['requests']:<6} p50 {stats['p50_ms']:8.1f} ms  "
+              f"p95 {stats['p95_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms  errors {stats['errors']}")
+    for label, example in result.get("error_examples", {}).items():
+        print(f"    first error on {label}: {example}")
+
+def compare(current: dict, baseline_path: str) -> None:
+    """Print the p95 and throughput change of every endpoint against an earlier result file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path}:")
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        for label, stats in result["endpoints"].items():
+            before = old["endpoints"].get(label)
+            if not before or not before["p95_ms"]:
+                continue
+            change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            print(f"  {name:12} {label:48} p95 {before['p95_ms']:8.1f} -> {stats['p95_ms']:8.1f} ms ({change:+.0f}%)")
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay event-day traffic against an in-process API server")
+    parser.add_argument("--database-url", help="Database to run against (default: a new SQLite file)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--users", type=int, default=300, help="Attendees per scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once")
+    parser.add_argument("--dashboards", type=int, default=20, help="WebSocket dashboards watching the quiz")
+    parser.add_argument("--pollers", type=int, default=10, help="Admins polling the dashboard")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of dashboard polling")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between dashboard/moderation polls")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for generated answers")
+    parser.add_argument("--output", default="load_test_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier results file to compare p95 latencies with")
+
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIO_RUNNERS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    random.seed(args.seed)
+
+    database_url = configure_environment(args.database_url)
+    ctx = LoadTestContext(tag=secrets.token_hex(3))
+    seed(ctx, args.users)
+    server, thread = start_server(_free_port())
+    args.base_url = f"http://127.0.0.1:{server.config.port}"
+    print(f"Load testing {args.base_url} on {database_url.split('@')[-1]} with {args.users} users, concurrency {args.concurrency}")
+
+    started_at = datetime.now()
+    try:
+        scenarios = asyncio.run(run_scenarios(args, ctx))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": database_url.split("://")[0],
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "dashboards": args.dashboards,
+            "pollers": args.pollers,
+            "duration_s": args.duration,
+            "seed": args.seed
+        },
+        "scenarios": scenarios
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+    sys.exit(1 if any(result["errors"] for result in scenarios.values()) else 0)
@@ -1,13 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Response as FastAPIResponse, Header, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response as FastAPIResponse, Header, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.security import HTTPBearer, HTTPBasic, HTTPBasicCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from datetime import timedelta, datetime
 from typing import List, Optional
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import smtplib
 from email.mime.text import MIMEText
@@ -21,10 +23,11 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import json
+import base64
 from typing import Dict, Set
 
-from database import get_db, create_tables, Admin, Event, Student, User, EmailSettings, EmailTemplate, Form, FormQuestion, FormResponse, FormAnalytics, QAQuestion, UserQuestionCount, OTP
-from auth import verify_password, get_password_hash, create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from database import engine, get_db, create_tables, Admin, Event, Student, User, College, EmailSettings, EmailTemplate, Form, FormQuestion, FormResponse, FormAnalytics, QAQuestion, UserQuestionCount, OTP
+from auth import verify_password, get_password_hash, create_access_token, verify_token, Principal, get_current_principal, invalidate_principal, ACCESS_TOKEN_EXPIRE_MINUTES
 from chat_routes import router as chat_router
 from chat_models import Question, Poll, PollResult, ChatAdmin
 from forms_routes import router as forms_router
@@ -32,16 +35,91 @@ from forms_routes import router as forms_router
 
 from payment_api import router as payment_router
 from payment_model import Payment
+from form_views import form_view_counter
+from audit_log import audit_log_writer, log_audit_action
+from maintenance import MAINTENANCE_INTERVAL_MINUTES, run_periodic_maintenance
+from streaming_export import iter_query, json_array_chunks, export_response
+from json_response import FastJSONResponse
+from http_caching import CompressionMiddleware, check_etag, with_etag, users_version, event_analytics_version
+from user_search import user_search_index
+from registration_rollup import registration_rollup, daily_registrations, dimension_counts
+from metrics import (
+    METRICS_MULTIPROC_DIR,
+    REGISTRY,
+    WEBSOCKET_CONNECTIONS,
+    EMAIL_OUTBOX,
+    EMAILS_SENT,
+    MetricsMiddleware,
+    instrument_engine,
+    collect_threadpool,
+    collect_all,
+    render,
+    run_periodic_snapshot
+)
+from query_budget import QueryBudgetMiddleware
+from slow_queries import SLOW_QUERY_DUMP_SECONDS, SORT_KEYS, slow_query_recorder
+from app_logging import configure_logging, get_logger, shutdown_logging, RequestIdMiddleware
+from profiling import PROFILING_ENABLED, ProfilingMiddleware, create_profile_token, list_profiles, read_profile
+from dashboard import DASHBOARD_WIDGETS, DashboardContext, get_widget, dashboard_summary, parse_widgets
+from colleges import COLLEGE_CLUSTER_INTERVAL_MINUTES, run_periodic_college_clustering, resolve_college_id, college_filter
+from user_listing import (
+    USER_SORT_PATTERN,
+    STUDENT_FIELDS,
+    USER_LIST_FIELDS,
+    student_row,
+    user_list_row,
+    users_with_events,
+    filter_users,
+    sort_users,
+    projection,
+    paginate_users
+)
+
+configure_logging()
+logger = get_logger("main")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    configure_logging()
     create_tables()
+    view_flush_task = asyncio.create_task(form_view_counter.run_periodic_flush())
+    audit_flush_task = asyncio.create_task(audit_log_writer.run_periodic_flush())
+    rollup_flush_task = asyncio.create_task(registration_rollup.run_periodic_flush())
+    maintenance_task = None
+    if MAINTENANCE_INTERVAL_MINUTES > 0:
+        maintenance_task = asyncio.create_task(run_periodic_maintenance())
+    college_task = None
+    if COLLEGE_CLUSTER_INTERVAL_MINUTES > 0:
+        college_task = asyncio.create_task(run_periodic_college_clustering())
+    metrics_task = None
+    if METRICS_MULTIPROC_DIR:
+        metrics_task = asyncio.create_task(run_periodic_snapshot())
+    slow_query_task = None
+    if SLOW_QUERY_DUMP_SECONDS > 0:
+        slow_query_task = asyncio.create_task(slow_query_recorder.run_periodic_dump())
+    # Build the user search index in the background; searches fall back to LIKE until it is ready
+    user_search_index.start_rebuild()
 
     yield
-    # Shutdown (if needed)
-
-app = FastAPI(title="Dashboard API", version="1.0.0", lifespan=lifespan)
+    # Shutdown
+    view_flush_task.cancel()
+    audit_flush_task.cancel()
+    rollup_flush_task.cancel()
+    if maintenance_task:
+        maintenance_task.cancel()
+    if college_task:
+        college_task.cancel()
+    if metrics_task:
+        metrics_task.cancel()
+    if slow_query_task:
+        slow_query_task.cancel()
+    form_view_counter.flush_now()
+    audit_log_writer.flush_now()
+    registration_rollup.flush_now()
+    shutdown_logging()
+
+app = FastAPI(title="Dashboard API", version="1.0.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # WebSocket connection manager for forms
 class ConnectionManager:
@@ -105,6 +183,12 @@ class QAConnectionManager:
 
 qa_manager = QAConnectionManager()
 
+def collect_websocket_connections():
+    WEBSOCKET_CONNECTIONS.set(sum(len(connections) for connections in manager.active_connections.values()), "forms")
+    WEBSOCKET_CONNECTIONS.set(len(qa_manager.active_connections), "qa")
+
+REGISTRY.add_collector(collect_websocket_connections)
+
 # Include forms routes
 app.include_router(forms_router, prefix="/api")
 
@@ -126,6 +210,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large JSON and text responses
+app.add_middleware(CompressionMiddleware)
+
+# Per-request query counting and N+1 warnings
+app.add_middleware(QueryBudgetMiddleware)
+
+# Opt-in request profiling; not installed at all when disabled
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request metrics for /metrics
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+# Time per statement fingerprint for /api/admin/slow-queries
+slow_query_recorder.instrument(engine)
+
+# Outermost, so every log record of a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 # Pydantic models
 class LoginRequest(BaseModel):
     email: str
@@ -299,18 +404,13 @@ def verify_static_token(authorization: str = Header(None)):
 @app.get("/api/qa/active-event")
 def get_active_qa_event(db: Session = Depends(get_db)):
     try:
-        print("Checking for active Q/A event...")
-        
         # Check if there's an active event with Q/A enabled
         active_event = db.query(Event).filter(Event.qa_active == 1).first()
         if not active_event:
-            print("No active Q/A event found")
-            # List all events for debugging
-            all_events = db.query(Event).all()
-            print(f"All events: {[(e.id, e.name, getattr(e, 'qa_active', 0)) for e in all_events]}")
+            logger.info("No active Q/A event found", sample=0.1)
             raise HTTPException(status_code=404, detail="No active Q/A session found")
         
-        print(f"Active Q/A event found: {active_event.name} (ID: {active_event.id})")
+        logger.debug("Active Q/A event found", event_id=active_event.id, sample=0.01)
         
         return {
             "id": active_event.id,
@@ -322,23 +422,19 @@ def get_active_qa_event(db: Session = Depends(get_db)):
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error in get_active_qa_event: {str(e)}")
+    except Exception:
+        logger.exception("Error in get_active_qa_event")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/api/qa/validate-user")
 def validate_qa_user(validation_data: QAValidationRequest, db: Session = Depends(get_db)):
     try:
-        print(f"Validating user: email={validation_data.email}, reg_id={validation_data.registration_id}")
-        
         # Get the active event first
         active_event = db.query(Event).filter(Event.qa_active == 1).first()
         if not active_event:
-            print("No active Q/A event found")
+            logger.info("Q/A validation without an active event", sample=0.1)
             raise HTTPException(status_code=404, detail="No active Q/A session found")
         
-        print(f"Active Q/A event: {active_event.name} (ID: {active_event.id})")
-        
         # Find user by email and registration_id
         user = db.query(User).filter(
             User.email == validation_data.email,
@@ -346,20 +442,13 @@ def validate_qa_user(validation_data: QAValidationRequest, db: Session = Depends
         ).first()
         
         if not user:
-            print(f"User not found with email: {validation_data.email} and reg_id: {validation_data.registration_id}")
-            # Debug: Check if user exists with just email
-            user_by_email = db.query(User).filter(User.email == validation_data.email).first()
-            if user_by_email:
-                print(f"User exists with email but different reg_id. Expected: {validation_data.registration_id}, Found: {user_by_email.registration_id}")
+            logger.info("Q/A validation failed", email=validation_data.email, event_id=active_event.id)
             raise HTTPException(status_code=404, detail="Invalid credentials. Please check your registration ID.")
         
-        print(f"User found: {user.name} (Email: {user.email})")
-        
-        # Check if user is registered for the active event
+        # Users registered for another event are still allowed
         if user.eventId != active_event.id:
-            print(f"User event ID ({user.eventId}) doesn't match active event ID ({active_event.id})")
-            # Still allow if user is registered for any event
-            pass
+            logger.debug("Q/A user registered for another event", email=user.email, user_event_id=user.eventId, event_id=active_event.id)
+        logger.debug("Q/A user validated", email=user.email, event_id=active_event.id, sample=0.1)
         
         user_name = user.name or f"{user.first_name or ''} {user.last_name or ''}".strip()
         
@@ -373,8 +462,8 @@ def validate_qa_user(validation_data: QAValidationRequest, db: Session = Depends
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error in validate_qa_user: {str(e)}")
+    except Exception:
+        logger.exception("Error in validate_qa_user")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/api/qa/submit-question")
@@ -479,22 +568,20 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/auth/me")
-def get_current_user(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not admin:
+def get_current_user(principal: Principal = Depends(get_current_principal)):
+    if not principal.is_admin_account:
         raise HTTPException(status_code=404, detail="User not found")
     
     return {
-        "id": admin.id,
-        "email": admin.email,
-        "role": admin.role
+        "id": principal.admin_id,
+        "email": principal.email,
+        "role": principal.role
     }
 
 @app.post("/api/auth/create-admin")
-def create_admin(admin_data: AdminCreate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def create_admin(admin_data: AdminCreate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if current user is admin or manager (presenters cannot create users)
-    current_admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not current_admin or current_admin.role not in ["admin", "manager"]:
+    if principal.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Only admins and managers can create new users")
     
     # Validate role
@@ -519,6 +606,7 @@ def create_admin(admin_data: AdminCreate, current_user: str = Depends(verify_tok
     db.add(new_admin)
     db.commit()
     db.refresh(new_admin)
+    invalidate_principal(new_admin.email)
     
     return {"message": "Admin created successfully", "admin_id": new_admin.id}
 
@@ -536,6 +624,7 @@ def reset_password(password_data: PasswordResetRequest, current_user: str = Depe
     # Update password
     admin.hashed_password = get_password_hash(password_data.new_password)
     db.commit()
+    invalidate_principal(current_user)
     
     return {"message": "Password updated successfully"}
 
@@ -572,49 +661,51 @@ def validate_email(validation_data: EmailValidationRequest, db: Session = Depend
         print(f"Error validating email: {str(e)}")
         raise HTTPException(status_code=500, detail="Validation failed")
 
+def format_event_date(event_date) -> tuple:
+    """(formatted datetime, date part, time part) of a stored event date string"""
+    event_date_str = str(event_date) if event_date else ""
+    
+    # Try to parse the date string and format it properly
+    try:
+        if event_date_str and event_date_str != "None":
+            # Handle different possible formats
+            if ' ' in event_date_str:
+                # Format: "2024-01-15 14:30:00" or "2024-01-15 14:30"
+                parts = event_date_str.split(' ', 1)
+                date_part = parts[0]
+                time_part = parts[1] if len(parts) > 1 else "00:00"
+            else:
+                # Only date provided
+                date_part = event_date_str
+                time_part = "00:00"
+            
+            # Validate and format the datetime
+            try:
+                # Parse to validate
+                dt = datetime.strptime(f"{date_part} {time_part}", "%Y-%m-%d %H:%M:%S" if ":" in time_part and time_part.count(":") == 2 else "%Y-%m-%d %H:%M")
+                formatted_datetime = dt.strftime("%Y-%m-%d %H:%M:%S")
+            except:
+                # Fallback to original if parsing fails
+                formatted_datetime = event_date_str
+                date_part = event_date_str.split(' ')[0] if ' ' in event_date_str else event_date_str
+                time_part = ' '.join(event_date_str.split(' ')[1:]) if ' ' in event_date_str else "00:00"
+        else:
+            formatted_datetime = ""
+            date_part = ""
+            time_part = "00:00"
+    except Exception as ex:
+        # Fallback for any parsing errors
+        formatted_datetime = event_date_str
+        date_part = event_date_str.split(' ')[0] if event_date_str and ' ' in event_date_str else event_date_str
+        time_part = ' '.join(event_date_str.split(' ')[1:]) if event_date_str and ' ' in event_date_str else "00:00"
+    return formatted_datetime, date_part, time_part
+
 @app.get("/api/events")
 def get_events(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
     events = db.query(Event).all()
     result = []
     for e in events:
-        # Parse event date and time properly
-        event_date_str = str(e.event_date) if e.event_date else ""
-        
-        # Try to parse the date string and format it properly
-        try:
-            if event_date_str and event_date_str != "None":
-                # Handle different possible formats
-                if ' ' in event_date_str:
-                    # Format: "2024-01-15 14:30:00" or "2024-01-15 14:30"
-                    parts = event_date_str.split(' ', 1)
-                    date_part = parts[0]
-                    time_part = parts[1] if len(parts) > 1 else "00:00"
-                else:
-                    # Only date provided
-                    date_part = event_date_str
-                    time_part = "00:00"
-                
-                # Validate and format the datetime
-                from datetime import datetime
-                try:
-                    # Parse to validate
-                    dt = datetime.strptime(f"{date_part} {time_part}", "%Y-%m-%d %H:%M:%S" if ":" in time_part and time_part.count(":") == 2 else "%Y-%m-%d %H:%M")
-                    formatted_datetime = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except:
-                    # Fallback to original if parsing fails
-                    formatted_datetime = event_date_str
-                    date_part = event_date_str.split(' ')[0] if ' ' in event_date_str else event_date_str
-                    time_part = ' '.join(event_date_str.split(' ')[1:]) if ' ' in event_date_str else "00:00"
-            else:
-                formatted_datetime = ""
-                date_part = ""
-                time_part = "00:00"
-        except Exception as ex:
-            # Fallback for any parsing errors
-            formatted_datetime = event_date_str
-            date_part = event_date_str.split(' ')[0] if event_date_str and ' ' in event_date_str else event_date_str
-            time_part = ' '.join(event_date_str.split(' ')[1:]) if event_date_str and ' ' in event_date_str else "00:00"
-        
+        formatted_datetime, date_part, time_part = format_event_date(e.event_date)
         result.append({
             "id": e.id, 
             "name": e.name, 
@@ -623,16 +714,15 @@ def get_events(current_user: str = Depends(verify_token), db: Session = Depends(
             "date_part": date_part,
             "time_part": time_part,
             "qa_active": e.qa_active or 0, 
-            "created_at": str(e.created_at)
+            "created_at": e.created_at
         })
     return result
 
 @app.post("/api/events")
-def create_event(event_data: EventCreate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def create_event(event_data: EventCreate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     try:
         # Check if user is presenter (view-only)
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if admin and admin.role == "presenter":
+        if principal.role == "presenter":
             raise HTTPException(status_code=403, detail="View Only - Presenters cannot create events")
         
         # Validate required fields
@@ -652,9 +742,8 @@ def create_event(event_data: EventCreate, current_user: str = Depends(verify_tok
         db.refresh(new_event)
         
         # Log audit action
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        user_role = admin.role if admin else "unknown"
-        log_audit_action(db, current_user, user_role, "create_event", "event", new_event.id, f"Created event: {event_data.name}")
+        user_role = principal.role or "unknown"
+        log_audit_action(current_user, user_role, "create_event", "event", new_event.id, f"Created event: {event_data.name}")
         
         return {"id": new_event.id, "name": new_event.name, "slug": new_event.slug, "event_date": str(new_event.event_date)}
     except ValueError as e:
@@ -794,6 +883,7 @@ def register_user(user_data: UserRegistration, token: str = Depends(verify_stati
             phone_number=user_data.phone_number,
             primary_email=user_data.custom_fields.primaryEmail or "",
             college_name=user_data.custom_fields.collegeName or "",
+            college_id=resolve_college_id(db, user_data.custom_fields.collegeName),
             year_semester=user_data.custom_fields.yearSemester or "",
             course=user_data.custom_fields.course or "",
             specify_course=user_data.custom_fields.specifyCourse or "",
@@ -813,6 +903,8 @@ def register_user(user_data: UserRegistration, token: str = Depends(verify_stati
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
+        user_search_index.add_user(new_user)
+        registration_rollup.record(new_user)
         
         return {
             "message": "Registration successful",
@@ -829,11 +921,10 @@ def register_user(user_data: UserRegistration, token: str = Depends(verify_stati
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/events/{event_id}")
-def update_event(event_id: int, event_data: EventUpdate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def update_event(event_id: int, event_data: EventUpdate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     try:
         # Check if user is presenter (view-only)
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if admin and admin.role == "presenter":
+        if principal.role == "presenter":
             raise HTTPException(status_code=403, detail="View Only - Presenters cannot edit events")
         
         event = db.query(Event).filter(Event.id == event_id).first()
@@ -857,9 +948,8 @@ def update_event(event_id: int, event_data: EventUpdate, current_user: str = Dep
         db.commit()
         
         # Log audit action
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        user_role = admin.role if admin else "unknown"
-        log_audit_action(db, current_user, user_role, "edit_event", "event", event_id, f"Updated event: {event_data.name}")
+        user_role = principal.role or "unknown"
+        log_audit_action(current_user, user_role, "edit_event", "event", event_id, f"Updated event: {event_data.name}")
         
         return {"id": event.id, "name": event.name, "slug": event.slug, "event_date": str(event.event_date)}
     except ValueError as e:
@@ -869,11 +959,10 @@ def update_event(event_id: int, event_data: EventUpdate, current_user: str = Dep
         raise HTTPException(status_code=500, detail=f"Error updating event: {str(e)}")
 
 @app.delete("/api/events/{event_id}")
-def delete_event(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def delete_event(event_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     try:
         # Check if user is presenter (view-only)
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if admin and admin.role == "presenter":
+        if principal.role == "presenter":
             raise HTTPException(status_code=403, detail="View Only - Presenters cannot delete events")
         
         event = db.query(Event).filter(Event.id == event_id).first()
@@ -885,26 +974,37 @@ def delete_event(event_id: int, current_user: str = Depends(verify_token), db: S
         db.commit()
         
         # Log audit action
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        user_role = admin.role if admin else "unknown"
-        log_audit_action(db, current_user, user_role, "delete_event", "event", event_id, f"Deleted event: {event_name}")
+        user_role = principal.role or "unknown"
+        log_audit_action(current_user, user_role, "delete_event", "event", event_id, f"Deleted event: {event_name}")
         
         return {"message": "Event deleted successfully"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting event: {str(e)}")
 
-@app.get("/api/events/{event_id}/students")
-def get_event_students(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    users = db.query(User).filter(User.eventId == event_id).all()
-    return [{
+def event_student_row(u):
+    return {
         "id": u.id, 
         "name": u.name or f"{u.first_name or ''} {u.last_name or ''}".strip(), 
         "email": u.email, 
         "phone": u.phone_number, 
         "college": u.college_name,
-        "registered_at": str(u.created_at)
-    } for u in users]
+        "registered_at": u.created_at
+    }
+
+EVENT_STUDENT_FIELDS = ["id", "name", "email", "phone", "college", "registered_at"]
+
+@app.get("/api/events/{event_id}/students")
+def get_event_students(event_id: int, current_user: str = Depends(verify_token)):
+    # Streamed so large events never sit in memory as one list
+    rows = iter_query(lambda session: session.query(User).filter(User.eventId == event_id).order_by(User.id))
+    return StreamingResponse(json_array_chunks(rows, event_student_row), media_type="application/json")
+
+@app.get("/api/events/{event_id}/students/export")
+def export_event_students(event_id: int, format: str = Query("csv", pattern="^(ndjson|csv)$"), current_user: str = Depends(verify_token)):
+    rows = iter_query(lambda session: session.query(User).filter(User.eventId == event_id).order_by(User.id))
+    filename = f"event_{event_id}_students_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return export_response(rows, event_student_row, format, fieldnames=EVENT_STUDENT_FIELDS, filename=filename)
 
 @app.post("/api/users")
 def create_user(user_data: UserCreate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
@@ -915,11 +1015,14 @@ def create_user(user_data: UserCreate, current_user: str = Depends(verify_token)
         email=user_data.email,
         phone_number=user_data.phone_number,
         college_name=user_data.college_name,
+        college_id=resolve_college_id(db, user_data.college_name),
         eventId=user_data.eventId
     )
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    user_search_index.add_user(new_user)
+    registration_rollup.record(new_user)
     return {"id": new_user.id, "name": new_user.name, "email": new_user.email}
 
 # Email Templates endpoints - using MySQL
@@ -935,7 +1038,7 @@ def get_email_templates(current_user: str = Depends(verify_token), db: Session =
     } for t in templates]
 
 @app.post("/api/email-templates")
-def create_email_template(template_data: EmailTemplateCreate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def create_email_template(template_data: EmailTemplateCreate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     new_template = EmailTemplate(
         name=template_data.name,
         subject=template_data.subject,
@@ -947,9 +1050,8 @@ def create_email_template(template_data: EmailTemplateCreate, current_user: str
     db.refresh(new_template)
     
     # Log audit action
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "create_email_template", "email_template", new_template.id, f"Created email template: {template_data.name}")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "create_email_template", "email_template", new_template.id, f"Created email template: {template_data.name}")
     
     return {"id": new_template.id, "message": "Template created successfully"}
 
@@ -968,7 +1070,7 @@ def get_email_template(template_id: int, current_user: str = Depends(verify_toke
     }
 
 @app.put("/api/email-templates/{template_id}")
-def update_email_template(template_id: int, template_data: EmailTemplateCreate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def update_email_template(template_id: int, template_data: EmailTemplateCreate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     template = db.query(EmailTemplate).filter(EmailTemplate.id == template_id).first()
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
@@ -981,23 +1083,21 @@ def update_email_template(template_id: int, template_data: EmailTemplateCreate,
     db.commit()
     
     # Log audit action
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "edit_email_template", "email_template", template_id, f"Updated email template: {template_data.name}")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "edit_email_template", "email_template", template_id, f"Updated email template: {template_data.name}")
     
     return {"id": template.id, "message": "Template updated successfully"}
 
 @app.delete("/api/email-templates/{template_id}")
-def delete_email_template(template_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def delete_email_template(template_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     template = db.query(EmailTemplate).filter(EmailTemplate.id == template_id).first()
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
     # Log audit action before deletion
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
+    user_role = principal.role or "unknown"
     template_name = template.name
-    log_audit_action(db, current_user, user_role, "delete_email_template", "email_template", template_id, f"Deleted email template: {template_name}")
+    log_audit_action(current_user, user_role, "delete_email_template", "email_template", template_id, f"Deleted email template: {template_name}")
     
     db.delete(template)
     db.commit()
@@ -1109,23 +1209,33 @@ def test_email_connection(test_request: TestEmailRequest, current_user: str = De
                 pass
 
 # Get all users for email sending from MySQL users table only
+def list_students(db: Session, limit: Optional[int], cursor: Optional[str], sort: str, fields: Optional[str]):
+    """Keyset page of students when limit/cursor is given, otherwise the full list streamed as a JSON array"""
+    serialize = projection(student_row, fields, STUDENT_FIELDS)
+    if limit is None and cursor is None:
+        rows = iter_query(lambda session: sort_users(users_with_events(session), sort))
+        return StreamingResponse(json_array_chunks(rows, serialize), media_type="application/json")
+    
+    students, next_cursor, total_count, estimated = paginate_users(
+        db, users_with_events(db), serialize, limit or 100, cursor, sort, filtered=False
+    )
+    return FastJSONResponse({
+        "students": students,
+        "next_cursor": next_cursor,
+        "total_count": total_count,
+        "total_count_estimated": estimated
+    })
+
 @app.get("/api/students")
-def get_all_students(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    # Join users with events to get event names
-    users_with_events = db.query(User, Event.name.label('event_name')).outerjoin(
-        Event, User.eventId == Event.id
-    ).all()
-    
-    return [{
-        "id": str(user.User.id),
-        "name": user.User.name or f"{user.User.first_name or ''} {user.User.last_name or ''}".strip(),
-        "email": user.User.email,
-        "phone": user.User.phone_number,
-        "event_id": user.User.eventId,
-        "event_name": user.event_name or "Unknown Event",
-        "college": user.User.college_name or "",
-        "registered_at": str(user.User.created_at)
-    } for user in users_with_events]
+def get_all_students(
+    current_user: str = Depends(verify_token),
+    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern=USER_SORT_PATTERN),
+    fields: Optional[str] = None
+):
+    return list_students(db, limit, cursor, sort, fields)
 
 # Public endpoints
 @app.get("/api/public/event/{slug}")
@@ -1164,36 +1274,40 @@ def check_user_exists(email: str, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/students-protected")
-def get_all_students_protected(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    # Join users with events to get event names
-    users_with_events = db.query(User, Event.name.label('event_name')).outerjoin(
-        Event, User.eventId == Event.id
-    ).all()
-    
-    return [{
-        "id": str(user.User.id),
-        "name": user.User.name or f"{user.User.first_name or ''} {user.User.last_name or ''}".strip(),
-        "email": user.User.email,
-        "phone": user.User.phone_number,
-        "event_id": user.User.eventId,
-        "event_name": user.event_name or "Unknown Event",
-        "college": user.User.college_name or "",
-        "registered_at": str(user.User.created_at)
-    } for user in users_with_events]
+def get_all_students_protected(
+    current_user: str = Depends(verify_token),
+    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern=USER_SORT_PATTERN),
+    fields: Optional[str] = None
+):
+    return list_students(db, limit, cursor, sort, fields)
 
 # Get colleges endpoint
 @app.get("/api/colleges")
 def get_colleges(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
     from sqlalchemy import func
-    colleges = db.query(User.college_name).filter(
+    colleges = [college.name for college in db.query(College.name).order_by(College.name).all()]
+    # Spellings registered since the last clustering run are listed as entered
+    unassigned = db.query(User.college_name).filter(
+        User.college_id.is_(None),
         User.college_name.isnot(None),
         User.college_name != ''
     ).distinct().all()
-    return {"colleges": [college[0] for college in colleges]}
+    return {"colleges": colleges + [college[0] for college in unassigned if college[0] not in colleges]}
 
 # Send email endpoint
+def personalize_template(text: str, user) -> str:
+    """Fill the {{name}}, {{email}}, {{phone}} and {{college}} placeholders of an email template for one user"""
+    user_name = user.name or f"{user.first_name or ''} {user.last_name or ''}".strip()
+    text = text.replace("{{name}}", user_name)
+    text = text.replace("{{email}}", user.email)
+    text = text.replace("{{phone}}", user.phone_number or "")
+    return text.replace("{{college}}", user.college_name or "")
+
 @app.post("/api/send-email")
-def send_email(email_request: SendEmailRequest, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def send_email(email_request: SendEmailRequest, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Get email settings
     email_settings = db.query(EmailSettings).first()
     if not email_settings:
@@ -1214,6 +1328,7 @@ def send_email(email_request: SendEmailRequest, current_user: str = Depends(veri
     failed_emails = []
     
     server = None
+    pending = 0
     try:
         # Setup SMTP with proper SSL/TLS handling
         if email_settings.smtp_port == 465:
@@ -1226,25 +1341,16 @@ def send_email(email_request: SendEmailRequest, current_user: str = Depends(veri
         
         server.login(email_settings.smtp_username, email_settings.smtp_password)
         
+        pending = len(users)
+        EMAIL_OUTBOX.inc(amount=pending)
         for user in users:
+            pending -= 1
+            EMAIL_OUTBOX.dec()
             try:
                 # Create personalized email content
-                user_name = user.name or f"{user.first_name or ''} {user.last_name or ''}".strip()
                 user_email = user.email
-                user_phone = user.phone_number or ""
-                user_college = user.college_name or ""
-                
-                # Personalize content
-                content = template.content.replace("{{name}}", user_name)
-                content = content.replace("{{email}}", user_email)
-                content = content.replace("{{phone}}", user_phone)
-                content = content.replace("{{college}}", user_college)
-                
-                # Personalize subject
-                subject = template.subject.replace("{{name}}", user_name)
-                subject = subject.replace("{{email}}", user_email)
-                subject = subject.replace("{{phone}}", user_phone)
-                subject = subject.replace("{{college}}", user_college)
+                content = personalize_template(template.content, user)
+                subject = personalize_template(template.subject, user)
                 
                 msg = MIMEMultipart()
                 msg['From'] = email_settings.from_email
@@ -1255,14 +1361,15 @@ def send_email(email_request: SendEmailRequest, current_user: str = Depends(veri
                 
                 server.send_message(msg)
                 sent_count += 1
+                EMAILS_SENT.inc("sent")
                 
             except Exception as e:
                 failed_emails.append({"email": user.email, "error": str(e)})
+                EMAILS_SENT.inc("failed")
         
         # Log audit action for email sending
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        user_role = admin.role if admin else "unknown"
-        log_audit_action(db, current_user, user_role, "send_email", "email_campaign", template.id, f"Sent email '{template.name}' to {sent_count} students")
+        user_role = principal.role or "unknown"
+        log_audit_action(current_user, user_role, "send_email", "email_campaign", template.id, f"Sent email '{template.name}' to {sent_count} students")
         
         
     except smtplib.SMTPAuthenticationError:
@@ -1276,6 +1383,7 @@ def send_email(email_request: SendEmailRequest, current_user: str = Depends(veri
         else:
             raise HTTPException(status_code=500, detail=f"SMTP connection failed: {error_msg}")
     finally:
+        EMAIL_OUTBOX.dec(amount=pending)
         if server:
             try:
                 server.quit()
@@ -1294,217 +1402,44 @@ def send_email(email_request: SendEmailRequest, current_user: str = Depends(veri
 # Dashboard statistics endpoints
 @app.get("/api/dashboard/stats")
 def get_dashboard_stats(event_id: Optional[int] = None, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    from datetime import datetime, timedelta
-    from sqlalchemy import func, and_
-    
-    # Base query with optional event filter
-    base_query = db.query(User)
-    if event_id:
-        base_query = base_query.filter(User.eventId == event_id)
-    
-    # Total registrations from users table
-    total_registrations = base_query.count() or 0
-    
-    # Today's registrations
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_registrations = base_query.filter(
-        User.created_at >= today
-    ).count() or 0
-    
-    # This week's registrations
-    week_start = today - timedelta(days=today.weekday())
-    week_registrations = base_query.filter(
-        User.created_at >= week_start
-    ).count() or 0
-    
-    # Get events count
-    total_events = db.query(func.count(Event.id)).scalar() or 0
-    
-    return {
-        "total_registrations": total_registrations,
-        "today_registrations": today_registrations,
-        "week_registrations": week_registrations,
-        "total_events": total_events
-    }
+    return get_widget(DashboardContext(db, event_id), "stats")
 
 @app.get("/api/dashboard/registration-chart")
 def get_registration_chart_data(event_id: Optional[int] = None, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    from datetime import datetime, timedelta
-    from sqlalchemy import func
-    
-    # Get last 7 days registration data
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    seven_days_ago = today - timedelta(days=6)
-    
-    query = db.query(
-        func.date(User.created_at).label('date'),
-        func.count(User.id).label('count')
-    ).filter(
-        User.created_at >= seven_days_ago
-    )
-    
-    if event_id:
-        query = query.filter(User.eventId == event_id)
-    
-    daily_data = query.group_by(func.date(User.created_at)).order_by(func.date(User.created_at)).all()
-    
-    # Create labels and data for last 7 days
-    labels = []
-    data = []
-    
-    for i in range(7):
-        date = seven_days_ago + timedelta(days=i)
-        day_label = date.strftime('%a')  # Mon, Tue, etc.
-        labels.append(day_label)
-        
-        # Find count for this date
-        count = 0
-        for daily in daily_data:
-            if str(daily.date) == str(date.date()):
-                count = daily.count
-                break
-        data.append(count)
-    
-    return {
-        "labels": labels,
-        "data": data
-    }
+    return get_widget(DashboardContext(db, event_id), "registration_chart")
 
 @app.get("/api/dashboard/monthly-registrations")
 def get_monthly_registrations(event_id: Optional[int] = None, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    from datetime import datetime, timedelta
-    from sqlalchemy import func, extract
-    
-    # Get last 9 months data
-    current_date = datetime.now()
-    nine_months_ago = current_date - timedelta(days=270)
-    
-    query = db.query(
-        extract('year', User.created_at).label('year'),
-        extract('month', User.created_at).label('month'),
-        func.count(User.id).label('count')
-    ).filter(
-        User.created_at >= nine_months_ago
-    )
-    
-    if event_id:
-        query = query.filter(User.eventId == event_id)
-    
-    monthly_data = query.group_by(
-        extract('year', User.created_at),
-        extract('month', User.created_at)
-    ).order_by(
-        extract('year', User.created_at),
-        extract('month', User.created_at)
-    ).all()
-    
-    # Create month labels and data
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    
-    labels = []
-    data = []
-    
-    # Generate last 9 months
-    for i in range(9):
-        target_date = current_date - timedelta(days=30 * (8 - i))
-        month_label = month_names[target_date.month - 1]
-        labels.append(month_label)
-        
-        # Find count for this month
-        count = 0
-        for monthly in monthly_data:
-            if monthly.year == target_date.year and monthly.month == target_date.month:
-                count = monthly.count
-                break
-        data.append(count)
-    
-    return {
-        "labels": labels,
-        "data": data
-    }
+    return get_widget(DashboardContext(db, event_id), "monthly_registrations")
 
 @app.get("/api/dashboard/event-payments")
 def get_event_payments(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    from sqlalchemy import func
-    
-    try:
-        # Get payment counts by event through user emails
-        event_payments = db.query(
-            Event.name,
-            func.count(Payment.payment_id).label('paid_count')
-        ).outerjoin(
-            User, User.eventId == Event.id
-        ).outerjoin(
-            Payment, Payment.user_email == User.email
-        ).filter(
-            Payment.payment_status == "completed"
-        ).group_by(Event.id, Event.name).order_by(Event.created_at).all()
-        
-        return {
-            "labels": [event.name for event in event_payments],
-            "data": [event.paid_count for event in event_payments]
-        }
-    except Exception as e:
-        print(f"Error in get_event_payments: {str(e)}")
-        # Return empty data if there's an error
-        return {
-            "labels": [],
-            "data": []
-        }
+    return get_widget(DashboardContext(db), "event_payments")
 
 @app.get("/api/dashboard/attendance-stats")
 def get_attendance_stats(event_id: Optional[int] = None, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    from sqlalchemy import func
-    
-    # Get attendance forms with optional event filter
-    forms_query = db.query(Form).filter(Form.type == "attendance")
-    if event_id:
-        forms_query = forms_query.filter(Form.event_id == event_id)
-    attendance_forms = forms_query.all()
-    
-    if not attendance_forms:
-        return {
-            "labels": ["No Data"],
-            "data": [0]
-        }
-    
-    # Get users with optional event filter
-    users_query = db.query(User)
-    if event_id:
-        users_query = users_query.filter(User.eventId == event_id)
-    users = users_query.all()
-    attendance_counts = {"attended": 0, "partially_attended": 0, "not_attended": 0}
-    
-    for user in users:
-        user_responses = 0
-        for form in attendance_forms:
-            response = db.query(FormResponse).filter(
-                FormResponse.form_id == form.id,
-                FormResponse.user_email == user.email
-            ).first()
-            if response:
-                user_responses += 1
-        
-        if user_responses == len(attendance_forms) and len(attendance_forms) > 0:
-            attendance_counts["attended"] += 1
-        elif user_responses > 0:
-            attendance_counts["partially_attended"] += 1
-        else:
-            attendance_counts["not_attended"] += 1
-    
-    return {
-        "labels": ["Attended", "Partially Attended", "Not Attended"],
-        "data": [attendance_counts["attended"], attendance_counts["partially_attended"], attendance_counts["not_attended"]]
-    }
+    return get_widget(DashboardContext(db, event_id), "attendance_stats")
+
+@app.get("/api/dashboard/summary")
+def get_dashboard_summary(
+    event_id: Optional[int] = None,
+    widgets: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(DASHBOARD_WIDGETS)}"),
+    current_user: str = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """All dashboard widgets (or the requested subset) in one response, each cached with its own TTL"""
+    try:
+        names = parse_widgets(widgets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return dashboard_summary(db, event_id, names)
 
 # Q/A System Endpoints - Remove duplicate and fix routing
 
 @app.get("/api/qa/manager-questions/{event_id}")
-def get_manager_questions(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_manager_questions(event_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if user is manager or admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not admin or admin.role not in ["manager", "admin"]:
+    if principal.role not in ["manager", "admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     questions = db.query(QAQuestion).filter(
@@ -1521,56 +1456,47 @@ def get_manager_questions(event_id: int, current_user: str = Depends(verify_toke
     } for q in questions]
 
 @app.post("/api/qa/toggle-event")
-def toggle_qa_event(toggle_data: QAToggleRequest, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def toggle_qa_event(toggle_data: QAToggleRequest, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     try:
-        print(f"Toggle QA request: event_id={toggle_data.event_id}, active={toggle_data.active}, user={current_user}")
-        
         # Check if user is admin
-        admin = db.query(Admin).filter(Admin.email == current_user).first()
-        if not admin:
-            print(f"Admin not found for email: {current_user}")
+        if not principal.is_admin_account:
+            logger.warning("Q/A toggle by unknown admin", email=current_user, event_id=toggle_data.event_id)
             raise HTTPException(status_code=403, detail="User not found")
         
-        if admin.role != "admin":
-            print(f"User {current_user} has role {admin.role}, not admin")
+        if principal.role != "admin":
+            logger.warning("Q/A toggle denied", email=current_user, role=principal.role, event_id=toggle_data.event_id)
             raise HTTPException(status_code=403, detail="Only admins can toggle Q/A events")
         
         # Find the event first
         event = db.query(Event).filter(Event.id == toggle_data.event_id).first()
         if not event:
-            print(f"Event not found with ID: {toggle_data.event_id}")
             raise HTTPException(status_code=404, detail=f"Event with ID {toggle_data.event_id} not found")
         
-        print(f"Found event: {event.name} (ID: {event.id})")
-        
         if toggle_data.active:
             # Turn off all other events first
             db.query(Event).update({Event.qa_active: 0})
             # Turn on the selected event
             event.qa_active = 1
-            print(f"Enabled QA for event: {event.name}")
         else:
             # Turn off the selected event
             event.qa_active = 0
-            print(f"Disabled QA for event: {event.name}")
         
         db.commit()
-        print(f"Database committed successfully")
+        logger.info("Q/A toggled", event_id=event.id, active=toggle_data.active, email=current_user)
         
         return {"message": f"Q/A {'enabled' if toggle_data.active else 'disabled'} for event {event.name}"}
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in toggle_qa_event: {str(e)}")
+        logger.exception("Error in toggle_qa_event", event_id=toggle_data.event_id)
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.post("/api/qa/manager-approve/{question_id}")
-def manager_approve_question(question_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def manager_approve_question(question_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if user is manager or admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not admin or admin.role not in ["manager", "admin"]:
+    if principal.role not in ["manager", "admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     question = db.query(QAQuestion).filter(QAQuestion.id == question_id).first()
@@ -1602,10 +1528,9 @@ def manager_approve_question(question_id: int, current_user: str = Depends(verif
     return {"message": "Question approved successfully"}
 
 @app.post("/api/qa/manager-reject/{question_id}")
-def manager_reject_question(question_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def manager_reject_question(question_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if user is manager or admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not admin or admin.role not in ["manager", "admin"]:
+    if principal.role not in ["manager", "admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     question = db.query(QAQuestion).filter(QAQuestion.id == question_id).first()
@@ -1620,10 +1545,9 @@ def manager_reject_question(question_id: int, current_user: str = Depends(verify
     return {"message": "Question rejected successfully"}
 
 @app.get("/api/qa/admin-questions/{event_id}")
-def get_admin_questions(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_admin_questions(event_id: int, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if user is admin or presenter
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not admin or admin.role not in ["admin", "presenter"]:
+    if principal.role not in ["admin", "presenter"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     questions = db.query(QAQuestion).filter(
@@ -1641,10 +1565,9 @@ def get_admin_questions(event_id: int, current_user: str = Depends(verify_token)
     } for q in questions]
 
 @app.post("/api/qa/admin-action")
-def admin_action_question(action_data: QAActionRequest, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def admin_action_question(action_data: QAActionRequest, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Check if user is admin
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not admin or admin.role != "admin":
+    if principal.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
     
     question = db.query(QAQuestion).filter(QAQuestion.id == action_data.question_id).first()
@@ -1715,34 +1638,7 @@ def get_top_students(event_id: int, current_user: str = Depends(verify_token), d
 
 @app.get("/api/dashboard/colleges")
 def get_colleges_stats(event_id: Optional[int] = None, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    from sqlalchemy import func
-    
-    # Base query with optional event filter
-    base_query = db.query(User).filter(
-        User.college_name.isnot(None),
-        User.college_name != ''
-    )
-    if event_id:
-        base_query = base_query.filter(User.eventId == event_id)
-    
-    # Get college statistics from users table
-    college_stats = base_query.with_entities(
-        User.college_name,
-        func.count(User.id).label('count')
-    ).group_by(User.college_name).order_by(func.count(User.id).desc()).limit(5).all()
-    
-    # Get total unique colleges count
-    total_colleges = base_query.with_entities(
-        func.count(func.distinct(User.college_name))
-    ).scalar() or 0
-    
-    return {
-        "colleges": [{
-            "name": college.college_name,
-            "count": college.count
-        } for college in college_stats],
-        "total_colleges": total_colleges
-    }
+    return get_widget(DashboardContext(db, event_id), "colleges")
 
 # Missing endpoints for reports functionality
 @app.get("/api/events/{event_id}/report-stats")
@@ -1803,6 +1699,7 @@ def get_event_report_stats(event_id: int, current_user: str = Depends(verify_tok
 @app.get("/api/events/{event_id}/participants")
 def get_event_participants(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
     """Get participants for event detail report"""
+    from sqlalchemy import func
     try:
         # Get all users for this event
         users = db.query(User).filter(User.eventId == event_id).all()
@@ -1813,17 +1710,33 @@ def get_event_participants(event_id: int, current_user: str = Depends(verify_tok
             Form.type == "attendance"
         ).all()
         
+        # Attendance, payments and Q/A counts for every participant, one query each,
+        # keyed by lowercased email since each table stores the address as typed
+        responded_forms = {}
+        if attendance_forms:
+            for response in db.query(FormResponse.form_id, FormResponse.user_email).filter(
+                FormResponse.form_id.in_([form.id for form in attendance_forms])
+            ).distinct():
+                responded_forms.setdefault((response.user_email or "").lower(), set()).add(response.form_id)
+        # The join itself is case-insensitive under MySQL's default collation
+        paid_emails = {(row.user_email or "").lower() for row in db.query(Payment.user_email).join(
+            User, User.email == Payment.user_email
+        ).filter(
+            User.eventId == event_id,
+            Payment.payment_status == "completed"
+        ).distinct()}
+        chat_counts = {}
+        for user_email, count in db.query(QAQuestion.user_email, func.count(QAQuestion.id)).filter(
+            QAQuestion.event_id == event_id
+        ).group_by(QAQuestion.user_email):
+            email = (user_email or "").lower()
+            chat_counts[email] = chat_counts.get(email, 0) + count
+        
         participants = []
         for user in users:
+            email = (user.email or "").lower()
             # Calculate attendance status
-            user_responses = 0
-            for form in attendance_forms:
-                response = db.query(FormResponse).filter(
-                    FormResponse.form_id == form.id,
-                    FormResponse.user_email == user.email
-                ).first()
-                if response:
-                    user_responses += 1
+            user_responses = len(responded_forms.get(email, ()))
             
             # Determine attendance status
             if user_responses == len(attendance_forms) and len(attendance_forms) > 0:
@@ -1834,17 +1747,10 @@ def get_event_participants(event_id: int, current_user: str = Depends(verify_tok
                 attendance_status = "Not Attended"
             
             # Check payment status from payments table
-            payment = db.query(Payment).filter(
-                Payment.user_email == user.email,
-                Payment.payment_status == "completed"
-            ).first()
-            payment_status = "Paid" if payment else "Pending"
+            payment_status = "Paid" if email in paid_emails else "Pending"
             
             # Get chat count for this user
-            chat_count = db.query(QAQuestion).filter(
-                QAQuestion.user_email == user.email,
-                QAQuestion.event_id == event_id
-            ).count()
+            chat_count = chat_counts.get(email, 0)
             
             participants.append({
                 "id": user.id,
@@ -1858,17 +1764,21 @@ def get_event_participants(event_id: int, current_user: str = Depends(verify_tok
                 "created_at": user.created_at
             })
     
-        return participants
+        return FastJSONResponse(participants)
     except Exception as e:
         print(f"Error in get_event_participants: {str(e)}")
         return []
 
 @app.get("/api/events/{event_id}/analytics")
-def get_event_analytics(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_event_analytics(event_id: int, request: Request, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
     from sqlalchemy import func, extract
     from datetime import datetime, timedelta
     
     try:
+        etag, not_modified = check_etag(request, event_analytics_version(db, event_id))
+        if not_modified:
+            return not_modified
+        
         # Get event details
         event = db.query(Event).filter(Event.id == event_id).first()
         if not event:
@@ -1894,134 +1804,69 @@ def get_event_analytics(event_id: int, current_user: str = Depends(verify_token)
             Form.type == "attendance"
         ).all()
         
-        # Calculate attendance status for each user
-        users = db.query(User).filter(User.eventId == event_id).all()
+        # Attendance forms each user responded to, fetched in one query; emails match case-insensitively
+        responded_forms = {}
+        if attendance_forms:
+            for response in db.query(FormResponse.form_id, FormResponse.user_email).filter(
+                FormResponse.form_id.in_([form.id for form in attendance_forms])
+            ).distinct():
+                responded_forms.setdefault((response.user_email or "").lower(), set()).add(response.form_id)
+        
+        users = db.query(User.email, User.college_id, User.college_name).filter(User.eventId == event_id).all()
+        # Colleges by canonical id; spellings not yet clustered count under the name as entered
+        college_names = dict(db.query(College.id, College.name).filter(
+            College.id.in_({user.college_id for user in users if user.college_id is not None})
+        ).all())
+        
+        college_attendance = {}
         attendance_counts = {"attended": 0, "partially_attended": 0, "not_attended": 0}
-        
         for user in users:
-            user_responses = 0
-            for form in attendance_forms:
-                response = db.query(FormResponse).filter(
-                    FormResponse.form_id == form.id,
-                    FormResponse.user_email == user.email
-                ).first()
-                if response:
-                    user_responses += 1
-            
-            if user_responses == len(attendance_forms) and len(attendance_forms) > 0:
-                attendance_counts["attended"] += 1
-            elif user_responses > 0:
-                attendance_counts["partially_attended"] += 1
+            forms_done = responded_forms.get((user.email or "").lower(), set())
+            if len(forms_done) == len(attendance_forms) and len(attendance_forms) > 0:
+                attendance_status = "attended"
+            elif forms_done:
+                attendance_status = "partially_attended"
             else:
-                attendance_counts["not_attended"] += 1
-        
-        # College statistics with attendance
-        college_stats = db.query(
-            User.college_name,
-            func.count(User.id).label('count')
-        ).filter(
-            User.eventId == event_id,
-            User.college_name.isnot(None),
-            User.college_name != ''
-        ).group_by(User.college_name).order_by(func.count(User.id).desc()).all()
-        
-        college_stats_dict = {}
-        for stat in college_stats:
-            college_users = db.query(User).filter(
-                User.eventId == event_id,
-                User.college_name == stat.college_name
-            ).all()
+                attendance_status = "not_attended"
+            attendance_counts[attendance_status] += 1
             
-            college_attendance = {"attended": 0, "partially_attended": 0, "not_attended": 0}
-            form_responses = {}
-            
-            # Initialize form response counts
+            if user.college_id is not None:
+                college = college_names.get(user.college_id, "Unknown")
+            else:
+                college = (user.college_name or "").strip()
+                if not college:
+                    continue
+            stats = college_attendance.get(college)
+            if stats is None:
+                stats = college_attendance[college] = {
+                    "registered": 0,
+                    "attended": 0, "partially_attended": 0, "not_attended": 0,
+                    # Initialize form response counts
+                    **{f"{form.title}_responses": 0 for form in attendance_forms}
+                }
+            stats["registered"] += 1
+            stats[attendance_status] += 1
             for form in attendance_forms:
-                form_responses[f"{form.title}_responses"] = 0
-            
-            for user in college_users:
-                user_responses = 0
-                for form in attendance_forms:
-                    response = db.query(FormResponse).filter(
-                        FormResponse.form_id == form.id,
-                        FormResponse.user_email == user.email
-                    ).first()
-                    if response:
-                        user_responses += 1
-                        form_responses[f"{form.title}_responses"] += 1
-                
-                if user_responses == len(attendance_forms) and len(attendance_forms) > 0:
-                    college_attendance["attended"] += 1
-                elif user_responses > 0:
-                    college_attendance["partially_attended"] += 1
-                else:
-                    college_attendance["not_attended"] += 1
-            
-            college_stats_dict[stat.college_name] = {
-                "registered": stat.count,
-                **college_attendance,
-                **form_responses
-            }
+                if form.id in forms_done:
+                    stats[f"{form.title}_responses"] += 1
+        
+        college_stats = sorted(({"name": name, "count": stats["registered"]} for name, stats in college_attendance.items()),
+                               key=lambda stat: -stat["count"])
+        college_stats_dict = {stat["name"]: college_attendance[stat["name"]] for stat in college_stats}
         
         # Daily registration trend (last 30 days)
         thirty_days_ago = datetime.now() - timedelta(days=30)
-        daily_registrations = db.query(
-            func.date(User.created_at).label('date'),
-            func.count(User.id).label('count')
-        ).filter(
-            User.eventId == event_id,
-            User.created_at >= thirty_days_ago
-        ).group_by(func.date(User.created_at)).order_by(func.date(User.created_at)).all()
+        daily_stats = daily_registrations(db, event_id, since=thirty_days_ago.date())
         
         # Other stats
-        gender_stats = db.query(
-            User.gender,
-            func.count(User.id).label('count')
-        ).filter(
-            User.eventId == event_id,
-            User.gender.isnot(None),
-            User.gender != ''
-        ).group_by(User.gender).all()
-        
-        user_type_stats = db.query(
-            User.user_type,
-            func.count(User.id).label('count')
-        ).filter(
-            User.eventId == event_id,
-            User.user_type.isnot(None),
-            User.user_type != ''
-        ).group_by(User.user_type).all()
-        
-        utm_stats = db.query(
-            User.utm_source,
-            func.count(User.id).label('count')
-        ).filter(
-            User.eventId == event_id,
-            User.utm_source.isnot(None),
-            User.utm_source != ''
-        ).group_by(User.utm_source).all()
+        gender_stats = dimension_counts(db, "gender", event_id)
+        user_type_stats = dimension_counts(db, "user_type", event_id)
+        utm_stats = dimension_counts(db, "source", event_id)
         
         # Calculate attendance data for charts
-        attended = 0
-        partially_attended = 0
-        not_attended = 0
-        
-        for user in users:
-            user_responses = 0
-            for form in attendance_forms:
-                response = db.query(FormResponse).filter(
-                    FormResponse.form_id == form.id,
-                    FormResponse.user_email == user.email
-                ).first()
-                if response:
-                    user_responses += 1
-            
-            if user_responses == len(attendance_forms) and len(attendance_forms) > 0:
-                attended += 1
-            elif user_responses > 0:
-                partially_attended += 1
-            else:
-                not_attended += 1
+        attended = attendance_counts["attended"]
+        partially_attended = attendance_counts["partially_attended"]
+        not_attended = attendance_counts["not_attended"]
         
         # Payment data from actual payments table
         paid_count = db.query(func.count(Payment.payment_id)).join(
@@ -2037,7 +1882,7 @@ def get_event_analytics(event_id: int, current_user: str = Depends(verify_token)
         ]
         
         # College data for charts
-        college_data = [{"name": stat.college_name, "count": stat.count} for stat in college_stats]
+        college_data = [{"name": stat["name"], "count": stat["count"]} for stat in college_stats]
         
         attendance_data = [
             {"name": "Attended", "value": attended},
@@ -2045,35 +1890,35 @@ def get_event_analytics(event_id: int, current_user: str = Depends(verify_token)
             {"name": "Not Attended", "value": not_attended}
         ]
     
-        return {
+        return with_etag(FastJSONResponse({
             "event_name": event.name,
             "total_registrations": total_registrations,
             "colleges": [{
-                "name": stat.college_name,
-                "count": stat.count
+                "name": stat["name"],
+                "count": stat["count"]
             } for stat in college_stats],
             "college_stats": college_stats_dict,
             "daily_registrations": [{
-                "date": str(stat.date),
-                "count": stat.count
-            } for stat in daily_registrations],
+                "date": day,
+                "count": count
+            } for day, count in daily_stats.items()],
             "gender_distribution": [{
-                "gender": stat.gender,
-                "count": stat.count
-            } for stat in gender_stats],
+                "gender": gender,
+                "count": count
+            } for gender, count in gender_stats],
             "user_type_distribution": [{
-                "type": stat.user_type,
-                "count": stat.count
-            } for stat in user_type_stats],
+                "type": user_type,
+                "count": count
+            } for user_type, count in user_type_stats],
             "utm_sources": [{
-                "source": stat.utm_source or "Unknown",
-                "count": stat.count
-            } for stat in utm_stats],
+                "source": source or "Unknown",
+                "count": count
+            } for source, count in utm_stats],
             "attendance_stats": attendance_counts,
             "attendanceData": attendance_data,
             "paymentData": payment_data,
             "collegeData": college_data
-        }
+        }), etag)
     except Exception as e:
         print(f"Error in get_event_analytics: {str(e)}")
         return {
@@ -2093,19 +1938,10 @@ def get_event_analytics(event_id: int, current_user: str = Depends(verify_token)
 def get_utm_sources(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
     from sqlalchemy import func
     
-    utm_stats = db.query(
-        User.utm_source,
-        func.count(User.id).label('count')
-    ).filter(
-        User.eventId == event_id,
-        User.utm_source.isnot(None),
-        User.utm_source != ''
-    ).group_by(User.utm_source).order_by(func.count(User.id).desc()).all()
-    
     return [{
-        "source": stat.utm_source,
-        "count": stat.count
-    } for stat in utm_stats]
+        "source": source,
+        "count": count
+    } for source, count in dimension_counts(db, "source", event_id)]
 
 @app.get("/api/events/{event_id}/attendance-forms")
 def get_event_attendance_forms(event_id: int, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
@@ -2122,38 +1958,22 @@ def get_event_attendance_forms(event_id: int, current_user: str = Depends(verify
         "is_active": form.is_active
     } for form in forms]
 
-# Audit logging helper function
-def log_audit_action(db: Session, user_email: str, user_role: str, action: str, resource_type: str, resource_id: str = None, details: str = None, ip_address: str = None):
-    from database import AuditLog, Admin
-    import json
-    
-    # Get user name
-    admin = db.query(Admin).filter(Admin.email == user_email).first()
-    user_name = admin.email if admin else user_email
-    
-    audit_log = AuditLog(
-        user_email=user_email,
-        user_name=user_name,
-        user_role=user_role,
-        action=action,
-        resource_type=resource_type,
-        resource_id=str(resource_id) if resource_id else None,
-        details=details,
-        ip_address=ip_address
-    )
-    db.add(audit_log)
-    db.commit()
-
 @app.get("/api/logs")
-def get_audit_logs(user_filter: str = None, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_audit_logs(user_filter: str = None, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Get audit logs (admin only)"""
     from database import Admin, AuditLog
     
     # Check if current user is admin
-    current_admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not current_admin or current_admin.role != "admin":
+    if principal.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view logs")
     
+    # Write queued events first so the admin sees their own recent actions; a failed write stays
+    # queued for the background flush and must not take the log view down with it
+    try:
+        audit_log_writer.flush(db)
+    except Exception:
+        logger.exception("Error writing queued audit logs before listing")
+    
     # Build query with optional user filter
     query = db.query(AuditLog)
     if user_filter:
@@ -2161,7 +1981,20 @@ def get_audit_logs(user_filter: str = None, current_user: str = Depends(verify_t
     
     logs = query.order_by(AuditLog.created_at.desc()).limit(1000).all()
     
-    return [{
+    return [serialize_audit_log(log) for log in logs]
+
+@app.get("/api/logs/pipeline")
+def get_audit_pipeline_stats(principal: Principal = Depends(get_current_principal)):
+    """Audit log writer queue depth and dropped event count (admin only)"""
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view logs")
+    
+    return audit_log_writer.stats()
+
+AUDIT_LOG_FIELDS = ["id", "user_email", "user_name", "user_role", "action", "resource_type", "resource_id", "details", "ip_address", "created_at"]
+
+def serialize_audit_log(log):
+    return {
         "id": log.id,
         "user_email": log.user_email,
         "user_name": log.user_name,
@@ -2172,7 +2005,100 @@ def get_audit_logs(user_filter: str = None, current_user: str = Depends(verify_t
         "details": log.details,
         "ip_address": log.ip_address,
         "created_at": str(log.created_at)
-    } for log in logs]
+    }
+
+def encode_log_cursor(log) -> str:
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_log_cursor(cursor: str):
+    try:
+        created_at, log_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def filter_audit_logs(query, action: Optional[str], resource_type: Optional[str], user_email: Optional[str],
+                      email_match: str, start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Apply the /api/logs/search filters; each one can use an index on (column, created_at)"""
+    from database import AuditLog
+    
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if resource_type:
+        query = query.filter(AuditLog.resource_type == resource_type)
+    if user_email:
+        if email_match == "prefix":
+            query = query.filter(AuditLog.user_email.startswith(user_email, autoescape=True))
+        else:
+            query = query.filter(AuditLog.user_email == user_email)
+    if start_date:
+        query = query.filter(AuditLog.created_at >= start_date)
+    if end_date:
+        query = query.filter(AuditLog.created_at < end_date)
+    return query
+
+@app.get("/api/logs/search")
+def search_audit_logs(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    user_email: Optional[str] = None,
+    email_match: str = Query("exact", pattern="^(exact|prefix)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Page through audit logs newest first; pass next_cursor back to get the following page (admin only)"""
+    from database import AuditLog
+    from sqlalchemy import and_, or_
+    
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view logs")
+    
+    query = filter_audit_logs(db.query(AuditLog), action, resource_type, user_email, email_match, start_date, end_date)
+    if cursor:
+        cursor_created_at, cursor_id = decode_log_cursor(cursor)
+        query = query.filter(or_(
+            AuditLog.created_at < cursor_created_at,
+            and_(AuditLog.created_at == cursor_created_at, AuditLog.id < cursor_id)
+        ))
+    
+    # Fetch one extra row to know whether another page exists
+    logs = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    
+    return {
+        "logs": [serialize_audit_log(log) for log in logs],
+        "next_cursor": encode_log_cursor(logs[-1]) if has_more else None
+    }
+
+@app.get("/api/logs/export")
+def export_audit_logs(
+    principal: Principal = Depends(get_current_principal),
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    user_email: Optional[str] = None,
+    email_match: str = Query("exact", pattern="^(exact|prefix)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    """Stream matching audit logs as NDJSON or CSV without loading them into memory (admin only)"""
+    from database import AuditLog
+    
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view logs")
+    
+    def build_query(session):
+        query = filter_audit_logs(session.query(AuditLog), action, resource_type, user_email, email_match, start_date, end_date)
+        return query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+    
+    filename = f"audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return export_response(iter_query(build_query), serialize_audit_log, format, fieldnames=AUDIT_LOG_FIELDS, filename=filename)
 
 # User Management Endpoints
 class UserUpdate(BaseModel):
@@ -2184,52 +2110,86 @@ class UserUpdate(BaseModel):
 
 @app.get("/api/users")
 def get_users(
+    request: Request,
     current_user: str = Depends(verify_token),
+    principal: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
     college: Optional[str] = None,
     status: Optional[str] = None,
     attendance: Optional[str] = None,
     event: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern=USER_SORT_PATTERN),
+    fields: Optional[str] = None
 ):
-    # Get users with event names using join
-    query = db.query(User, Event.name.label('event_name')).outerjoin(
-        Event, User.eventId == Event.id
+    serialize = projection(user_list_row, fields, USER_LIST_FIELDS)
+    
+    # Log audit action (once per listing, not per page)
+    if not cursor:
+        user_role = principal.role or "unknown"
+        log_audit_action(current_user, user_role, "view_users", "user_management", None, f"Viewed users list with filters")
+    
+    # Unchanged data since the client's last poll costs two aggregate queries and an empty 304
+    etag, not_modified = check_etag(request, users_version(db))
+    if not_modified:
+        return not_modified
+    
+    if limit is None and cursor is None:
+        # Full list for older clients, streamed with the total appended after the array
+        rows = iter_query(lambda session: sort_users(filter_users(session, users_with_events(session), college, event, search), sort))
+        body = json_array_chunks(rows, serialize, opening='{"users":[', closing=lambda count: f'],"total_count":{count}}}')
+        return with_etag(StreamingResponse(body, media_type="application/json"), etag)
+    
+    query = filter_users(db, users_with_events(db), college, event, search)
+    users, next_cursor, total_count, estimated = paginate_users(
+        db, query, serialize, limit or 100, cursor, sort, filtered=bool(college or event or search)
     )
-    
-    if college:
-        query = query.filter(User.college_name == college)
-    if event:
-        event_obj = db.query(Event).filter(Event.name == event).first()
-        if event_obj:
-            query = query.filter(User.eventId == event_obj.id)
-    if search:
-        query = query.filter(
-            User.name.contains(search) | 
-            User.email.contains(search) |
-            User.college_name.contains(search)
-        )
-    
-    users_with_events = query.all()
-    users = [{
-        "id": str(user.User.id),
-        "name": user.User.name or f"{user.User.first_name or ''} {user.User.last_name or ''}".strip(),
-        "email": user.User.email,
-        "college": user.User.college_name or "",
-        "phone": user.User.phone_number or "",
-        "event_id": user.User.eventId,
-        "event": user.event_name or "Unknown Event",
-        "registered_at": str(user.User.created_at),
-        "created_date": str(user.User.created_at)
-    } for user in users_with_events]
-    total_count = len(users)
-    
-    # Log audit action
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "view_users", "user_management", None, f"Viewed users list with filters")
-    
-    return {"users": users, "total_count": total_count}
+    return with_etag(FastJSONResponse({
+        "users": users,
+        "next_cursor": next_cursor,
+        "total_count": total_count,
+        "total_count_estimated": estimated
+    }), etag)
+
+@app.get("/api/users/export")
+def export_users(
+    principal: Principal = Depends(get_current_principal),
+    college: Optional[str] = None,
+    event: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: str = Query("id", pattern=USER_SORT_PATTERN),
+    fields: Optional[str] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    """Stream the filtered user list as NDJSON or CSV"""
+    serialize = projection(user_list_row, fields, USER_LIST_FIELDS)
+    fieldnames = [field.strip() for field in fields.split(",") if field.strip()] if fields else USER_LIST_FIELDS
+    log_audit_action(principal.email, principal.role or "unknown", "export_users", "user_management", None, f"Exported users list as {format}")
+    
+    rows = iter_query(lambda session: sort_users(filter_users(session, users_with_events(session), college, event, search), sort))
+    filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return export_response(rows, serialize, format, fieldnames=fieldnames, filename=filename)
+
+@app.get("/api/users/search")
+def search_users(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Users matching q in name, email or college, best matches first"""
+    user_ids = user_search_index.search(db, q, limit)
+    if user_ids is None:
+        # Index still warming up
+        rows = filter_users(db, users_with_events(db), search=q).order_by(User.id.desc()).limit(limit).all()
+        return {"users": [user_list_row(row) for row in rows], "ranked": False}
+    
+    rows = users_with_events(db).filter(User.id.in_(user_ids)).all() if user_ids else []
+    rank = {user_id: i for i, user_id in enumerate(user_ids)}
+    rows.sort(key=lambda row: rank[row.User.id])
+    return {"users": [user_list_row(row) for row in rows], "ranked": True}
 
 @app.get("/api/users/report")
 def generate_users_report(
@@ -2263,7 +2223,7 @@ def generate_users_report(
     query = db.query(User)
     
     if college:
-        query = query.filter(User.college_name == college)
+        query = query.filter(college_filter(db, college))
     if event:
         event_obj = db.query(Event).filter(Event.name == event).first()
         if event_obj:
@@ -2276,7 +2236,7 @@ def generate_users_report(
         "college": u.college_name or "",
         "phone": u.phone_number or "",
         "event_id": u.eventId,
-        "registered_at": str(u.created_at)
+        "registered_at": u.created_at
     } for u in users_db]
     
     # Calculate proper attendance for each user
@@ -2710,7 +2670,7 @@ def generate_users_report(
             )
 
 @app.get("/api/users/{user_id}")
-def get_user(user_id: str, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_user(user_id: str, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     user_db = db.query(User).filter(User.id == int(user_id)).first()
     if not user_db:
         raise HTTPException(status_code=404, detail="User not found")
@@ -2726,14 +2686,13 @@ def get_user(user_id: str, current_user: str = Depends(verify_token), db: Sessio
     }
     
     # Log audit action
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "view_user", "user", user_id, f"Viewed user: {user.get('name')}")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "view_user", "user", user_id, f"Viewed user: {user.get('name')}")
     
     return user
 
 @app.put("/api/users/{user_id}")
-def update_user(user_id: str, user_data: UserUpdate, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def update_user(user_id: str, user_data: UserUpdate, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     update_data = {k: v for k, v in user_data.dict().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
@@ -2742,21 +2701,26 @@ def update_user(user_id: str, user_data: UserUpdate, current_user: str = Depends
     if not user_db:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # The form submits "college"; users store it as college_name
+    if "college" in update_data:
+        update_data["college_name"] = update_data.pop("college")
     for key, value in update_data.items():
         if hasattr(user_db, key):
             setattr(user_db, key, value)
+    if "college_name" in update_data:
+        user_db.college_id = resolve_college_id(db, user_db.college_name)
     
     db.commit()
+    user_search_index.add_user(user_db)
     
     # Log audit action
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "edit_user", "user", user_id, f"Updated user with data: {update_data}")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "edit_user", "user", user_id, f"Updated user with data: {update_data}")
     
     return {"message": "User updated successfully"}
 
 @app.delete("/api/users/{user_id}")
-def delete_user(user_id: str, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def delete_user(user_id: str, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     # Get user info before deletion for audit log
     user_db = db.query(User).filter(User.id == int(user_id)).first()
     if not user_db:
@@ -2764,18 +2728,19 @@ def delete_user(user_id: str, current_user: str = Depends(verify_token), db: Ses
     
     user_name = user_db.name or f"{user_db.first_name or ''} {user_db.last_name or ''}".strip()
     
+    registration_rollup.record(user_db, delta=-1)
     db.delete(user_db)
     db.commit()
+    user_search_index.remove(int(user_id))
     
     # Log audit action
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "delete_user", "user", user_id, f"Deleted user: {user_name}")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "delete_user", "user", user_id, f"Deleted user: {user_name}")
     
     return {"message": "User deleted successfully"}
 
 @app.post("/api/users/{user_id}/toggle-status")
-def toggle_user_status(user_id: str, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def toggle_user_status(user_id: str, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     user_db = db.query(User).filter(User.id == int(user_id)).first()
     if not user_db:
         raise HTTPException(status_code=404, detail="User not found")
@@ -2785,9 +2750,8 @@ def toggle_user_status(user_id: str, current_user: str = Depends(verify_token),
     db.commit()
     
     # Log audit action
-    admin = db.query(Admin).filter(Admin.email == current_user).first()
-    user_role = admin.role if admin else "unknown"
-    log_audit_action(db, current_user, user_role, "toggle_user_status", "user", user_id, f"Toggled user status")
+    user_role = principal.role or "unknown"
+    log_audit_action(current_user, user_role, "toggle_user_status", "user", user_id, f"Toggled user status")
     
     return {"message": "User status toggled successfully"}
 
@@ -2802,19 +2766,18 @@ def get_events_by_college(
     query = db.query(Event)
     if college:
         # Get events that have users from this college
-        query = query.join(User, User.eventId == Event.id).filter(User.college_name == college)
+        query = query.join(User, User.eventId == Event.id).filter(college_filter(db, college))
     
     events = query.distinct().all()
     return {"events": [event.name for event in events]}
 
 @app.get("/api/admins")
-def get_admins(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def get_admins(current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Get list of all admins and managers (admin only)"""
     from database import Admin
     
     # Check if current user is admin
-    current_admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not current_admin or current_admin.role != "admin":
+    if principal.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view admin list")
     
     # Get all admins, managers, and presenters
@@ -2847,13 +2810,12 @@ class DeleteAdminRequest(BaseModel):
     admin_id: int
 
 @app.post("/api/auth/delete-admin")
-def delete_admin(delete_request: DeleteAdminRequest, current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
+def delete_admin(delete_request: DeleteAdminRequest, current_user: str = Depends(verify_token), principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Delete admin or manager (admin only)"""
     from database import Admin
     
     # Check if current user is admin
-    current_admin = db.query(Admin).filter(Admin.email == current_user).first()
-    if not current_admin or current_admin.role != "admin":
+    if principal.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can delete users")
     
     # Find the admin to delete
@@ -2872,9 +2834,10 @@ def delete_admin(delete_request: DeleteAdminRequest, current_user: str = Depends
     # Delete the admin
     db.delete(admin_to_delete)
     db.commit()
+    invalidate_principal(deleted_email)
     
     # Log audit action
-    log_audit_action(db, current_user, current_admin.role, "delete_admin", "admin", str(delete_request.admin_id), f"Deleted {deleted_role}: {deleted_email}")
+    log_audit_action(current_user, principal.role, "delete_admin", "admin", str(delete_request.admin_id), f"Deleted {deleted_role}: {deleted_email}")
     
     return {"message": f"{deleted_role.title()} deleted successfully"}
 
@@ -2924,6 +2887,59 @@ def health_check():
 def api_health_check():
     return {"status": "healthy", "message": "API endpoints are working"}
 
+@app.get("/metrics")
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus metrics, merged across workers when METRICS_MULTIPROC_DIR is set"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    collect_threadpool()
+    return FastAPIResponse(content=render(collect_all()), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/admin/slow-queries")
+def get_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    sort: str = Query("total", pattern="^(" + "|".join(SORT_KEYS) + ")$"),
+    principal: Principal = Depends(get_current_principal)
+):
+    """Most expensive statement fingerprints of this worker since startup or the last reset (admin only)"""
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view query statistics")
+    return slow_query_recorder.summary(limit, sort)
+
+@app.delete("/api/admin/slow-queries")
+def reset_slow_queries(principal: Principal = Depends(get_current_principal)):
+    """Start a new measurement window, e.g. right before an event (admin only)"""
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can reset query statistics")
+    slow_query_recorder.reset()
+    return {"message": "Query statistics reset"}
+
+@app.post("/api/admin/profiles/token")
+def create_profiling_token(principal: Principal = Depends(get_current_principal)):
+    """Signed X-Profile-Request header value that makes the server profile a request (admin only)"""
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can profile requests")
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=409, detail="Profiling is disabled; set PROFILING_ENABLED=true")
+    return create_profile_token()
+
+@app.get("/api/admin/profiles")
+def get_profiles(limit: int = Query(50, ge=1, le=500), principal: Principal = Depends(get_current_principal)):
+    """Most recent request profiles of this worker, newest first (admin only)"""
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view profiles")
+    return list_profiles(limit)
+
+@app.get("/api/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, principal: Principal = Depends(get_current_principal)):
+    """Collapsed stacks of one profile, for flamegraph.pl or speedscope (admin only)"""
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view profiles")
+    stacks = read_profile(profile_id)
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FastAPIResponse(content=stacks, media_type="text/plain")
+
 @app.post("/api/qa/check-session")
 def check_qa_session(validation_data: QAValidationRequest, db: Session = Depends(get_db)):
     """Check if user session is still valid"""
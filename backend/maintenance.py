@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Database Maintenance Jobs
+Purges expired OTPs, archives old audit logs to compressed files and manages
+monthly partitions for audit_logs. Runs from the command line or, when
+MAINTENANCE_INTERVAL_MINUTES is set, periodically inside the API process.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, OTP, AuditLog
+
+OTP_RETENTION_HOURS = int(os.getenv("OTP_RETENTION_HOURS", "24"))
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv("AUDIT_LOG_RETENTION_DAYS", "90"))
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archives", "audit_logs"))
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "1000"))
+# 0 disables the in-process scheduler; run this script from cron instead
+MAINTENANCE_INTERVAL_MINUTES = int(os.getenv("MAINTENANCE_INTERVAL_MINUTES", "0"))
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", "3"))
+
+def purge_expired_otps(db: Session, retention_hours: int = OTP_RETENTION_HOURS, batch_size: int = MAINTENANCE_BATCH_SIZE) -> int:
+    """Delete OTPs that expired, or were used, more than retention_hours ago, one batch per commit"""
+    # OTP expiry times are stored in UTC, creation times in local time
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    used_cutoff = datetime.now() - timedelta(hours=retention_hours)
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.query(OTP.id).filter(
+            or_(OTP.expires_at < cutoff, OTP.expires_at.is_(None),
+                and_(OTP.is_used == 1, OTP.created_at < used_cutoff))
+        ).limit(batch_size).all()]
+        if not ids:
+            return deleted
+        db.query(OTP).filter(OTP.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+
+def archive_audit_logs(db: Session, retention_days: int = AUDIT_LOG_RETENTION_DAYS, archive_dir: str = AUDIT_ARCHIVE_DIR,
+                       batch_size: int = MAINTENANCE_BATCH_SIZE):
+    """Move audit logs older than retention_days into a gzipped NDJSON file.
+
+    Each batch is written and flushed before it is deleted, so an interrupted
+    run can at worst archive a batch twice; it never loses rows.
+    Returns (rows archived, archive path or None).
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    if not db.query(AuditLog.id).filter(AuditLog.created_at < cutoff).first():
+        return 0, None
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"audit_logs_before_{cutoff.strftime('%Y%m%d')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz")
+    archived = 0
+    last_id = 0
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        while True:
+            logs = db.query(AuditLog).filter(
+                AuditLog.created_at < cutoff,
+                AuditLog.id > last_id
+            ).order_by(AuditLog.id).limit(batch_size).all()
+            if not logs:
+                break
+            for log in logs:
+                archive.write(json.dumps({
+                    "id": log.id,
+                    "user_email": log.user_email,
+                    "user_name": log.user_name,
+                    "user_role": log.user_role,
+                    "action": log.action,
+                    "resource_type": log.resource_type,
+                    "resource_id": log.resource_id,
+                    "details": log.details,
+                    "ip_address": log.ip_address,
+                    "created_at": log.created_at.isoformat() if log.created_at else None
+                }) + "\n")
+            archive.flush()
+            os.fsync(archive.fileno())
+
+            ids = [log.id for log in logs]
+            last_id = ids[-1]
+            db.query(AuditLog).filter(AuditLog.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            archived += len(ids)
+    return archived, path
+
+def _month_start(day: datetime, months_ahead: int = 0) -> datetime:
+    month_index = day.year * 12 + (day.month - 1) + months_ahead
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+def _month_partition(start: datetime) -> str:
+    boundary = _month_start(start, 1).strftime("%Y-%m-%d")
+    return f"PARTITION p{start.strftime('%Y%m')} VALUES LESS THAN (TO_DAYS('{boundary}'))"
+
+def audit_partition_statements(db: Session, months_ahead: int = AUDIT_PARTITION_MONTHS_AHEAD) -> list:
+    """DDL that (re)partitions audit_logs by month of created_at; empty when not on MySQL or nothing to do.
+
+    form_responses is deliberately left unpartitioned: MySQL requires the
+    partition column in every unique key, which would break the
+    (form_id, user_email) constraint that prevents duplicate submissions.
+    """
+    if db.bind.dialect.name != "mysql":
+        return []
+
+    existing = {row[0] for row in db.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'audit_logs' AND PARTITION_NAME IS NOT NULL"
+    )).fetchall()}
+
+    today = datetime.now()
+    if not existing:
+        # Start with a catch-all for history so the first ALTER doesn't need to know the oldest row
+        first_month = _month_start(today)
+        partitions = [f"PARTITION p_history VALUES LESS THAN (TO_DAYS('{first_month.strftime('%Y-%m-%d')}'))"]
+        partitions += [_month_partition(_month_start(today, i)) for i in range(months_ahead + 1)]
+        partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        return [
+            # The partition column has to be part of the primary key
+            "ALTER TABLE audit_logs MODIFY created_at DATETIME NOT NULL, DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)",
+            "ALTER TABLE audit_logs PARTITION BY RANGE (TO_DAYS(created_at)) (" + ", ".join(partitions) + ")"
+        ]
+
+    missing = [
+        _month_start(today, i) for i in range(months_ahead + 1)
+        if f"p{_month_start(today, i).strftime('%Y%m')}" not in existing
+    ]
+    if not missing or "pmax" not in existing:
+        return []
+    partitions = [_month_partition(start) for start in missing] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+    return ["ALTER TABLE audit_logs REORGANIZE PARTITION pmax INTO (" + ", ".join(partitions) + ")"]
+
+def apply_audit_partitions(db: Session, months_ahead: int = AUDIT_PARTITION_MONTHS_AHEAD) -> list:
+    statements = audit_partition_statements(db, months_ahead)
+    for statement in statements:
+        db.execute(text(statement))
+    db.commit()
+    return statements
+
+def run_maintenance(partitions: bool = False) -> None:
+    """Run the retention jobs once with a dedicated session"""
+    db = SessionLocal()
+    try:
+        deleted = purge_expired_otps(db)
+        print(f"Purged {deleted} expired OTPs")
+        archived, path = archive_audit_logs(db)
+        if archived:
+            print(f"Archived {archived} audit logs to {path}")
+        if partitions:
+            for statement in apply_audit_partitions(db):
+                print(f"Applied: {statement}")
+    except Exception as e:
+        db.rollback()
+        print(f"Error running maintenance: {e}")
+    finally:
+        db.close()
+
+async def run_periodic_maintenance(interval_minutes: int = MAINTENANCE_INTERVAL_MINUTES) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        await loop.run_in_executor(None, run_maintenance)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Purge expired OTPs, archive old audit logs and manage partitions")
+    parser.add_argument("--otps", action="store_true", help="Delete expired OTPs")
+    parser.add_argument("--audit-logs", action="store_true", help="Archive and delete old audit logs")
+    parser.add_argument("--retention-days", type=int, default=AUDIT_LOG_RETENTION_DAYS, help="Audit log retention in days")
+    parser.add_argument("--partitions", action="store_true", help="Show the audit_logs partition DDL")
+    parser.add_argument("--apply", action="store_true", help="Execute the partition DDL instead of printing it")
+    parser.add_argument("--all", action="store_true", help="Run OTP purge and audit log archiving")
+
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        if args.otps or args.all:
+            print(f"Purged {purge_expired_otps(db)} expired OTPs")
+        if args.audit_logs or args.all:
+            archived, path = archive_audit_logs(db, retention_days=args.retention_days)
+            print(f"Archived {archived} audit logs" + (f" to {path}" if path else ""))
+        if args.partitions:
+            if args.apply:
+                statements = apply_audit_partitions(db)
+            else:
+                statements = audit_partition_statements(db)
+            if not statements:
+                print("No partition changes needed (or the database is not MySQL)")
+            for statement in statements:
+                print(statement + ";")
+        if not (args.otps or args.audit_logs or args.partitions or args.all):
+            print("Usage: python maintenance.py --all | --otps | --audit-logs [--retention-days N] | --partitions [--apply]")
+    finally:
+        db.close()
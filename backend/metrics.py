@@ -0,0 +1,321 @@
+import asyncio
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import anyio.to_thread
+from sqlalchemy import event
+
+# When set, every worker writes its metrics here and /metrics merges them
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+METRICS_SNAPSHOT_SECONDS = float(os.getenv("METRICS_SNAPSHOT_SECONDS", "5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+_SEPARATOR = "\x1f"
+
+class Metric:
+    """A metric family; samples are keyed by their label values in labelnames order"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = {_SEPARATOR.join(key): self._copy(value) for key, value in self._values.items()}
+        return {"kind": self.kind, "help": self.documentation, "labels": list(self.labelnames), "samples": samples}
+
+    def _copy(self, value):
+        return value
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def replace(self, values: Dict[tuple, float]) -> None:
+        """Swap in a complete set of samples, dropping label sets that are no longer present"""
+        with self._lock:
+            self._values = dict(values)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # Per-bucket (not cumulative) counts, then +Inf, sum and count
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+    def _copy(self, value):
+        return list(value)
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collect: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before a snapshot"""
+        self._collectors.append(collect)
+
+    def snapshot(self) -> dict:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code", ["method", "route", "status"]))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last body byte is sent", ["method", "route"]))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ["method", "route"]))
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "SQL statements executed, by the route that issued them", ["route"]))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["route"], buckets=DB_BUCKETS))
+THREADPOOL_BUSY = REGISTRY.register(Gauge(
+    "threadpool_busy_threads", "Worker threads running sync endpoints and dependencies"))
+THREADPOOL_SIZE = REGISTRY.register(Gauge(
+    "threadpool_max_threads", "Worker thread limit for sync endpoints and dependencies"))
+WEBSOCKET_CONNECTIONS = REGISTRY.register(Gauge(
+    "websocket_connections", "Open WebSocket connections per connection manager", ["manager"]))
+EMAIL_OUTBOX = REGISTRY.register(Gauge(
+    "email_outbox_pending", "Recipients of in-progress email sends not yet attempted"))
+EMAILS_SENT = REGISTRY.register(Counter(
+    "emails_sent_total", "Emails attempted, by result", ["result"]))
+
+# Route template of the request being handled, for metrics recorded deeper in the stack
+_current_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("metrics_scope", default=None)
+_route_paths: Dict[object, str] = {}
+# Scopes of requests being handled, labelled by route when metrics are collected
+_in_flight: Dict[int, dict] = {}
+
+def route_label(scope: Optional[dict]) -> str:
+    """Route template ("/api/forms/{form_id}") for a request scope; never the raw path, to bound label cardinality"""
+    if scope is None:
+        return "background"
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is not None:
+                _route_paths.setdefault(route.endpoint, route.path)
+        path = _route_paths.get(endpoint, "unmatched")
+    return path
+
+def current_route() -> str:
+    return route_label(_current_scope.get())
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+        token = _current_scope.set(scope)
+        start = time.perf_counter()
+        _in_flight[id(scope)] = scope
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_flight.pop(id(scope), None)
+            route = route_label(scope)
+            HTTP_REQUESTS.inc(scope["method"], route, status)
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], route)
+            _current_scope.reset(token)
+
+def collect_in_flight() -> None:
+    # The route is only known once the router has run, so in-flight requests are labelled here
+    counts = {}
+    for scope in list(_in_flight.values()):
+        key = (scope["method"], route_label(scope))
+        counts[key] = counts.get(key, 0) + 1
+    HTTP_IN_FLIGHT.replace(counts)
+
+REGISTRY.add_collector(collect_in_flight)
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement run on engine"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            route = current_route()
+            DB_QUERIES.inc(route)
+            DB_QUERY_LATENCY.observe(time.perf_counter() - starts.pop(), route)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+def collect_threadpool() -> None:
+    """Sample the anyio thread limiter; must run on the event loop"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_MULTIPROC_DIR, f"metrics_{pid}.json")
+
+def write_snapshot() -> None:
+    """Publish this worker's metrics for the worker that serves /metrics"""
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    with open(path + ".tmp", "w") as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(path + ".tmp", path)
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _merge(total: dict, snapshot: dict) -> None:
+    for name, metric in snapshot.items():
+        merged = total.setdefault(name, {**metric, "samples": {}})
+        for key, value in metric["samples"].items():
+            current = merged["samples"].get(key)
+            if current is None:
+                merged["samples"][key] = value
+            elif metric["kind"] == "histogram":
+                merged["samples"][key] = [a + b for a, b in zip(current, value)]
+            else:
+                # Gauges are summed too: in-flight requests, busy threads and connections add up across workers
+                merged["samples"][key] = current + value
+
+def collect_all() -> dict:
+    """Metrics of this worker merged with the latest snapshot of every other live worker"""
+    if not METRICS_MULTIPROC_DIR:
+        return REGISTRY.snapshot()
+    write_snapshot()
+    total = {}
+    for path in glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "metrics_*.json")):
+        try:
+            pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+        except ValueError:
+            continue
+        if not _pid_alive(pid):
+            # Counters of exited workers disappear; Prometheus treats that as a counter reset
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as f:
+                _merge(total, json.load(f))
+        except (OSError, ValueError):
+            continue
+    return total
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def render(metrics: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        labelnames = metric["labels"]
+        for key, value in sorted(metric["samples"].items()):
+            values = key.split(_SEPARATOR) if labelnames else []
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(labelnames, values)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + ["+Inf"], value[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labelnames, values, ('le', str(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labelnames, values)} {value[-2]}")
+            lines.append(f"{name}_count{_labels(labelnames, values)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+async def run_periodic_snapshot(interval: float = METRICS_SNAPSHOT_SECONDS) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        collect_threadpool()
+        write_snapshot()
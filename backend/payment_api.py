@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import DateTime, text
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
@@ -8,6 +9,8 @@ import os
 from dotenv import load_dotenv
 from database import SessionLocal
 from payment_model import Payment, PaymentStatus, PaymentMode
+from streaming_export import iter_query, export_response
+from auth import verify_token, Principal, get_current_principal
 # Import will be handled by SQLAlchemy registry
 
 load_dotenv()
@@ -30,7 +33,65 @@ def get_db():
     finally:
         db.close()
 
+PAYMENT_FIELDS = ["payment_id", "user_name", "user_email", "amount", "payment_status", "payment_date",
+                  "transaction_id", "mode_of_payment", "event", "contact_number", "created_at"]
+
 class PaymentService:
+    @staticmethod
+    def build_payments_query(
+        status_filter: Optional[str] = None,
+        event_filter: Optional[str] = None,
+        search: Optional[str] = None
+    ):
+        """Statement and bind parameters selecting payments newest first"""
+        # Get payment data from actual tables used in main.py
+        query = """
+            SELECT 
+                u.id, u.name, u.email, u.payment_status, u.payment_amount, u.payment_id,
+                u.created_at, po.razorpay_order_id, p.razorpay_payment_id, p.status as payment_status_detail,
+                p.event_type, p.contact_number, p.created_at as payment_date,
+                COALESCE(e.name, 'No Event') as event_name
+            FROM users u
+            LEFT JOIN payment_orders po ON u.id = po.user_id
+            LEFT JOIN payments p ON u.id = p.user_id
+            LEFT JOIN events e ON u.eventId = e.id
+            WHERE u.payment_status IS NOT NULL AND u.payment_status != 'not_paid'
+        """
+        
+        params = {}
+        
+        if status_filter:
+            query += " AND u.payment_status = :status"
+            params["status"] = status_filter.lower()
+        
+        if search:
+            query += " AND (u.name LIKE :search OR u.email LIKE :search)"
+            params["search"] = f"%{search}%"
+        
+        if event_filter:
+            query += " AND e.name LIKE :event"
+            params["event"] = f"%{event_filter}%"
+        
+        query += " ORDER BY u.created_at DESC"
+        # Typed so serialize_payment gets datetimes from every driver
+        return text(query).columns(created_at=DateTime, payment_date=DateTime), params
+    
+    @staticmethod
+    def serialize_payment(payment):
+        return {
+            "payment_id": payment[5] or f"pay_{payment[0]}",
+            "user_name": payment[1],
+            "user_email": payment[2],
+            "amount": float(payment[4]) / 100 if payment[4] else 0.0,  # Convert paise to rupees
+            "payment_status": payment[3] or "pending",
+            "payment_date": payment[12].isoformat() if payment[12] else payment[6].isoformat() if payment[6] else None,
+            "transaction_id": payment[8] or payment[7] or "N/A",
+            "mode_of_payment": "razorpay",
+            "event": payment[13],
+            "contact_number": payment[11],
+            "created_at": payment[6].isoformat() if payment[6] else None
+        }
+    
     @staticmethod
     def get_all_payments(
         status_filter: Optional[str] = None,
@@ -38,65 +99,28 @@ class PaymentService:
         event_filter: Optional[str] = None,
         search: Optional[str] = None
     ):
+        db = SessionLocal()
         try:
-            conn = mysql.connector.connect(**DB_CONFIG)
-            cursor = conn.cursor()
-            
-            # Get payment data from actual tables used in main.py
-            query = """
-                SELECT 
-                    u.id, u.name, u.email, u.payment_status, u.payment_amount, u.payment_id,
-                    u.created_at, po.razorpay_order_id, p.razorpay_payment_id, p.status as payment_status_detail,
-                    p.event_type, p.contact_number, p.created_at as payment_date,
-                    COALESCE(e.name, 'No Event') as event_name
-                FROM users u
-                LEFT JOIN payment_orders po ON u.id = po.user_id
-                LEFT JOIN payments p ON u.id = p.user_id
-                LEFT JOIN events e ON u.eventId = e.id
-                WHERE u.payment_status IS NOT NULL AND u.payment_status != 'not_paid'
-            """
-            
-            params = []
-            
-            if status_filter:
-                query += " AND u.payment_status = %s"
-                params.append(status_filter.lower())
-            
-            if search:
-                query += " AND (u.name LIKE %s OR u.email LIKE %s)"
-                params.extend([f"%{search}%", f"%{search}%"])
-            
-            if event_filter:
-                query += " AND e.name LIKE %s"
-                params.append(f"%{event_filter}%")
+            query, params = PaymentService.build_payments_query(status_filter, event_filter, search)
+            payments = db.execute(query, params).fetchall()
             
-            query += " ORDER BY u.created_at DESC"
-            
-            cursor.execute(query, params)
-            payments = cursor.fetchall()
-            
-            result = []
-            for payment in payments:
-                result.append({
-                    "payment_id": payment[5] or f"pay_{payment[0]}",
-                    "user_name": payment[1],
-                    "user_email": payment[2],
-                    "amount": float(payment[4]) / 100 if payment[4] else 0.0,  # Convert paise to rupees
-                    "payment_status": payment[3] or "pending",
-                    "payment_date": payment[12].isoformat() if payment[12] else payment[6].isoformat() if payment[6] else None,
-                    "transaction_id": payment[8] or payment[7] or "N/A",
-                    "mode_of_payment": "razorpay",
-                    "event": payment[13],
-                    "contact_number": payment[11],
-                    "created_at": payment[6].isoformat() if payment[6] else None
-                })
-            
-            conn.close()
-            return result
+            return [PaymentService.serialize_payment(payment) for payment in payments]
             
         except Exception as e:
             print(f"Error in get_all_payments: {e}")
             return []
+        finally:
+            db.close()
+    
+    @staticmethod
+    def iter_payments(
+        status_filter: Optional[str] = None,
+        event_filter: Optional[str] = None,
+        search: Optional[str] = None
+    ):
+        """Payment rows streamed from a server-side cursor, one batch at a time"""
+        query, params = PaymentService.build_payments_query(status_filter, event_filter, search)
+        return iter_query(lambda db: db.execute(query.execution_options(stream_results=True), params))
     
     @staticmethod
     def get_payment_count(
@@ -165,6 +189,22 @@ async def get_payments(
         "total_count": total_count
     }
 
+@router.get("/payments/export")
+def export_payments(
+    status: Optional[str] = None,
+    event: Optional[str] = None,
+    search: Optional[str] = None,
+    format: str = Query("csv", pattern="^(ndjson|csv)$"),
+    current_user: str = Depends(verify_token),
+    principal: Principal = Depends(get_current_principal)
+):
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export payments")
+    
+    rows = PaymentService.iter_payments(status, event, search)
+    filename = f"payments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return export_response(rows, PaymentService.serialize_payment, format, fieldnames=PAYMENT_FIELDS, filename=filename)
+
 @router.post("/payments")
 async def create_payment(payment_data: dict, db: Session = Depends(get_db)):
     payment = PaymentService.create_payment(db, payment_data)
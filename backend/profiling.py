@@ -0,0 +1,189 @@
+import asyncio
+import glob
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from metrics import route_label
+from app_logging import get_logger
+
+logger = get_logger("profiling")
+
+# The middleware is only installed when this is set, so disabled profiling costs nothing
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Fraction of requests profiled without a signed header
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOKEN_MINUTES = int(os.getenv("PROFILE_TOKEN_MINUTES", "30"))
+PROFILE_HEADER = "X-Profile-Request"
+
+_PROFILE_ID = re.compile(r"^\d+-[0-9a-f]{8}$")
+
+def _signature(expires: int) -> str:
+    key = (os.getenv("SECRET_KEY") or "").encode()
+    return hmac.new(key, f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+
+def create_profile_token(minutes: int = PROFILE_TOKEN_MINUTES) -> dict:
+    """Value for the X-Profile-Request header, valid for the given number of minutes"""
+    expires = int(time.time()) + minutes * 60
+    return {"header": PROFILE_HEADER, "value": f"{expires}.{_signature(expires)}", "expires_at": expires}
+
+def verify_profile_token(value: str) -> bool:
+    expires, _, signature = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time() or not os.getenv("SECRET_KEY"):
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler(threading.Thread):
+    """Samples the stacks running a request's endpoint every few milliseconds.
+
+    Sync endpoints run on worker threads that cProfile (which only sees the
+    thread that enabled it) would miss, so every thread is sampled and only
+    stacks passing through the endpoint function are kept, trimmed to start at
+    it. Concurrent requests to the same endpoint end up in the same profile.
+    """
+
+    def __init__(self, scope: dict, interval: float = PROFILE_INTERVAL_MS / 1000):
+        super().__init__(name="request-profiler", daemon=True)
+        self.scope = scope
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        own_thread = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            # The router sets the endpoint once it has matched the path
+            code = getattr(self.scope.get("endpoint"), "__code__", None)
+            if code is None:
+                continue
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    if frame.f_code is code:
+                        self.stacks[";".join(reversed(stack))] += 1
+                        break
+                    frame = frame.f_back
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+def save_profile(sampler: StackSampler, scope: dict, status: int, duration: float, profile_id: str,
+                 directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP) -> dict:
+    """Write the collapsed stacks and a metadata file, then drop all but the newest keep profiles"""
+    sampler.stop()
+    os.makedirs(directory, exist_ok=True)
+    leaves = Counter()
+    for stack, count in sampler.stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    meta = {
+        "id": profile_id,
+        "method": scope["method"],
+        "route": route_label(scope),
+        "path": scope["path"],
+        "status": status,
+        "duration_ms": round(duration * 1000, 1),
+        "samples": sampler.samples,
+        "interval_ms": sampler.interval * 1000,
+        "created_at": datetime.now().isoformat(),
+        "top_functions": [{"function": name, "samples": count} for name, count in leaves.most_common(10)]
+    }
+    # One "frame;frame;frame count" line per stack, the input format of flamegraph.pl and speedscope
+    with open(os.path.join(directory, f"{profile_id}.folded"), "w") as f:
+        f.writelines(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as f:
+        json.dump(meta, f)
+
+    for path in sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime)[:-keep or None]:
+        for stale in (path, path[:-len(".json")] + ".folded"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return meta
+
+def list_profiles(limit: int = 50, directory: str = PROFILE_DIR) -> List[dict]:
+    """Metadata of the most recent profiles, newest first"""
+    paths = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime, reverse=True)
+    profiles = []
+    for path in paths[:limit]:
+        try:
+            with open(path) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+def read_profile(profile_id: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """Collapsed stacks of one profile, or None if it does not exist"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(directory, f"{profile_id}.folded")) as f:
+            return f.read()
+    except OSError:
+        return None
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that carry a valid X-Profile-Request header, or a random sample"""
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE, directory: str = PROFILE_DIR):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.directory = directory
+
+    def _should_profile(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile-request":
+                return verify_profile_token(value.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{int(time.time())}-{secrets.token_hex(4)}"
+        sampler = StackSampler(scope)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, save_profile, sampler, scope, status, duration, profile_id, self.directory
+                )
+            except Exception:
+                logger.exception("Error saving request profile", profile_id=profile_id)
@@ -0,0 +1,116 @@
+import contextvars
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app_logging import get_logger
+from metrics import route_label
+
+logger = get_logger("query_budget")
+
+# Adds X-DB-Queries / X-DB-Time response headers; meant for development
+QUERY_DEBUG_HEADERS = os.getenv("QUERY_DEBUG_HEADERS", "false").lower() == "true"
+# A statement shape run this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Statement text with whitespace collapsed and IN (...) lists of any length folded together"""
+    return _PLACEHOLDER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+class QueryStats:
+    """Queries run during one request (or one test block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statement shapes run at least threshold times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+_request_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+# Active assert_query_budget blocks; these see queries from every thread
+_trackers: List[QueryStats] = []
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("budget_query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("budget_query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    for tracker in list(_trackers):
+        tracker.record(statement, duration)
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get("budget_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+class QueryBudgetMiddleware:
+    """ASGI middleware counting the queries of each request and reporting repeated statement shapes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if QUERY_DEBUG_HEADERS and message["type"] == "http.response.start":
+                # Streamed bodies may run more queries after the headers are sent
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                headers.append((b"x-db-time", f"{stats.duration * 1000:.1f}ms".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            for shape, count in stats.repeated():
+                logger.warning("Possible N+1 query", method=scope["method"], route=route_label(scope), count=count, statement=shape[:300])
+
+@contextmanager
+def assert_query_budget(max_queries: int, max_repeats: int = N_PLUS_ONE_THRESHOLD - 1):
+    """Fail if the block runs more than max_queries statements or any one shape more than max_repeats times"""
+    stats = QueryStats()
+    _trackers.append(stats)
+    try:
+        yield stats
+    finally:
+        _trackers.remove(stats)
+    assert stats.count <= max_queries, (
+        f"{stats.count} queries, budget is {max_queries}:\n" +
+        "\n".join(f"  {count}x {shape[:200]}" for shape, count in stats.shapes.most_common())
+    )
+    repeated = stats.repeated(max_repeats + 1)
+    assert not repeated, "Repeated statements (N+1?):\n" + "\n".join(f"  {count}x {shape[:200]}" for shape, count in repeated)
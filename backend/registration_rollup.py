@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Registration Rollups
+Keeps registration_daily_rollup (registrations per event and day, in total and by
+source, gender and user type) up to date for the dashboard charts, and rebuilds
+it from the users table from the command line.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, User, RegistrationDailyRollup
+from app_logging import get_logger
+
+logger = get_logger("registration_rollup")
+
+REGISTRATION_ROLLUP_FLUSH_SECONDS = float(os.getenv("REGISTRATION_ROLLUP_FLUSH_SECONDS", "5"))
+
+ALL = "all"
+# Rollup dimension -> users column
+DIMENSIONS = {"source": User.utm_source, "gender": User.gender, "user_type": User.user_type}
+
+def _day(value) -> date:
+    # func.date() returns a string on SQLite
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+def _rollup_keys(user) -> List[Tuple[int, date, str, str]]:
+    event_id = user.eventId or 0
+    day = (user.created_at or datetime.now()).date()
+    keys = [(event_id, day, ALL, "")]
+    for dimension, column in DIMENSIONS.items():
+        keys.append((event_id, day, dimension, (getattr(user, column.key) or "")[:255]))
+    return keys
+
+class RegistrationRollup:
+    """Buffers registration counts in memory and periodically adds them to the rollup table.
+
+    Every registration of an event day touches the same rollup rows, so writing
+    them inside the registration transaction would serialize registration waves
+    on those row locks; batching keeps them off the request path.
+    """
+
+    def __init__(self):
+        self._pending: Dict[tuple, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, user, delta: int = 1) -> None:
+        """Count a registered (delta=1) or deleted (delta=-1) user"""
+        keys = _rollup_keys(user)
+        with self._lock:
+            for key in keys:
+                self._pending[key] += delta
+
+    def _upsert(self, db: Session, rows: List[dict]) -> None:
+        table = RegistrationDailyRollup.__table__
+        dialect = db.bind.dialect.name
+        if dialect == "mysql":
+            stmt = mysql_insert(table).values(rows)
+            db.execute(stmt.on_duplicate_key_update(registrations=table.c.registrations + stmt.inserted.registrations))
+        elif dialect == "sqlite":
+            stmt = sqlite_insert(table).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["event_id", "day", "dimension", "value"],
+                set_={"registrations": table.c.registrations + stmt.excluded.registrations}
+            ))
+        else:
+            for row in rows:
+                existing = db.query(RegistrationDailyRollup).filter(
+                    RegistrationDailyRollup.event_id == row["event_id"],
+                    RegistrationDailyRollup.day == row["day"],
+                    RegistrationDailyRollup.dimension == row["dimension"],
+                    RegistrationDailyRollup.value == row["value"]
+                ).with_for_update().first()
+                if existing:
+                    existing.registrations += row["registrations"]
+                else:
+                    db.add(RegistrationDailyRollup(**row))
+
+    def flush(self, db: Session) -> int:
+        """Write buffered counts to the database; returns the number of rollup rows touched"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        rows = [
+            {"event_id": event_id, "day": day, "dimension": dimension, "value": value, "registrations": delta}
+            for (event_id, day, dimension, value), delta in pending.items() if delta
+        ]
+        if not rows:
+            return 0
+        try:
+            self._upsert(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the counts back so the next flush retries them
+            with self._lock:
+                for key, delta in pending.items():
+                    self._pending[key] += delta
+            raise
+        return len(rows)
+
+    def flush_now(self) -> None:
+        db = SessionLocal()
+        try:
+            self.flush(db)
+        except Exception:
+            logger.exception("Error flushing registration rollups")
+        finally:
+            db.close()
+
+    async def run_periodic_flush(self, interval: float = REGISTRATION_ROLLUP_FLUSH_SECONDS) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if self._pending:
+                await loop.run_in_executor(None, self.flush_now)
+
+registration_rollup = RegistrationRollup()
+
+def _rollup_query(db: Session, columns, dimension: str, event_id: Optional[int] = None, since: Optional[date] = None):
+    query = db.query(*columns).filter(RegistrationDailyRollup.dimension == dimension)
+    if event_id:
+        query = query.filter(RegistrationDailyRollup.event_id == event_id)
+    if since:
+        query = query.filter(RegistrationDailyRollup.day >= since)
+    return query
+
+def registration_total(db: Session, event_id: Optional[int] = None, since: Optional[date] = None) -> int:
+    total = func.sum(RegistrationDailyRollup.registrations)
+    return int(_rollup_query(db, [total], ALL, event_id, since).scalar() or 0)
+
+def daily_registrations(db: Session, event_id: Optional[int] = None, since: Optional[date] = None) -> Dict[date, int]:
+    """Registrations per day, oldest first; days without registrations are absent"""
+    rows = _rollup_query(
+        db, [RegistrationDailyRollup.day, func.sum(RegistrationDailyRollup.registrations)], ALL, event_id, since
+    ).group_by(RegistrationDailyRollup.day).order_by(RegistrationDailyRollup.day).all()
+    return {_day(day): int(count) for day, count in rows if count}
+
+def dimension_counts(db: Session, dimension: str, event_id: Optional[int] = None) -> List[Tuple[str, int]]:
+    """(value, registrations) for one breakdown, largest first, without blank values"""
+    total = func.sum(RegistrationDailyRollup.registrations)
+    rows = _rollup_query(db, [RegistrationDailyRollup.value, total], dimension, event_id).filter(
+        RegistrationDailyRollup.value != ''
+    ).group_by(RegistrationDailyRollup.value).order_by(total.desc()).all()
+    return [(value, int(count)) for value, count in rows if count]
+
+def rebuild_rollups(db: Session, event_id: Optional[int] = None) -> int:
+    """Recompute the rollup rows (of one event, or all) from users; returns the number of rows written.
+
+    Registrations flushed while this runs can be counted twice or not at all,
+    so run it outside registration windows.
+    """
+    deleted = db.query(RegistrationDailyRollup)
+    if event_id:
+        deleted = deleted.filter(RegistrationDailyRollup.event_id == event_id)
+    deleted.delete(synchronize_session=False)
+
+    event_column = func.coalesce(User.eventId, 0)
+    day_column = func.date(User.created_at)
+    breakdowns = [(ALL, None)] + list(DIMENSIONS.items())
+    written = 0
+    for dimension, column in breakdowns:
+        keys = [event_column, day_column] + ([func.coalesce(column, "")] if column is not None else [])
+        query = db.query(*keys, func.count(User.id)).filter(User.created_at.isnot(None))
+        if event_id:
+            query = query.filter(User.eventId == event_id)
+        rows = [{
+            "event_id": row[0],
+            "day": _day(row[1]),
+            "dimension": dimension,
+            "value": row[2][:255] if column is not None else "",
+            "registrations": row[-1]
+        } for row in query.group_by(*keys).all()]
+        db.bulk_insert_mappings(RegistrationDailyRollup, rows)
+        written += len(rows)
+    db.commit()
+    return written
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily registration rollups from the users table")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the rollup rows")
+    parser.add_argument("--event-id", type=int, help="Only rebuild this event")
+
+    args = parser.parse_args()
+    if not args.rebuild:
+        print("Usage: python registration_rollup.py --rebuild [--event-id N]")
+        sys.exit(0)
+    db = SessionLocal()
+    try:
+        written = rebuild_rollups(db, event_id=args.event_id)
+        print(f"Wrote {written} rollup rows")
+    finally:
+        db.close()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Synthetic Event Data
+Generates large, realistically skewed events for benchmarks and tests: users
+(college, UTM source and gender skew), attendance/quiz/feedback forms with
+questions and responses, Q/A questions, payments and audit logs. Rows are
+written with batched executemany inserts, so a million responses take minutes.
+
+    python seed_data.py --events 10 --users 50000        # ~1M form responses
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import (
+    Base, Event, User, Form, FormQuestion, FormResponse, FormAnalytics, QAQuestion, UserQuestionCount, AuditLog
+)
+from payment_model import Payment, PaymentStatus, PaymentMode
+
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "5000"))
+
+FIRST_NAMES = ["Arun", "Priya", "Karthik", "Divya", "Suresh", "Lakshmi", "Vignesh", "Deepa", "Rahul", "Anitha",
+               "Mohan", "Keerthana", "Praveen", "Sowmya", "Naveen", "Harini", "Gokul", "Meena", "Ajay", "Nithya",
+               "Sanjay", "Kavya", "Arjun", "Swetha", "Hari", "Janani", "Vijay", "Pooja", "Dinesh", "Aishwarya"]
+LAST_NAMES = ["Kumar", "Raj", "Sharma", "Subramanian", "Krishnan", "Natarajan", "Iyer", "Pillai", "Reddy", "Menon",
+              "Rao", "Nair", "Balaji", "Shankar", "Srinivasan", "Ganesh", "Murugan", "Venkatesh"]
+COLLEGES = ["PSG College of Technology", "Kumaraguru College of Technology", "Anna University", "Amrita Vishwa Vidyapeetham",
+            "Sri Krishna College of Engineering", "Coimbatore Institute of Technology", "Karunya University",
+            "SNS College of Technology", "Bannari Amman Institute of Technology", "Sri Ramakrishna Engineering College",
+            "Government College of Technology", "KPR Institute of Engineering", "Hindusthan College of Engineering",
+            "Dr. Mahalingam College of Engineering", "Kongu Engineering College", "Sona College of Technology",
+            "VIT University", "SRM Institute of Science and Technology", "SASTRA University", "NIT Trichy"]
+# Spellings students actually type, so college clustering has work to do
+COLLEGE_VARIANTS = {
+    "PSG College of Technology": ["PSG Tech", "psg college of technology", "PSG College Of Technology, Coimbatore"],
+    "Anna University": ["anna university", "Anna Univ", "Anna University Chennai"],
+    "Kumaraguru College of Technology": ["KCT", "Kumaraguru College Of Technology"],
+}
+UTM_SOURCES = [("instagram", 35), ("linkedin", 20), ("whatsapp", 15), ("college_ambassador", 10),
+               ("google", 8), ("", 7), ("youtube", 3), ("twitter", 2)]
+GENDERS = [("Male", 62), ("Female", 36), ("Other", 2)]
+USER_TYPES = [("student", 85), ("professional", 15)]
+HEARD_FROM = [("Instagram", 35), ("LinkedIn", 20), ("Friend", 20), ("College", 15), ("Other", 10)]
+YEARS = ["1st Year", "2nd Year", "3rd Year", "4th Year"]
+COURSES = ["B.E CSE", "B.Tech IT", "B.E ECE", "B.E EEE", "B.Sc CS", "BCA", "MCA", "M.E CSE", "B.E Mech"]
+FEEDBACK_SENTENCES = [
+    "The hands-on session on prompt engineering was the most useful part of the day for me.",
+    "I would like more time for the lab exercises because the setup took a while on my laptop.",
+    "The speakers explained the concepts clearly and the examples were relevant to our projects.",
+    "Audio in the main hall was hard to follow from the back rows during the afternoon session.",
+    "Please share the slides and notebooks after the event so we can practise at home.",
+    "The Q/A round was engaging and the moderators picked good questions from the audience.",
+]
+QUESTION_TOPICS = ["fine-tuning", "RAG pipelines", "career paths in AI", "GPU costs", "open-source models",
+                   "evaluation", "prompt injection", "internships", "certificates", "project ideas"]
+QA_STATUSES = [("pending", 30), ("manager_approved", 20), ("answered", 35), ("skipped", 10), ("rejected", 5)]
+PAYMENT_STATUSES = [("completed", 85), ("failed", 10), ("pending", 5)]
+PAYMENT_MODES = [("upi", 55), ("razorpay", 25), ("credit_card", 8), ("debit_card", 7), ("net_banking", 5)]
+AUDIT_ACTIONS = [("view_form", 40), ("edit_form", 20), ("export_users", 10), ("create_form", 8),
+                 ("send_email", 12), ("toggle_qa", 5), ("delete_user", 5)]
+
+def _weighted(choices):
+    values, weights = zip(*choices)
+    return list(values), list(weights)
+
+def _zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+class _BatchWriter:
+    """Accumulates rows per table and writes them with executemany in batches"""
+
+    def __init__(self, conn, batch_size: int, progress: Optional[Callable[[str, int], None]] = None):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.progress = progress
+        self.pending: Dict[object, List[dict]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, table, row: dict) -> None:
+        rows = self.pending.setdefault(table, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None) -> None:
+        for target in ([table] if table is not None else list(self.pending)):
+            rows = self.pending.get(target)
+            if not rows:
+                continue
+            self.conn.execute(target.insert(), rows)
+            self.counts[target.name] = self.counts.get(target.name, 0) + len(rows)
+            self.pending[target] = []
+            if self.progress:
+                self.progress(target.name, self.counts[target.name])
+
+def _next_id(conn, table) -> int:
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+def _quiz_questions(rng: random.Random, count: int = 10) -> List[dict]:
+    questions = []
+    for index in range(count):
+        options = [f"Option {letter}" for letter in "ABCD"]
+        questions.append({"text": f"Question {index + 1}: which statement about {rng.choice(QUESTION_TOPICS)} is correct?",
+                          "type": "single_choice", "options": options, "correct": rng.choice(options), "points": 1})
+    return questions
+
+def seed_database(engine, events: int = 3, users_per_event: int = 2000, seed: int = 42,
+                  batch_size: int = SEED_BATCH_SIZE, rollups: bool = True,
+                  progress: Optional[Callable[[str, int], None]] = None) -> dict:
+    """Generate events with users, forms, responses, Q/A, payments and audit logs; returns row counts and ids.
+
+    Ids are assigned here (continuing after the current maximum) so every batch
+    is a plain executemany without reading generated keys back.
+    """
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine)
+    colleges_weights = _zipf_weights(len(COLLEGES))
+    utm_values, utm_weights = _weighted(UTM_SOURCES)
+    gender_values, gender_weights = _weighted(GENDERS)
+    type_values, type_weights = _weighted(USER_TYPES)
+    heard_values, heard_weights = _weighted(HEARD_FROM)
+    qa_values, qa_weights = _weighted(QA_STATUSES)
+    pay_values, pay_weights = _weighted(PAYMENT_STATUSES)
+    mode_values, mode_weights = _weighted(PAYMENT_MODES)
+    audit_values, audit_weights = _weighted(AUDIT_ACTIONS)
+
+    tables = {model: model.__table__ for model in
+              (Event, User, Form, FormQuestion, FormResponse, FormAnalytics, QAQuestion, UserQuestionCount, AuditLog)}
+    summary = {"event_ids": [], "form_ids": {}}
+
+    with engine.begin() as conn:
+        writer = _BatchWriter(conn, batch_size, progress)
+        ids = {model: _next_id(conn, table) for model, table in tables.items()}
+        payment_prefix = f"seed{seed}-{ids[User]}"
+
+        def take_id(model) -> int:
+            ids[model] += 1
+            return ids[model] - 1
+
+        for event_index in range(events):
+            event_id = take_id(Event)
+            event_day = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0) - timedelta(days=30 * (events - event_index - 1))
+            writer.add(tables[Event], {"id": event_id, "name": f"AI Workshop {event_id}", "slug": f"ai-workshop-{event_id}",
+                                       "event_date": event_day.strftime("%Y-%m-%d"), "qa_active": 0,
+                                       "created_at": event_day - timedelta(days=60)})
+            summary["event_ids"].append(event_id)
+
+            # Users: registrations ramp up towards the event day
+            users = []
+            for _ in range(users_per_event):
+                user_id = take_id(User)
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                college = rng.choices(COLLEGES, colleges_weights)[0]
+                if college in COLLEGE_VARIANTS and rng.random() < 0.3:
+                    college = rng.choice(COLLEGE_VARIANTS[college])
+                created_at = event_day - timedelta(days=45 * (1 - rng.random() ** 0.5), seconds=rng.randint(0, 86399))
+                email = f"{first.lower()}.{last.lower()}{user_id}@example.com"
+                user = {
+                    "id": user_id, "name": f"{first} {last}", "first_name": first, "last_name": last, "email": email,
+                    "phone_number": f"9{rng.randint(100000000, 999999999)}", "primary_email": "",
+                    "college_name": college, "year_semester": rng.choice(YEARS), "course": rng.choice(COURSES),
+                    "specify_course": "", "how_did_you_hear": rng.choices(heard_values, heard_weights)[0],
+                    "referral_email": "", "user_type": rng.choices(type_values, type_weights)[0],
+                    "is_current_student": "yes", "registration_id": f"KAI{user_id:07d}",
+                    "gender": rng.choices(gender_values, gender_weights)[0], "agree_to_terms": "yes",
+                    "project": "kambaa.ai", "form_name": "AI-workshop-new", "email_verified": 1,
+                    "created_at": created_at, "updated_at": created_at, "eventId": event_id,
+                    "utm_source": rng.choices(utm_values, utm_weights)[0]
+                }
+                writer.add(tables[User], user)
+                users.append(user)
+
+            # Forms: two attendance days, a quiz and a feedback form, each with its response rate
+            form_specs = [
+                ("attendance", "Day 1 Attendance", 0.75, [{"text": "Mark your attendance", "type": "yes_no", "options": ["Yes"], "points": 0}]),
+                ("attendance", "Day 2 Attendance", 0.60, [{"text": "Mark your attendance", "type": "yes_no", "options": ["Yes"], "points": 0}]),
+                ("quiz", "AI Fundamentals Quiz", 0.45, _quiz_questions(rng)),
+                ("feedback", "Workshop Feedback", 0.35, [
+                    {"text": "How would you rate the workshop?", "type": "rating", "options": [], "points": 0},
+                    {"text": "What did you like and what should we improve?", "type": "text", "options": [], "points": 0},
+                ]),
+            ]
+            attendees = rng.sample(users, int(len(users) * form_specs[0][2]))
+            for day, (form_type, title, rate, questions) in enumerate(form_specs):
+                form_id = take_id(Form)
+                summary["form_ids"].setdefault(form_type, []).append(form_id)
+                form_time = event_day + timedelta(hours=day * 24 if form_type == "attendance" else 5)
+                writer.add(tables[Form], {"id": form_id, "title": f"{title} - Event {event_id}", "description": "",
+                                          "type": form_type, "event_id": event_id, "settings": "{}", "is_active": 1,
+                                          "created_by": "admin@example.com", "created_at": form_time - timedelta(days=2),
+                                          "updated_at": form_time - timedelta(days=2)})
+                question_ids = []
+                for order, question in enumerate(questions):
+                    question_id = take_id(FormQuestion)
+                    question_ids.append((question_id, question))
+                    writer.add(tables[FormQuestion], {"id": question_id, "form_id": form_id, "question_text": question["text"],
+                                                      "question_type": question["type"], "options": json.dumps(question["options"]),
+                                                      "is_required": 1, "points": question["points"],
+                                                      "correct_answer": question.get("correct"), "order_index": order,
+                                                      "created_at": form_time - timedelta(days=2)})
+
+                # Everyone answering later forms attended day 1, as in real events
+                pool = attendees if day == 0 else rng.sample(attendees, min(len(attendees), int(len(users) * rate)))
+                total_score = total_time = 0
+                for user in pool:
+                    if form_type == "quiz":
+                        # Stronger students answer more questions correctly
+                        skill = rng.betavariate(4, 2)
+                        answers = {str(qid): (q["correct"] if rng.random() < skill else rng.choice(q["options"])) for qid, q in question_ids}
+                        score = sum(q["points"] for qid, q in question_ids if answers[str(qid)] == q["correct"])
+                        time_taken = rng.randint(90, 900)
+                    elif form_type == "feedback":
+                        rating_qid, text_qid = question_ids[0][0], question_ids[1][0]
+                        answers = {str(rating_qid): str(rng.choices([5, 4, 3, 2, 1], [40, 35, 15, 6, 4])[0]),
+                                   str(text_qid): " ".join(rng.sample(FEEDBACK_SENTENCES, 3))}
+                        score, time_taken = 0, rng.randint(60, 400)
+                    else:
+                        answers = {str(question_ids[0][0]): "Yes"}
+                        score, time_taken = 0, rng.randint(5, 60)
+                    total_score += score
+                    total_time += time_taken
+                    writer.add(tables[FormResponse], {
+                        "id": take_id(FormResponse), "form_id": form_id, "user_email": user["email"], "user_name": user["name"],
+                        "responses": json.dumps(answers), "score": score, "time_taken": time_taken,
+                        "submitted_at": form_time + timedelta(seconds=rng.expovariate(1 / 600))
+                    })
+                writer.add(tables[FormAnalytics], {
+                    "id": take_id(FormAnalytics), "form_id": form_id, "total_responses": len(pool),
+                    "average_score": f"{total_score / len(pool):.2f}" if pool and form_type == "quiz" else "0.00",
+                    "average_time": total_time // len(pool) if pool else 0, "completion_rate": "0.00",
+                    "total_accessed": int(len(pool) * 1.3), "unique_visitors": int(len(pool) * 1.1)
+                })
+
+            # Q/A: a small, vocal share of the attendees asks most questions
+            approved_counts: Dict[str, list] = {}
+            for user in rng.sample(attendees, max(1, len(attendees) // 20)) if attendees else []:
+                for _ in range(min(5, int(rng.paretovariate(1.5)))):
+                    status = rng.choices(qa_values, qa_weights)[0]
+                    asked_at = event_day + timedelta(hours=3, seconds=rng.randint(0, 7200))
+                    moderated = status != "pending"
+                    writer.add(tables[QAQuestion], {
+                        "id": take_id(QAQuestion), "event_id": event_id, "user_email": user["email"], "user_name": user["name"],
+                        "registration_id": user["registration_id"],
+                        "question": f"Can you say more about {rng.choice(QUESTION_TOPICS)}?", "status": status,
+                        "manager_approved_at": asked_at + timedelta(minutes=2) if moderated else None,
+                        "admin_action": status if status in ("answered", "skipped", "rejected") else None,
+                        "admin_response": "Answered live" if status == "answered" else None,
+                        "admin_action_at": asked_at + timedelta(minutes=10) if status in ("answered", "skipped", "rejected") else None,
+                        "created_at": asked_at
+                    })
+                    if status in ("manager_approved", "answered"):
+                        approved_counts.setdefault(user["email"], [user["name"], 0])[1] += 1
+            for email, (name, approved) in approved_counts.items():
+                writer.add(tables[UserQuestionCount], {"id": take_id(UserQuestionCount), "event_id": event_id, "user_email": email,
+                                                        "user_name": name, "approved_questions": approved,
+                                                        "created_at": event_day, "updated_at": event_day})
+
+            # Payments for a third of the registrations
+            for user in users:
+                if rng.random() >= 0.35:
+                    continue
+                paid_at = user["created_at"] + timedelta(minutes=rng.randint(1, 120))
+                writer.add(Payment.__table__, {
+                    "payment_id": f"pay_{payment_prefix}_{user['id']}", "user_id": user["id"], "user_email": user["email"],
+                    "amount": rng.choice([499, 999]), "payment_status": PaymentStatus(rng.choices(pay_values, pay_weights)[0]),
+                    "payment_date": paid_at, "transaction_id": f"txn_{payment_prefix}_{user['id']}",
+                    "mode_of_payment": PaymentMode(rng.choices(mode_values, mode_weights)[0]), "created_at": paid_at, "updated_at": paid_at
+                })
+
+            # Audit trail of the organizers preparing and running the event
+            for _ in range(max(50, users_per_event // 20)):
+                action = rng.choices(audit_values, audit_weights)[0]
+                writer.add(tables[AuditLog], {
+                    "id": take_id(AuditLog), "user_email": rng.choice(["admin@example.com", "manager@example.com", "presenter@example.com"]),
+                    "user_role": rng.choice(["admin", "manager"]), "action": action,
+                    "resource_type": "user" if action in ("export_users", "delete_user") else "form",
+                    "resource_id": str(rng.choice(summary["form_ids"]["quiz"])), "details": json.dumps({"event_id": event_id}),
+                    "ip_address": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                    "created_at": event_day - timedelta(days=rng.randint(0, 30), seconds=rng.randint(0, 86399))
+                })
+        writer.flush()
+        summary["counts"] = dict(writer.counts)
+
+    if rollups:
+        from registration_rollup import rebuild_rollups
+        with Session(bind=engine) as db:
+            rebuild_rollups(db)
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Generate synthetic large-event data")
+    parser.add_argument("--database-url", help="Target database (default: DATABASE_URL)")
+    parser.add_argument("--events", type=int, default=3, help="Number of events")
+    parser.add_argument("--users", type=int, default=2000, help="Users per event")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE, help="Rows per executemany batch")
+    parser.add_argument("--no-rollups", action="store_true", help="Skip rebuilding registration rollups")
+
+    args = parser.parse_args()
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from database import engine
+    started = time.perf_counter()
+    last_report = [0.0]
+
+    def report(table: str, written: int) -> None:
+        if time.perf_counter() - last_report[0] >= 5:
+            last_report[0] = time.perf_counter()
+            print(f"  {table}: {written} rows ({time.perf_counter() - started:.0f}s)")
+
+    summary = seed_database(engine, events=args.events, users_per_event=args.users, seed=args.seed,
+                            batch_size=args.batch_size, rollups=not args.no_rollups, progress=report)
+    print(f"Seeded events {summary['event_ids']} in {time.perf_counter() - started:.1f}s")
+    for table, count in sorted(summary["counts"].items()):
+        print(f"  {table}: {count}")
@@ -20,7 +20,8 @@ CREATE TABLE IF NOT EXISTS events (
     slug VARCHAR(255) UNIQUE,
     event_date VARCHAR(50) NOT NULL,
     qa_active INT DEFAULT 0,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 -- Create users table
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app_logging import get_logger
+from metrics import current_route
+from query_budget import statement_shape
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "2000"))
+# Durations kept per fingerprint for the p95
+SLOW_QUERY_SAMPLE_SIZE = int(os.getenv("SLOW_QUERY_SAMPLE_SIZE", "500"))
+SLOW_QUERY_DUMP_FILE = os.getenv("SLOW_QUERY_DUMP_FILE", "slow_queries.json")
+SLOW_QUERY_DUMP_SECONDS = float(os.getenv("SLOW_QUERY_DUMP_SECONDS", "300"))
+SLOW_QUERY_DUMP_TOP = int(os.getenv("SLOW_QUERY_DUMP_TOP", "50"))
+
+SORT_KEYS = ("total", "count", "p95", "max")
+
+logger = get_logger("slow_queries")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement with literals replaced by ? and IN lists folded, so every call site maps to one entry"""
+    shape = statement_shape(statement)
+    return _NUMBER_LITERAL.sub("?", _STRING_LITERAL.sub("?", shape))
+
+def _caller() -> str:
+    """file:line function of the innermost application frame that issued the statement"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_BACKEND_DIR) and filename != __file__ and f"{os.sep}venv{os.sep}" not in filename:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+class QueryFingerprintStats:
+    __slots__ = ("fingerprint", "count", "total", "max", "durations", "routes", "callers")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.durations = deque(maxlen=SLOW_QUERY_SAMPLE_SIZE)
+        self.routes = Counter()
+        self.callers = Counter()
+
+    def p95(self) -> float:
+        if not self.durations:
+            return 0.0
+        ordered = sorted(self.durations)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0,
+            "p95_ms": round(self.p95() * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "routes": dict(self.routes.most_common(5)),
+            "callers": dict(self.callers.most_common(5))
+        }
+
+class SlowQueryRecorder:
+    """Time spent per statement fingerprint since start (or the last reset), and a log of slow statements"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS, max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS):
+        self.threshold = threshold_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self.since = datetime.now()
+        self._stats: Dict[str, QueryFingerprintStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float) -> None:
+        key = fingerprint(statement)
+        route = current_route()
+        slow = duration >= self.threshold
+        with self._lock:
+            stats = self._stats.get(key)
+            new = stats is None
+            if new:
+                if len(self._stats) >= self.max_fingerprints:
+                    # Make room by forgetting the statement that has cost the least so far
+                    del self._stats[min(self._stats.values(), key=lambda s: s.total).fingerprint]
+                stats = self._stats[key] = QueryFingerprintStats(key)
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            stats.durations.append(duration)
+            stats.routes[route] += 1
+        # Finding the call site walks the stack, so only do it for new and slow statements
+        if new or slow:
+            caller = _caller()
+            with self._lock:
+                stats.callers[caller] += 1
+        if slow:
+            logger.warning("Slow query", duration_ms=round(duration * 1000, 1), route=route, caller=caller, fingerprint=key[:500])
+
+    def top(self, limit: int = 20, sort: str = "total") -> List[dict]:
+        """The limit most expensive fingerprints by total time, count, p95 or max"""
+        with self._lock:
+            entries = [stats.to_dict() for stats in self._stats.values()]
+        return sorted(entries, key=lambda entry: entry[f"{sort}_ms" if sort != "count" else "count"], reverse=True)[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.since = datetime.now()
+
+    def summary(self, limit: int = 20, sort: str = "total") -> dict:
+        return {
+            "since": self.since.isoformat(),
+            "fingerprints": len(self._stats),
+            "threshold_ms": self.threshold * 1000,
+            "queries": self.top(limit, sort)
+        }
+
+    def dump(self, path: str = SLOW_QUERY_DUMP_FILE, limit: int = SLOW_QUERY_DUMP_TOP) -> str:
+        """Write the summary to path, with this worker's pid before the extension; returns the file written"""
+        root, ext = os.path.splitext(path)
+        target = f"{root}_{os.getpid()}{ext or '.json'}"
+        directory = os.path.dirname(target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(target + ".tmp", "w") as f:
+            json.dump({**self.summary(limit), "written_at": datetime.now().isoformat()}, f, indent=2)
+        os.replace(target + ".tmp", target)
+        return target
+
+    async def run_periodic_dump(self, interval: float = SLOW_QUERY_DUMP_SECONDS) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.dump)
+            except Exception:
+                logger.exception("Error writing slow query dump")
+
+    def instrument(self, engine) -> None:
+        """Time every statement run on engine"""
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get("slow_query_start")
+            if starts:
+                self.record(statement, time.perf_counter() - starts.pop())
+
+        @event.listens_for(engine, "handle_error")
+        def _error(context):
+            starts = context.connection.info.get("slow_query_start") if context.connection is not None else None
+            if starts:
+                starts.pop()
+
+slow_query_recorder = SlowQueryRecorder()
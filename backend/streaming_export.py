@@ -0,0 +1,74 @@
+import csv
+import io
+import os
+from typing import Callable, Iterable, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from database import SessionLocal
+from json_response import dumps
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+def iter_query(build_query: Callable, batch_size: int = EXPORT_BATCH_SIZE):
+    """Yield the rows of build_query(db) from a dedicated session, fetching batch_size rows at a time.
+
+    The request's own session may be closed before a streamed body is sent,
+    so exports open their own.
+    """
+    db = SessionLocal()
+    try:
+        for row in build_query(db).yield_per(batch_size):
+            yield row
+    finally:
+        db.close()
+
+def ndjson_chunks(rows: Iterable, serialize: Callable, batch_size: int = EXPORT_BATCH_SIZE):
+    lines = []
+    for row in rows:
+        lines.append(dumps(serialize(row)))
+        if len(lines) >= batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+def csv_chunks(rows: Iterable, serialize: Callable, fieldnames: List[str], batch_size: int = EXPORT_BATCH_SIZE):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for i, row in enumerate(rows, 1):
+        writer.writerow(serialize(row))
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def json_array_chunks(rows: Iterable, serialize: Callable, opening: str = "[",
+                      closing: Callable[[int], str] = lambda count: "]", batch_size: int = EXPORT_BATCH_SIZE):
+    """Stream a JSON array as bytes; ``closing`` receives the row count so totals can follow the array"""
+    yield opening.encode()
+    count = 0
+    items = []
+    for row in rows:
+        items.append(dumps(serialize(row)))
+        count += 1
+        if len(items) >= batch_size:
+            yield (b"," if count > len(items) else b"") + b",".join(items)
+            items = []
+    if items:
+        yield (b"," if count > len(items) else b"") + b",".join(items)
+    yield closing(count).encode()
+
+def export_response(rows: Iterable, serialize: Callable, format: str, fieldnames: Optional[List[str]] = None,
+                    filename: Optional[str] = None) -> StreamingResponse:
+    """StreamingResponse writing rows as NDJSON or CSV"""
+    if format == "csv":
+        body = csv_chunks(rows, serialize, fieldnames)
+        media_type = "text/csv"
+    else:
+        body = ndjson_chunks(rows, serialize)
+        media_type = "application/x-ndjson"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"} if filename else None
+    return StreamingResponse(body, media_type=media_type, headers=headers)
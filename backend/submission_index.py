@@ -0,0 +1,103 @@
+import hashlib
+import math
+import os
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from database import FormResponse
+from ttl_cache import TTLCache
+
+SUBMISSION_INDEX_EXACT_LIMIT = int(os.getenv("SUBMISSION_INDEX_EXACT_LIMIT", "5000"))
+# Re-read from the database periodically to pick up submissions handled by other workers
+SUBMISSION_INDEX_TTL = int(os.getenv("SUBMISSION_INDEX_TTL", "60"))
+
+class BloomFilter:
+    """Bit-array Bloom filter sized for ``capacity`` items at ``error_rate`` false positives"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        # Double hashing: k positions from two 64-bit hashes
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class FormSubmissions:
+    """Emails that submitted one form: an exact set for small forms, a Bloom filter for large ones"""
+
+    def __init__(self, emails):
+        if len(emails) <= SUBMISSION_INDEX_EXACT_LIMIT:
+            self.exact = set(emails)
+            self.bloom = None
+        else:
+            self.exact = None
+            # Leave room for submissions arriving before the next reload
+            self.bloom = BloomFilter(capacity=len(emails) * 2)
+            for email in emails:
+                self.bloom.add(email)
+
+    def add(self, email: str) -> None:
+        if self.exact is not None:
+            self.exact.add(email)
+        else:
+            self.bloom.add(email)
+
+    def is_full(self) -> bool:
+        return self.bloom is not None and self.bloom.count > self.bloom.capacity
+
+class SubmissionIndex:
+    """Answers "has this email submitted this form" from memory, warmed lazily per form"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = SUBMISSION_INDEX_TTL):
+        self._forms = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _load(self, db: Session, form_id: int) -> FormSubmissions:
+        rows = db.query(FormResponse.user_email).filter(FormResponse.form_id == form_id).all()
+        entry = FormSubmissions([normalize_email(row.user_email) for row in rows if row.user_email])
+        self._forms.set(form_id, entry)
+        return entry
+
+    def has_submitted(self, db: Session, form_id: int, user_email: str) -> bool:
+        entry = self._forms.get(form_id)
+        if entry is None or entry.is_full():
+            entry = self._load(db, form_id)
+
+        email = normalize_email(user_email)
+        if entry.exact is not None:
+            return email in entry.exact
+        if email not in entry.bloom:
+            return False
+        # Possible false positive: confirm against the database
+        return db.query(FormResponse.id).filter(
+            FormResponse.form_id == form_id,
+            FormResponse.user_email == user_email
+        ).first() is not None
+
+    def add(self, form_id: int, user_email: str) -> None:
+        entry = self._forms.get(form_id)
+        if entry is not None:
+            entry.add(normalize_email(user_email))
+
+    def forget(self, form_id: int) -> None:
+        self._forms.pop(form_id)
+
+def normalize_email(email: Optional[str]) -> str:
+    # MySQL compares user_email case-insensitively
+    return (email or "").lower()
+
+submission_index = SubmissionIndex()
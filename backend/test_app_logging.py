@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import io
+import json
+import logging
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app_logging import (
+    DroppingQueueHandler, RequestIdMiddleware, LOG_RECORDS_DROPPED,
+    configure_logging, shutdown_logging, get_logger
+)
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_structured_records_carry_request_id():
+    shutdown_logging()
+    stream = io.StringIO()
+    configure_logging(level="DEBUG", fmt="json", stream=stream)
+    logger = get_logger("test")
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/ping")
+    def ping():
+        logger.info("Pinged", form_id=3)
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("Failed")
+        logger.debug("Never kept", sample=0)
+        return {}
+
+    client = TestClient(app)
+    response = client.get("/ping", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["x-request-id"] == "abc-123"
+    assert len(client.get("/ping", headers={"X-Request-ID": "bad id!"}).headers["x-request-id"]) == 16
+    shutdown_logging()
+
+    records = _lines(stream)
+    assert [record["msg"] for record in records] == ["Pinged", "Failed", "Pinged", "Failed"]
+    assert records[0]["request_id"] == "abc-123"
+    assert records[0]["form_id"] == 3
+    assert records[0]["logger"] == "eventhub.test"
+    assert "ZeroDivisionError" in records[1]["exc"]
+    configure_logging()
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    record = logging.LogRecord("eventhub.test", logging.INFO, __file__, 1, "message %s", ("arg",), None)
+    before = LOG_RECORDS_DROPPED.snapshot()["samples"].get("", 0)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.queue.get_nowait().msg == "message arg"
+    assert LOG_RECORDS_DROPPED.snapshot()["samples"][""] == before + 1
+
+if __name__ == "__main__":
+    test_structured_records_carry_request_id()
+    test_full_queue_drops_instead_of_blocking()
+    print("Logging tests passed")
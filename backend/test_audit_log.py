@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from datetime import datetime, timedelta
+
+from audit_log import AuditLogWriter
+
+class FailingSession:
+    def bulk_insert_mappings(self, mapper, mappings):
+        raise RuntimeError("database unavailable")
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+
+def test_full_queue_drops_events():
+    writer = AuditLogWriter(maxsize=2)
+    assert writer.log("a@example.com", "admin", "view_users", "user_management")
+    assert writer.log("a@example.com", "admin", "view_user", "user", 1)
+    assert not writer.log("a@example.com", "admin", "view_user", "user", 2)
+    
+    stats = writer.stats()
+    assert stats["queued"] == 2
+    assert stats["dropped"] == 1
+
+def test_failed_batch_is_requeued():
+    writer = AuditLogWriter(maxsize=10, batch_size=5)
+    for i in range(3):
+        writer.log("a@example.com", "admin", "view_user", "user", i + 1)
+    
+    try:
+        writer.flush(FailingSession())
+    except RuntimeError:
+        pass
+    
+    stats = writer.stats()
+    assert stats["queued"] == 3
+    assert stats["failed_batches"] == 1
+    assert writer._take_batch()[0]["resource_id"] == "1"
+
+def test_log_view_survives_failed_flush(api_client, monkeypatch):
+    from audit_log import audit_log_writer
+    client, db = api_client
+    
+    def failing_flush(session):
+        raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(audit_log_writer, "flush", failing_flush)
+    response = client.get("/api/logs")
+    assert response.status_code == 200
+    assert response.json() == []
+
+def _seed_logs(db):
+    from database import AuditLog
+    base = datetime(2024, 3, 14, 9, 0, 0)
+    # Pairs of rows share a timestamp, so pages must break ties on id
+    db.add_all([AuditLog(user_email=f"user{i % 3}@example.com", user_role="admin", action="view_form" if i % 2 else "edit_form",
+                         resource_type="form", resource_id=str(i), created_at=base + timedelta(minutes=i // 2))
+                for i in range(25)])
+    db.commit()
+
+def test_log_search_pages_and_filters(api_client):
+    client, db = api_client
+    _seed_logs(db)
+    
+    seen, cursor = [], None
+    while True:
+        page = client.get("/api/logs/search", params={"limit": 4, **({"cursor": cursor} if cursor else {})}).json()
+        seen += [log["resource_id"] for log in page["logs"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    # Every row exactly once, newest first with ties ordered by id
+    assert seen == [str(i) for i in range(24, -1, -1)]
+    
+    exact = client.get("/api/logs/search", params={"limit": 4}).json()
+    assert len(exact["logs"]) == 4 and exact["next_cursor"]
+    assert client.get("/api/logs/search", params={"limit": 25}).json()["next_cursor"] is None
+    
+    edits = client.get("/api/logs/search", params={"action": "edit_form", "user_email": "user0@example.com"}).json()["logs"]
+    assert [log["resource_id"] for log in edits] == ["24", "18", "12", "6", "0"]
+    prefix = client.get("/api/logs/search", params={"user_email": "user1", "email_match": "prefix"}).json()["logs"]
+    assert len(prefix) == 8
+    window = client.get("/api/logs/search", params={"start_date": "2024-03-14T09:03:00", "end_date": "2024-03-14T09:05:00"}).json()["logs"]
+    # end_date is exclusive
+    assert sorted(int(log["resource_id"]) for log in window) == list(range(6, 10))
+    
+    for cursor in ("not-base64!", "bm90IGEgY3Vyc29y", "MjAyNC0wMy0xNHxhYmM="):
+        assert client.get("/api/logs/search", params={"cursor": cursor}).status_code == 400
+
+def test_log_export_streams_filtered_rows(api_client):
+    client, db = api_client
+    _seed_logs(db)
+    
+    lines = client.get("/api/logs/export", params={"action": "view_form"}).text.splitlines()
+    assert len(lines) == 12
+    assert json.loads(lines[0])["resource_id"] == "23"
+    
+    csv_rows = client.get("/api/logs/export", params={"format": "csv", "user_email": "user2@example.com"}).text.splitlines()
+    assert csv_rows[0].startswith("id,user_email")
+    assert len(csv_rows) == 1 + 8
+
+if __name__ == "__main__":
+    test_full_queue_drops_events()
+    test_failed_batch_is_requeued()
+    print("Audit log tests passed")
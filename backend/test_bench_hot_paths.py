@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from types import SimpleNamespace
+
+from bench_hot_paths import run_benchmarks, compare_results
+
+def test_compare_flags_only_regressions():
+    baseline = {"calibration": {"relative": 1.0}, "form_hash": {"relative": 0.10}, "qr_code": {"relative": 400.0},
+                "excel_import": {"error": "openpyxl missing"}}
+    results = {"calibration": {"relative": 1.0}, "form_hash": {"relative": 0.14}, "qr_code": {"relative": 410.0},
+               "excel_import": {"relative": 3.0}, "event_dates": {"relative": 9.0}}
+    regressions = compare_results(results, baseline, threshold=30)
+    assert [r["name"] for r in regressions] == ["form_hash"]
+    assert regressions[0]["change_pct"] == 40.0
+
+def test_benchmarks_run():
+    results = run_benchmarks(["form_hash", "quiz_scoring"], rounds=1)
+    assert set(results) == {"calibration", "form_hash", "quiz_scoring"}
+    assert results["calibration"]["relative"] == 1.0
+    assert results["form_hash"]["us"] > 0
+
+def test_extracted_helpers_match_endpoints():
+    from main import format_event_date, personalize_template
+    assert format_event_date("2024-03-14 09:30") == ("2024-03-14 09:30:00", "2024-03-14", "09:30")
+    assert format_event_date("2024-03-14") == ("2024-03-14 00:00:00", "2024-03-14", "00:00")
+    assert format_event_date(None) == ("", "", "00:00")
+    assert format_event_date("14 March 2024") == ("14 March 2024", "14", "March 2024")
+
+    user = SimpleNamespace(name=None, first_name="Priya", last_name="K", email="p@example.com", phone_number=None, college_name="PSG")
+    assert personalize_template("{{name}} <{{email}}> {{phone}}|{{college}}", user) == "Priya K <p@example.com> |PSG"
+
+if __name__ == "__main__":
+    test_compare_flags_only_regressions()
+    test_benchmarks_run()
+    test_extracted_helpers_match_endpoints()
+    print("All benchmark tests passed")
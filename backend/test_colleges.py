@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from colleges import normalize_college_name, CollegeMatcher
+from database import User, College, CollegeAlias
+
+def test_normalize_college_name():
+    assert normalize_college_name("P.S.G. College of Tech.") == "psg college technology"
+    assert normalize_college_name("  PSG College of Technology ") == "psg college technology"
+    assert normalize_college_name("Govt. Arts & Science College") == "government arts science college"
+    assert normalize_college_name(None) == ""
+
+def test_matcher_merges_variants_only():
+    matcher = CollegeMatcher(threshold=0.88)
+    matcher.add(1, normalize_college_name("PSG College of Technology"))
+    matcher.add(2, normalize_college_name("Anna University"))
+    
+    assert matcher.match(normalize_college_name("PSG Tech")) == 1
+    assert matcher.match(normalize_college_name("PSG Colege of Technology")) == 1
+    assert matcher.match(normalize_college_name("PSG College of Arts and Science")) is None
+    assert matcher.match(normalize_college_name("Madras University")) is None
+
+def test_editing_a_college_reassigns_college_id(api_client):
+    client, db = api_client
+    db.add(College(id=1, name="PSG College of Technology", normalized_name="psg college technology"))
+    db.add(CollegeAlias(normalized_name=normalize_college_name("PSG Tech"), college_id=1))
+    user = User(email="priya@example.com", name="Priya", college_name="Anna University")
+    db.add(user)
+    db.commit()
+    
+    assert client.put(f"/api/users/{user.id}", json={"college": "P.S.G. Tech"}).status_code == 200
+    db.refresh(user)
+    assert (user.college_name, user.college_id) == ("P.S.G. Tech", 1)
+    
+    # Unknown spellings wait for the next clustering run
+    assert client.put(f"/api/users/{user.id}", json={"college": "Madras University"}).status_code == 200
+    db.refresh(user)
+    assert (user.college_name, user.college_id) == ("Madras University", None)
+
+if __name__ == "__main__":
+    test_normalize_college_name()
+    test_matcher_merges_variants_only()
+    print("College tests passed")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, User, Event, College, Form, FormResponse, RegistrationDailyRollup
+from registration_rollup import rebuild_rollups
+from dashboard import dashboard_summary, parse_widgets, _widget_cache
+
+def test_parse_widgets():
+    assert parse_widgets("stats, colleges") == ["stats", "colleges"]
+    assert "attendance_stats" in parse_widgets(None)
+    try:
+        parse_widgets("stats,unknown")
+        assert False, "unknown widget accepted"
+    except ValueError:
+        pass
+
+def test_widgets_share_daily_counts_and_cache():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Event.__table__, RegistrationDailyRollup.__table__])
+    db = sessionmaker(bind=engine)()
+    now = datetime.now()
+    for i in range(20):
+        db.add(User(email=f"u{i}@example.com", eventId=7, created_at=now - timedelta(days=i * 5)))
+    db.commit()
+    rebuild_rollups(db)
+    
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    _widget_cache.clear()
+    summary = dashboard_summary(db, 7, ["stats", "registration_chart", "monthly_registrations"])
+    assert summary["stats"]["total_registrations"] == 20
+    assert summary["stats"]["today_registrations"] == 1
+    assert sum(summary["registration_chart"]["data"]) == 2
+    # One daily query serves all three widgets, plus the total and the events count
+    assert len(statements) == 3
+    
+    statements.clear()
+    assert dashboard_summary(db, 7, ["stats", "monthly_registrations"])["stats"] == summary["stats"]
+    assert statements == []
+
+def test_attendance_matches_emails_case_insensitively():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Form.__table__, FormResponse.__table__])
+    db = sessionmaker(bind=engine)()
+    forms = [Form(title=f"Day {i}", type="attendance", event_id=7) for i in (1, 2)]
+    db.add_all(forms + [User(email=email, eventId=7) for email in ("Priya@Example.com", "ravi@example.com", "anu@example.com")])
+    db.commit()
+    db.add_all([
+        FormResponse(form_id=forms[0].id, user_email="priya@example.com", responses="{}"),
+        FormResponse(form_id=forms[1].id, user_email="PRIYA@example.com", responses="{}"),
+        # The same form answered under two spellings still counts once
+        FormResponse(form_id=forms[0].id, user_email="Ravi@example.com", responses="{}"),
+        FormResponse(form_id=forms[0].id, user_email="ravi@example.com", responses="{}"),
+    ])
+    db.commit()
+    
+    _widget_cache.clear()
+    assert dashboard_summary(db, 7, ["attendance_stats"])["attendance_stats"]["data"] == [1, 1, 1]
+
+def test_colleges_count_unclustered_spellings():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, College.__table__])
+    db = sessionmaker(bind=engine)()
+    db.add(College(id=1, name="PSG College of Technology", normalized_name="psg college technology"))
+    db.add_all([User(email=f"p{i}@example.com", eventId=7, college_id=1, college_name="PSG Tech") for i in range(2)])
+    # Registered since the last clustering run
+    db.add_all([User(email=f"a{i}@example.com", eventId=7, college_name="Anna University") for i in range(3)])
+    db.add(User(email="late@example.com", eventId=7, college_name="PSG College of Technology "))
+    db.add(User(email="blank@example.com", eventId=7, college_name=""))
+    db.add(User(email="other@example.com", eventId=8, college_name="MIT"))
+    db.commit()
+    
+    _widget_cache.clear()
+    widget = dashboard_summary(db, 7, ["colleges"])["colleges"]
+    assert widget["colleges"] == [{"name": "PSG College of Technology", "count": 3}, {"name": "Anna University", "count": 3}]
+    assert widget["total_colleges"] == 2
+    assert dashboard_summary(db, None, ["colleges"])["colleges"]["total_colleges"] == 3
+
+if __name__ == "__main__":
+    test_parse_widgets()
+    test_widgets_share_daily_counts_and_cache()
+    test_attendance_matches_emails_case_insensitively()
+    test_colleges_count_unclustered_spellings()
+    print("Dashboard tests passed")
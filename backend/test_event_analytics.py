@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Event, User, College, Form, FormResponse, QAQuestion
+from payment_model import Payment, PaymentStatus, PaymentMode
+
+def _seed_event(db):
+    db.add(Event(id=1, name="AI Workshop", slug="ai-workshop"))
+    db.add(College(id=1, name="PSG College of Technology", normalized_name="psg college technology"))
+    day1 = Form(title="Day 1", type="attendance", event_id=1, created_by="admin@example.com", is_active=1)
+    day2 = Form(title="Day 2", type="attendance", event_id=1, created_by="admin@example.com", is_active=1)
+    db.add_all([day1, day2])
+    db.add_all([
+        User(email="Priya@Example.com", name="Priya", eventId=1, college_id=1, college_name="PSG Tech"),
+        User(email="ravi@example.com", name="Ravi", eventId=1, college_id=1, college_name="PSG College of Technology"),
+        # Registered after the last clustering run
+        User(email="anu@example.com", name="Anu", eventId=1, college_name="Anna Univ "),
+        User(email="kiran@example.com", name="Kiran", eventId=1, college_name=""),
+    ])
+    db.commit()
+    # Forms store the address as typed, which need not match the registration's case
+    db.add_all([
+        FormResponse(form_id=day1.id, user_email="priya@example.com", user_name="Priya", responses="{}"),
+        FormResponse(form_id=day2.id, user_email="PRIYA@EXAMPLE.COM", user_name="Priya", responses="{}"),
+        FormResponse(form_id=day1.id, user_email="Anu@example.com", user_name="Anu", responses="{}"),
+    ])
+    db.commit()
+
+def test_event_analytics_attendance_and_colleges(api_client):
+    client, db = api_client
+    _seed_event(db)
+    
+    body = client.get("/api/events/1/analytics").json()
+    assert body["total_registrations"] == 4
+    assert body["attendance_stats"] == {"attended": 1, "partially_attended": 1, "not_attended": 2}
+    assert body["colleges"] == [{"name": "PSG College of Technology", "count": 2}, {"name": "Anna Univ", "count": 1}]
+    psg = body["college_stats"]["PSG College of Technology"]
+    assert (psg["registered"], psg["attended"], psg["not_attended"], psg["Day 1_responses"]) == (2, 1, 1, 1)
+    assert body["college_stats"]["Anna Univ"]["partially_attended"] == 1
+
+def test_event_participants_match_emails_case_insensitively(api_client):
+    client, db = api_client
+    _seed_event(db)
+    db.add(Payment(payment_id="p1", user_id=1, user_email="Priya@Example.com", amount=500, payment_status=PaymentStatus.completed,
+                   mode_of_payment=PaymentMode.upi, transaction_id="t1"))
+    db.add_all([QAQuestion(event_id=1, user_email=email, question="?") for email in ("priya@example.com", "PRIYA@example.com", "Ravi@Example.com")])
+    db.commit()
+    
+    participants = {row["email"]: row for row in client.get("/api/events/1/participants").json()}
+    priya = participants["Priya@Example.com"]
+    assert (priya["attendance_status"], priya["payment_status"], priya["chat_count"]) == ("Attended", "Paid", 2)
+    assert participants["anu@example.com"]["attendance_status"] == "Partially Attended"
+    assert (participants["ravi@example.com"]["chat_count"], participants["ravi@example.com"]["payment_status"]) == (1, "Pending")
+
+if __name__ == "__main__":
+    print("Event analytics tests need pytest fixtures: python -m pytest test_event_analytics.py")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, Form
+from form_cache import FormHashIndex
+from form_utils import generate_form_hash
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Form.__table__])
+    return sessionmaker(bind=engine)()
+
+def test_unknown_hashes_between_rescans():
+    db = make_session()
+    old = Form(title="Old", type="quiz", is_active=1, created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1))
+    db.add(old)
+    db.commit()
+    index = FormHashIndex(min_rescan_interval=3600)
+    assert index.find_active_form(db, generate_form_hash(old)).id == old.id
+
+    # Created a moment ago (e.g. on another worker): found without waiting for the next full rescan
+    new = Form(title="New", type="quiz", is_active=1)
+    db.add(new)
+    db.commit()
+    assert index.find_active_form(db, generate_form_hash(new)).id == new.id
+
+    # Deactivated forms are dropped from the index
+    new.is_active = 0
+    db.commit()
+    assert index.find_active_form(db, generate_form_hash(new)) is None
+    assert index.form_id(generate_form_hash(new)) is None
+    # Dropping a form allows an immediate full rescan, which restarts the interval
+    assert index.find_active_form(db, "000000000000") is None
+
+    # Changes outside the recent window need a full rescan, which the interval allows again
+    stale = Form(title="Stale", type="quiz", is_active=1, created_at=datetime.now() - timedelta(days=2),
+                 updated_at=datetime.now() - timedelta(days=2))
+    db.add(stale)
+    db.commit()
+    assert index.find_active_form(db, generate_form_hash(stale)) is None
+    index.min_rescan_interval = 0
+    assert index.find_active_form(db, generate_form_hash(stale)).id == stale.id
+
+def test_public_form_cache_and_etag(api_client):
+    client, db = api_client
+    form = Form(title="Feedback", type="feedback", is_active=1, created_by="admin@example.com")
+    db.add(form)
+    db.commit()
+    path = f"/api/public/forms/{generate_form_hash(form)}"
+
+    first = client.get(path)
+    assert first.status_code == 200 and first.json()["title"] == "Feedback"
+    etag = first.headers["etag"]
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["etag"] == etag
+    assert client.get(path).json() == first.json()
+
+    # Deactivated by another worker: this worker's cache must not keep serving it
+    form.is_active = 0
+    db.commit()
+    assert client.get(path).status_code == 404
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 404
+
+if __name__ == "__main__":
+    test_unknown_hashes_between_rescans()
+    print("Form cache tests passed (API checks need pytest fixtures)")
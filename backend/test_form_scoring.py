@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from types import SimpleNamespace
+from form_scoring import AnswerKey
+
+def make_question(id, question_type, points=0, correct_answer=None):
+    return SimpleNamespace(id=id, question_type=question_type, points=points, correct_answer=correct_answer)
+
+def test_quiz_scoring():
+    answer_key = AnswerKey(1, [
+        make_question(1, "single_choice", 2, "Blue"),
+        make_question(2, "yes_no", 3, "Yes"),
+        make_question(3, "text", None),
+    ])
+    
+    assert answer_key.total_points == 5
+    assert answer_key.score({"1": "Blue", "2": "Yes"}) == 5
+    assert answer_key.score({"1": "Red", "2": "Yes", "3": "anything"}) == 3
+    assert answer_key.score({}) == 0
+
+def test_feedback_chars():
+    answer_key = AnswerKey(2, [
+        make_question(10, "text"),
+        make_question(11, "rating"),
+        make_question(12, "text"),
+    ])
+    
+    assert answer_key.feedback_chars({"10": "  good  ", "11": "5", "12": "ok"}) == 6
+
+if __name__ == "__main__":
+    test_quiz_scoring()
+    test_feedback_chars()
+    print("SUCCESS: form scoring tests passed")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import User, Form, FormQuestion, FormResponse
+from form_utils import generate_form_hash
+from forms_routes import submission_results
+
+def _quiz(db):
+    form = Form(title="Quiz", type="quiz", event_id=1, created_by="admin@example.com", is_active=1)
+    db.add(form)
+    db.flush()
+    question = FormQuestion(form_id=form.id, question_text="2 + 2?", question_type="single_choice", options='["3", "4"]',
+                            points=5, correct_answer="4")
+    db.add(question)
+    db.add_all([User(email=f"s{i}@example.com", name=f"Student {i}", registration_id=f"R{i}") for i in range(3)])
+    db.commit()
+    return form, question
+
+def _submit(client, form, question, email, answer="4", key=None):
+    body = {"form_id": form.id, "user_email": email, "user_name": email, "responses": {str(question.id): answer}}
+    return client.post(f"/api/public/forms/{generate_form_hash(form)}/submit", json=body,
+                       headers={"Idempotency-Key": key} if key else {})
+
+def test_idempotent_retries_replay_the_result(api_client):
+    client, db = api_client
+    form, question = _quiz(db)
+
+    first = _submit(client, form, question, "s0@example.com", key="k1")
+    assert first.status_code == 200 and first.json()["score"] == 5
+    # Retry answered from the in-memory result cache, even with a different answer
+    assert _submit(client, form, question, "s0@example.com", answer="3", key="k1").json() == first.json()
+    # Retry handled by a worker without the cached result: replayed from the stored key
+    submission_results.clear()
+    assert _submit(client, form, question, "s0@example.com", key="k1").json() == first.json()
+    # A new submission by the same user is a duplicate
+    duplicate = _submit(client, form, question, "s0@example.com", key="k2")
+    assert duplicate.status_code == 400
+    assert _submit(client, form, question, "s0@example.com").status_code == 400
+    assert db.query(FormResponse).count() == 1
+
+    assert _submit(client, form, question, "s1@example.com", key="x" * 65).status_code == 400
+
+def test_unique_constraint_catches_unseen_duplicates(api_client):
+    client, db = api_client
+    form, question = _quiz(db)
+    assert _submit(client, form, question, "s0@example.com").status_code == 200
+
+    # Rows written by another worker after this one loaded its submission index
+    db.add(FormResponse(form_id=form.id, user_email="s1@example.com", user_name="s1", responses="{}", score=5, idempotency_key="k9"))
+    db.add(FormResponse(form_id=form.id, user_email="s2@example.com", user_name="s2", responses="{}", score=0))
+    db.commit()
+
+    # The insert hits the (form_id, user_email) constraint; a retry of the stored submission replays it
+    replay = _submit(client, form, question, "s1@example.com", key="k9")
+    assert replay.status_code == 200 and replay.json()["score"] == 5
+    duplicate = _submit(client, form, question, "s2@example.com", key="other")
+    assert duplicate.status_code == 400
+    assert db.query(FormResponse).filter(FormResponse.form_id == form.id).count() == 3
+
+if __name__ == "__main__":
+    print("Submission tests need pytest fixtures: python -m pytest test_form_submission.py")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, FormAnalytics
+import form_views
+from form_views import HyperLogLog, FormViewCounter, visitor_key
+
+def test_hyperloglog_estimate():
+    sketch = HyperLogLog()
+    for i in range(20000):
+        sketch.add(f"visitor-{i}")
+        sketch.add(f"visitor-{i}")  # repeat views don't count twice
+    
+    # p=10 gives ~3% standard error
+    assert abs(sketch.count() - 20000) < 20000 * 0.1
+
+def test_hyperloglog_merge_roundtrip():
+    a = HyperLogLog()
+    b = HyperLogLog()
+    for i in range(500):
+        a.add(f"a-{i}")
+        b.add(f"b-{i}")
+    
+    merged = HyperLogLog(registers=a.to_bytes())
+    merged.merge(b)
+    assert abs(merged.count() - 1000) < 100
+
+def test_pending_views_counted_before_flush():
+    counter = FormViewCounter()
+    counter.record(1, "10.0.0.1|ua")
+    counter.record(1, "10.0.0.1|ua")
+    counter.record(1, "10.0.0.2|ua")
+    
+    views, unique_visitors = counter.stats(1, None)
+    assert views == 3
+    assert unique_visitors == 2
+    assert counter.stats(2, None) == (0, 0)
+
+def test_flushes_from_several_workers_add_up(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'views.db'}")
+    Base.metadata.create_all(engine, tables=[FormAnalytics.__table__])
+    Session = sessionmaker(bind=engine)
+    workers = [FormViewCounter() for _ in range(3)]
+    for n, counter in enumerate(workers):
+        for i in range(10 * (n + 1)):
+            counter.record(1, f"10.0.{n}.{i}|ua")
+
+    # Each worker flushes through its own session, one after another on the same row
+    sessions = [Session() for _ in workers]
+    for counter, db in zip(workers, sessions):
+        assert counter.flush(db) == 1
+    check = Session()
+    analytics = check.query(FormAnalytics).filter(FormAnalytics.form_id == 1).one()
+    assert analytics.total_accessed == 60
+    assert abs(analytics.unique_visitors - 60) <= 3
+    assert check.query(FormAnalytics).count() == 1
+
+def test_visitor_key_behind_proxy():
+    request = SimpleNamespace(client=SimpleNamespace(host="10.0.0.1"),
+                              headers={"x-forwarded-for": "203.0.113.7, 10.0.0.1", "user-agent": "ua"})
+    assert visitor_key(request) == "203.0.113.7|ua"
+    request.headers = {"user-agent": "ua"}
+    assert visitor_key(request) == "10.0.0.1|ua"
+
+def test_failed_background_flush_is_logged(monkeypatch):
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("eventhub.form_views")
+    logger.addHandler(handler)
+    counter = FormViewCounter()
+    counter.record(1, "visitor")
+    
+    def failing_flush(db):
+        raise RuntimeError("database is down")
+    monkeypatch.setattr(counter, "flush", failing_flush)
+    monkeypatch.setattr(form_views, "SessionLocal", lambda: SimpleNamespace(close=lambda: None))
+    try:
+        counter.flush_now()
+    finally:
+        logger.removeHandler(handler)
+    assert [(record.levelname, record.getMessage()) for record in records] == [("ERROR", "Error flushing form views")]
+    assert records[0].exc_info[0] is RuntimeError
+
+if __name__ == "__main__":
+    test_hyperloglog_estimate()
+    test_hyperloglog_merge_roundtrip()
+    test_pending_views_counted_before_flush()
+    test_visitor_key_behind_proxy()
+    print("SUCCESS: form view tests passed")
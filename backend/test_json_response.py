@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from database import User, Event, Form
+from json_response import dumps
+
+def test_dumps_handles_api_values():
+    payload = {"created_at": datetime(2024, 3, 14, 9, 30, 5), "day": date(2024, 3, 14), "amount": Decimal("499.50"),
+               "forms": {3, 4}, 7: "int key", "other": object}
+    decoded = json.loads(dumps(payload))
+    assert decoded["created_at"] == "2024-03-14T09:30:05"
+    assert decoded["day"] == "2024-03-14"
+    assert decoded["amount"] == 499.5
+    assert sorted(decoded["forms"]) == [3, 4]
+    assert decoded["7"] == "int key"
+    assert decoded["other"] == str(object)
+
+def test_endpoints_serialize_datetimes_natively(api_client):
+    client, db = api_client
+    registered = datetime(2024, 3, 14, 9, 30, 5)
+    db.add(Event(id=1, name="Event", event_date="2024-03-20", created_at=registered))
+    db.add_all([User(email=f"s{i}@example.com", name=f"Student {i}", eventId=1, created_at=registered) for i in range(3)])
+    db.add(Form(title="Quiz", type="quiz", event_id=1, created_by="admin@example.com", created_at=registered))
+    db.commit()
+
+    # Pre-serialized page, bypassing jsonable_encoder
+    page = client.get("/api/users?limit=2").json()
+    assert page["users"][0]["registered_at"] == "2024-03-14T09:30:05"
+    assert page["total_count"] == 3
+    # Streamed full list
+    assert client.get("/api/users").json()["users"][2]["created_date"] == "2024-03-14T09:30:05"
+    # Plain dict endpoints on the app and on included routers use the default response class
+    assert client.get("/api/events").json()[0]["created_at"] == "2024-03-14T09:30:05"
+    forms = client.get("/api/forms")
+    assert forms.status_code == 200 and forms.headers["content-type"] == "application/json"
+    assert client.get("/api/events/1/participants").json()[0]["created_at"] == "2024-03-14T09:30:05"
+    analytics = client.get("/api/events/1/analytics").json()
+    assert analytics["total_registrations"] == 3
+
+if __name__ == "__main__":
+    test_dumps_handles_api_values()
+    print("JSON response tests passed")
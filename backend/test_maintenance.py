@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import gzip
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, OTP, AuditLog
+from maintenance import purge_expired_otps, archive_audit_logs, audit_partition_statements
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[OTP.__table__, AuditLog.__table__])
+    return sessionmaker(bind=engine)()
+
+def test_purge_expired_otps():
+    db = make_session()
+    utc_now, now = datetime.utcnow(), datetime.now()
+    db.add_all([
+        OTP(email="expired@example.com", otp_code="111111", expires_at=utc_now - timedelta(hours=30), created_at=now - timedelta(hours=30)),
+        OTP(email="no-expiry@example.com", otp_code="222222", expires_at=None, created_at=now),
+        # Used long ago but with an expiry still inside the retention window
+        OTP(email="used@example.com", otp_code="333333", expires_at=utc_now - timedelta(hours=1), is_used=1, created_at=now - timedelta(hours=30)),
+        OTP(email="recent@example.com", otp_code="444444", expires_at=utc_now - timedelta(hours=1), is_used=1, created_at=now - timedelta(hours=1)),
+        OTP(email="live@example.com", otp_code="555555", expires_at=utc_now + timedelta(minutes=5), is_used=0, created_at=now),
+    ])
+    db.commit()
+    
+    # A batch size of 1 exercises the commit-per-batch loop
+    assert purge_expired_otps(db, retention_hours=24, batch_size=1) == 3
+    assert sorted(otp.email for otp in db.query(OTP)) == ["live@example.com", "recent@example.com"]
+    assert purge_expired_otps(db, retention_hours=24) == 0
+
+def test_archive_audit_logs(tmp_path):
+    db = make_session()
+    now = datetime.now()
+    for i in range(7):
+        db.add(AuditLog(user_email=f"user{i}@example.com", action="edit_form", resource_type="form", resource_id=str(i),
+                        details=json.dumps({"field": "title"}), created_at=now - timedelta(days=100 + i)))
+    db.add(AuditLog(user_email="recent@example.com", action="view_form", created_at=now - timedelta(days=1)))
+    db.commit()
+    
+    archived, path = archive_audit_logs(db, retention_days=90, archive_dir=str(tmp_path), batch_size=3)
+    assert archived == 7
+    assert path.endswith(".ndjson.gz") and os.path.dirname(path) == str(tmp_path)
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        rows = [json.loads(line) for line in archive]
+    assert [row["resource_id"] for row in rows] == [str(i) for i in range(7)]
+    assert rows[0]["user_email"] == "user0@example.com"
+    assert datetime.fromisoformat(rows[0]["created_at"]) < now - timedelta(days=90)
+    assert [log.user_email for log in db.query(AuditLog)] == ["recent@example.com"]
+    
+    # Nothing left to archive: no empty file is written
+    assert archive_audit_logs(db, retention_days=90, archive_dir=str(tmp_path)) == (0, None)
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_partitions_only_on_mysql():
+    assert audit_partition_statements(make_session()) == []
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_purge_expired_otps()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_archive_audit_logs(Path(tmp))
+    test_partitions_only_on_mysql()
+    print("Maintenance tests passed")
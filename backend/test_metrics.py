@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import Counter, Histogram, render, _merge
+
+def test_histogram_renders_cumulative_buckets():
+    latency = Histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, "/api/users")
+    
+    text = render({"latency_seconds": latency.snapshot()})
+    assert 'latency_seconds_bucket{route="/api/users",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/api/users",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/api/users",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/api/users"} 4' in text
+    assert "# TYPE latency_seconds histogram" in text
+
+def test_worker_snapshots_are_summed():
+    requests = Counter("requests_total", "Requests", ["status"])
+    requests.inc("200", amount=3)
+    other_worker = Counter("requests_total", "Requests", ["status"])
+    other_worker.inc("200", amount=2)
+    other_worker.inc("500")
+    
+    total = {}
+    _merge(total, {"requests_total": requests.snapshot()})
+    _merge(total, {"requests_total": other_worker.snapshot()})
+    text = render(total)
+    assert 'requests_total{status="200"} 5' in text
+    assert 'requests_total{status="500"} 1' in text
+
+if __name__ == "__main__":
+    test_histogram_renders_cumulative_buckets()
+    test_worker_snapshots_are_summed()
+    print("Metrics tests passed")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfilingMiddleware, create_profile_token, verify_profile_token, list_profiles, read_profile
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_profile_tokens():
+    token = create_profile_token(minutes=1)
+    assert verify_profile_token(token["value"])
+    expires, _, signature = token["value"].partition(".")
+    assert not verify_profile_token(f"{int(expires) + 60}.{signature}")
+    assert not verify_profile_token("garbage")
+
+def test_signed_requests_are_profiled():
+    directory = tempfile.mkdtemp()
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, sample_rate=0, directory=directory)
+
+    @app.get("/slow/{n}")
+    def slow(n: int):
+        busy_loop(0.1)
+        return {"n": n}
+
+    client = TestClient(app)
+    assert "x-profile-id" not in client.get("/slow/1").headers
+    assert list_profiles(directory=directory) == []
+
+    response = client.get("/slow/2", headers={"X-Profile-Request": create_profile_token()["value"]})
+    profile_id = response.headers["x-profile-id"]
+    [profile] = list_profiles(directory=directory)
+    assert profile["id"] == profile_id
+    assert profile["route"] == "/slow/{n}"
+    assert profile["duration_ms"] >= 100
+    assert profile["top_functions"][0]["function"].startswith("busy_loop")
+    stacks = read_profile(profile_id, directory=directory)
+    assert stacks.startswith("slow (test_profiling.py")
+    assert read_profile("../../etc/passwd", directory=directory) is None
+
+if __name__ == "__main__":
+    os.environ.setdefault("SECRET_KEY", "test")
+    test_profile_tokens()
+    test_signed_requests_are_profiled()
+    print("Profiling tests passed")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+
+from database import User, Event, Form, FormResponse, QAQuestion
+from payment_model import Payment, PaymentStatus, PaymentMode
+from query_budget import QueryStats, statement_shape
+
+def test_statement_shape_folds_in_lists():
+    short = statement_shape("SELECT * FROM users WHERE email IN (?, ?)")
+    long = statement_shape("SELECT *\n  FROM users WHERE email IN (?, ?, ?, ?)")
+    assert short == long == "SELECT * FROM users WHERE email IN (...)"
+
+    stats = QueryStats()
+    for _ in range(5):
+        stats.record("SELECT * FROM users WHERE id = ?", 0.001)
+    stats.record("SELECT * FROM forms", 0.001)
+    assert stats.count == 6
+    assert stats.repeated(5) == [("SELECT * FROM users WHERE id = ?", 5)]
+
+def _seed(db, users=20):
+    db.add(Event(id=1, name="Event"))
+    forms = [Form(title=f"Form {i}", type=kind, event_id=1, created_by="admin@example.com")
+             for i, kind in enumerate(["attendance", "attendance", "quiz"])]
+    db.add_all(forms)
+    db.flush()
+    for i in range(users):
+        email = f"student{i}@example.com"
+        db.add(User(email=email, name=f"Student {i}", college_name=f"College {i % 3}", eventId=1))
+        for form in forms[:1 + i % 3]:
+            db.add(FormResponse(form_id=form.id, user_email=email, user_name=f"Student {i}", responses="{}", score=i))
+        if i % 2:
+            db.add(Payment(payment_id=f"pay{i}", user_id=i, user_email=email, amount=100,
+                           payment_status=PaymentStatus.completed, mode_of_payment=PaymentMode.upi))
+        db.add(QAQuestion(event_id=1, user_email=email, question="?", created_at=datetime.now()))
+    db.commit()
+    return forms
+
+def test_endpoint_query_budgets(api_client, query_budget):
+    from dashboard import _widget_cache
+    client, db = api_client
+    forms = _seed(db)
+    _widget_cache.clear()
+
+    # Budgets do not grow with the number of users or forms
+    with query_budget(max_queries=10):
+        assert client.get("/api/forms").status_code == 200
+    with query_budget(max_queries=10):
+        response = client.get("/api/events/1/participants")
+    assert response.status_code == 200
+    participants = {p["email"]: p for p in response.json()}
+    assert participants["student1@example.com"]["payment_status"] == "Paid"
+    assert participants["student1@example.com"]["attendance_status"] == "Attended"
+    assert participants["student0@example.com"]["attendance_status"] == "Partially Attended"
+    assert participants["student0@example.com"]["chat_count"] == 1
+    with query_budget(max_queries=15):
+        assert client.get("/api/events/1/analytics").status_code == 200
+    with query_budget(max_queries=20):
+        assert client.get("/api/dashboard/summary").status_code == 200
+    with query_budget(max_queries=12):
+        response = client.get(f"/api/forms/{forms[2].id}/analytics")
+    assert response.status_code == 200
+    assert response.json()["top_students"][0]["college"] == "College 2"
+
+if __name__ == "__main__":
+    test_statement_shape_folds_in_lists()
+    print("Endpoint budgets need pytest fixtures: python -m pytest test_query_budget.py")
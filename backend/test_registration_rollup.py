@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, User, RegistrationDailyRollup
+from registration_rollup import RegistrationRollup, rebuild_rollups, registration_total, daily_registrations, dimension_counts
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, RegistrationDailyRollup.__table__])
+    return sessionmaker(bind=engine)()
+
+def test_flushed_counts_match_rebuild():
+    db = make_session()
+    rollup = RegistrationRollup()
+    today = datetime.now()
+    for i in range(10):
+        user = User(email=f"u{i}@example.com", eventId=1 + i % 2, gender="F" if i < 4 else "M",
+                    utm_source="instagram" if i % 3 == 0 else None, created_at=today - timedelta(days=i % 3))
+        db.add(user)
+        rollup.record(user)
+        # Flushing twice exercises the upsert of existing rows
+        if i == 5:
+            rollup.flush(db)
+    db.commit()
+    rollup.flush(db)
+    
+    incremental = sorted((r.event_id, r.day, r.dimension, r.value, r.registrations) for r in db.query(RegistrationDailyRollup))
+    rebuild_rollups(db)
+    rebuilt = sorted((r.event_id, r.day, r.dimension, r.value, r.registrations) for r in db.query(RegistrationDailyRollup))
+    assert incremental == rebuilt
+    
+    assert registration_total(db) == 10
+    assert registration_total(db, event_id=1) == 5
+    assert registration_total(db, since=today.date()) == 4
+    assert sum(daily_registrations(db).values()) == 10
+    assert dimension_counts(db, "gender") == [("M", 6), ("F", 4)]
+    assert dimension_counts(db, "source") == [("instagram", 4)]
+
+if __name__ == "__main__":
+    test_flushed_counts_match_rebuild()
+    print("Registration rollup tests passed")
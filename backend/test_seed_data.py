@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from collections import Counter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import User, Form, FormQuestion, FormResponse, QAQuestion, RegistrationDailyRollup
+from payment_model import Payment
+from registration_rollup import registration_total
+from seed_data import seed_database
+
+def test_seeded_rows_are_consistent(seeded_db):
+    engine, summary = seeded_db
+    assert len(summary["event_ids"]) == 2
+    assert summary["counts"]["users"] == 400
+    with Session(bind=engine) as db:
+        assert db.query(User).count() == 400
+        assert db.query(Form).count() == 8
+        # Responses only come from the event's own users and never twice per form
+        pairs = db.query(FormResponse.form_id, FormResponse.user_email).all()
+        assert len(pairs) == len(set(pairs)) == summary["counts"]["form_responses"]
+        emails = {email for (email,) in db.query(User.email)}
+        assert {email for _, email in pairs} <= emails
+
+        # Quiz scores agree with the stored answers and correct options
+        quiz_id = summary["form_ids"]["quiz"][0]
+        questions = {str(q.id): q for q in db.query(FormQuestion).filter(FormQuestion.form_id == quiz_id)}
+        for response in db.query(FormResponse).filter(FormResponse.form_id == quiz_id).limit(20):
+            answers = json.loads(response.responses)
+            assert response.score == sum(q.points for qid, q in questions.items() if answers[qid] == q.correct_answer)
+
+        colleges = Counter(college for (college,) in db.query(User.college_name))
+        assert colleges.most_common(1)[0][1] > 400 / 20  # Skewed, not uniform
+        assert db.query(QAQuestion).count() > 0
+        assert 0 < db.query(Payment).count() < 400
+        assert db.query(RegistrationDailyRollup).count() > 0
+        assert registration_total(db) == 400
+
+def test_same_seed_same_data(tmp_path):
+    results = []
+    for name in ("a", "b"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        seed_database(engine, events=1, users_per_event=50, rollups=False)
+        with Session(bind=engine) as db:
+            results.append([(u.email, u.college_name, u.gender) for u in db.query(User).order_by(User.id)])
+        engine.dispose()
+    assert results[0] == results[1]
+
+def test_seeding_twice_appends(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'twice.db'}")
+    first = seed_database(engine, events=1, users_per_event=30, rollups=False)
+    second = seed_database(engine, events=1, users_per_event=30, rollups=False)
+    assert second["event_ids"][0] > first["event_ids"][0]
+    with Session(bind=engine) as db:
+        assert db.query(User).count() == 60
+    engine.dispose()
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    with tempfile.TemporaryDirectory() as directory:
+        test_same_seed_same_data(Path(directory))
+        test_seeding_twice_appends(Path(directory))
+    print("All seed data tests passed")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+from slow_queries import SlowQueryRecorder, fingerprint
+
+def test_fingerprint_normalizes_literals():
+    assert fingerprint("SELECT * FROM users WHERE id = 12 AND name = 'O''Brien'") == \
+        fingerprint("SELECT * FROM users\n WHERE id = 7 AND name = 'x'")
+    assert fingerprint("SELECT * FROM t WHERE a IN (?, ?, ?)") == "SELECT * FROM t WHERE a IN (...)"
+    assert "users2" in fingerprint("SELECT * FROM users2")
+
+def test_recorder_ranks_fingerprints():
+    recorder = SlowQueryRecorder(threshold_ms=50, max_fingerprints=2)
+    for i in range(10):
+        recorder.record(f"SELECT * FROM users WHERE id = {i}", 0.002)
+    recorder.record("SELECT * FROM forms", 0.1)
+    by_total = recorder.top(sort="total")
+    assert [entry["count"] for entry in by_total] == [1, 10]
+    assert recorder.top(sort="count")[0]["fingerprint"] == "SELECT * FROM users WHERE id = ?"
+    assert by_total[0]["p95_ms"] == 100.0
+    assert "test_slow_queries.py" in next(iter(by_total[0]["callers"]))
+
+    # A third fingerprint evicts the cheapest one
+    recorder.record("SELECT * FROM events", 0.05)
+    assert {entry["fingerprint"] for entry in recorder.top()} == {"SELECT * FROM forms", "SELECT * FROM events"}
+
+def test_engine_statements_are_recorded_and_dumped():
+    recorder = SlowQueryRecorder()
+    engine = create_engine("sqlite://")
+    recorder.instrument(engine)
+    with engine.connect() as conn:
+        for i in range(3):
+            conn.execute(text(f"SELECT {i}"))
+    [entry] = recorder.top()
+    assert entry["fingerprint"] == "SELECT ?" and entry["count"] == 3
+
+    path = recorder.dump(os.path.join(tempfile.mkdtemp(), "slow.json"))
+    with open(path) as f:
+        assert json.load(f)["queries"][0]["count"] == 3
+
+if __name__ == "__main__":
+    test_fingerprint_normalizes_literals()
+    test_recorder_ranks_fingerprints()
+    test_engine_statements_are_recorded_and_dumped()
+    print("Slow query tests passed")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from submission_index import BloomFilter, FormSubmissions
+
+def test_bloom_filter_membership():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(f"user{i}@example.com")
+    
+    # No false negatives
+    assert all(f"user{i}@example.com" in bloom for i in range(10000))
+    
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_small_forms_use_exact_set():
+    entry = FormSubmissions(["a@example.com"])
+    assert entry.exact == {"a@example.com"}
+    
+    entry.add("b@example.com")
+    assert "b@example.com" in entry.exact
+
+if __name__ == "__main__":
+    test_bloom_filter_membership()
+    test_small_forms_use_exact_set()
+    print("Submission index tests passed")
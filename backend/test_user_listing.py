@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+
+from database import User
+
+def _seed_users(db):
+    """Ten users; every third has no created_at and every fourth no name, with ties on both"""
+    start = datetime(2024, 3, 14, 9, 0)
+    for i in range(10):
+        db.add(User(email=f"s{i}@example.com", name=None if i % 4 == 0 else f"student {i % 3}", eventId=1))
+    db.commit()
+    for user in db.query(User):
+        i = user.id - 1
+        user.created_at = None if i % 3 == 0 else start + timedelta(minutes=i // 2)
+    db.commit()
+
+def _expected_ids(db, sort):
+    key = sort.lstrip("-")
+    users = db.query(User).all()
+    if key == "created_at":
+        # NULLs sort first, as on MySQL and SQLite
+        sort_key = lambda user: (user.created_at is not None, user.created_at or datetime.min, user.id)
+    elif key == "id":
+        sort_key = lambda user: user.id
+    else:
+        sort_key = lambda user: (getattr(user, key) or "", user.id)
+    return [str(user.id) for user in sorted(users, key=sort_key, reverse=sort.startswith("-"))]
+
+def _walk(client, sort, limit=3):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, "sort": sort, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/users", params=params)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert len(body["users"]) <= limit
+        ids += [user["id"] for user in body["users"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids
+
+def test_user_pages_cover_null_sort_values(api_client):
+    client, db = api_client
+    _seed_users(db)
+    for sort in ("id", "-id", "created_at", "-created_at", "name", "-name", "email", "-email"):
+        assert _walk(client, sort) == _expected_ids(db, sort), sort
+    # Page boundaries that land inside a run of NULLs
+    assert _walk(client, "created_at", limit=1) == _expected_ids(db, "created_at")
+    assert _walk(client, "-created_at", limit=2) == _expected_ids(db, "-created_at")
+
+def test_user_cursor_rejects_other_sort_and_garbage(api_client):
+    client, db = api_client
+    _seed_users(db)
+    cursor = client.get("/api/users", params={"limit": 2, "sort": "name"}).json()["next_cursor"]
+    assert client.get("/api/users", params={"limit": 2, "sort": "email", "cursor": cursor}).status_code == 400
+    assert client.get("/api/users", params={"limit": 2, "cursor": "not-a-cursor"}).status_code == 400
+
+if __name__ == "__main__":
+    print("User listing tests need pytest fixtures: python -m pytest test_user_listing.py")
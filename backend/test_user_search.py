@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from user_search import UserSearchIndex, USER_SEARCH_RANK_LIMIT
+
+def test_ranking_prefers_prefix_matches():
+    index = UserSearchIndex()
+    index.add(1, "Marianne Smith", "marianne@example.com", "Anna University")
+    index.add(2, "Anna Kumar", "anna.k@example.com", "PSG College")
+    index.add(3, "Joanna Lee", "jlee@example.com", "MIT")
+    
+    assert index.search_ids("anna") == [2, 1, 3]
+    assert index.search_ids("ANNA KUM") == [2]
+    assert index.search_ids("xyz") == []
+
+def test_short_queries_match_word_prefixes():
+    index = UserSearchIndex()
+    index.add(1, "Ravi Shankar", "ravi@example.com", "")
+    index.add(2, "Karthik", "karthik@example.com", "")
+    
+    assert index.search_ids("sh") == [1]
+    assert index.search_ids("k") == [2]
+
+def test_edits_and_deletes():
+    index = UserSearchIndex()
+    index.add(1, "Priya", "priya@example.com", "")
+    index.add(1, "Divya", "divya@example.com", "")
+    assert index.search_ids("priya") == []
+    assert index.search_ids("divya") == [1]
+    
+    index.remove(1)
+    assert index.search_ids("divya") == []
+    assert len(index) == 0
+
+def test_match_ids_returns_every_match():
+    index = UserSearchIndex()
+    count = USER_SEARCH_RANK_LIMIT + 100
+    for i in range(count):
+        index.add(i + 1, f"Student {i}", f"student{i}@example.com", "PSG College")
+    index.add(count + 1, "Teacher", "teacher@example.com", "PSG College")
+    
+    # Typeahead only ranks the most recent matches; listings need all of them
+    assert len(index.search_ids("student", limit=count)) == USER_SEARCH_RANK_LIMIT
+    assert index.match_ids("student", limit=count) == list(range(1, count + 1))
+    assert index.match_ids("student", limit=count - 1) is None
+    assert index.match_ids("teach", limit=10) == [count + 1]
+    assert index.match_ids("st", limit=count) == list(range(1, count + 1))
+
+def _search_all(client, search):
+    ids, cursor = [], None
+    while True:
+        body = client.get("/api/users", params={"search": search, "limit": 250, **({"cursor": cursor} if cursor else {})}).json()
+        ids += [user["id"] for user in body["users"]]
+        if cursor is None:
+            total_count = body["total_count"]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids, total_count
+
+def test_listing_search_is_not_capped(api_client, monkeypatch):
+    import user_listing
+    from database import User
+    from user_search import user_search_index
+    client, db = api_client
+    count = USER_SEARCH_RANK_LIMIT + 100
+    db.add_all([User(email=f"student{i}@example.com", name=f"Student {i}", eventId=1) for i in range(count)])
+    db.add(User(email="teacher@example.com", name="Teacher", eventId=1))
+    db.commit()
+    user_search_index.rebuild(db)
+    
+    ids, total_count = _search_all(client, "student")
+    assert total_count == count and sorted(map(int, ids)) == list(range(1, count + 1))
+    export = client.get("/api/users/export", params={"search": "student", "fields": "id"})
+    assert len(export.text.splitlines()) == count
+    
+    # Short queries match anywhere in the text, not just at word starts
+    db.add(User(email="mentor@gmail.com", name="Mentor", eventId=1))
+    db.commit()
+    ids, total_count = _search_all(client, "@g")
+    assert total_count == 1 and ids == [str(count + 2)]
+    export = client.get("/api/users/export", params={"search": "@g", "fields": "id"})
+    assert len(export.text.splitlines()) == 1
+    
+    # More matches than fit in an IN list fall back to LIKE with the same result
+    monkeypatch.setattr(user_listing, "USER_SEARCH_MAX_RESULTS", 100)
+    ids, total_count = _search_all(client, "student")
+    assert total_count == count and len(set(ids)) == count
+
+if __name__ == "__main__":
+    test_ranking_prefers_prefix_matches()
+    test_short_queries_match_word_prefixes()
+    test_edits_and_deletes()
+    test_match_ids_returns_every_match()
+    print("User search tests passed")
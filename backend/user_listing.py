@@ -0,0 +1,160 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, text
+from sqlalchemy.orm import Session
+
+from database import User, Event
+from colleges import college_filter
+from user_search import user_search_index, USER_SEARCH_MAX_RESULTS
+
+# Sort keys accepted by the listing endpoints; prefix with "-" for descending
+USER_SORT_COLUMNS = {
+    "id": User.id,
+    "created_at": User.created_at,
+    # NULL names/emails sort as empty strings so keyset comparisons stay well defined
+    "name": func.coalesce(User.name, ""),
+    "email": func.coalesce(User.email, ""),
+}
+USER_SORT_PATTERN = "^-?(id|created_at|name|email)$"
+
+def user_display_name(user) -> str:
+    return user.name or f"{user.first_name or ''} {user.last_name or ''}".strip()
+
+def student_row(row) -> dict:
+    """Row shape of /api/students and /api/students-protected"""
+    return {
+        "id": str(row.User.id),
+        "name": user_display_name(row.User),
+        "email": row.User.email,
+        "phone": row.User.phone_number,
+        "event_id": row.User.eventId,
+        "event_name": row.event_name or "Unknown Event",
+        "college": row.User.college_name or "",
+        "registered_at": row.User.created_at
+    }
+
+def user_list_row(row) -> dict:
+    """Row shape of /api/users"""
+    return {
+        "id": str(row.User.id),
+        "name": user_display_name(row.User),
+        "email": row.User.email,
+        "college": row.User.college_name or "",
+        "phone": row.User.phone_number or "",
+        "event_id": row.User.eventId,
+        "event": row.event_name or "Unknown Event",
+        "registered_at": row.User.created_at,
+        "created_date": row.User.created_at
+    }
+
+STUDENT_FIELDS = ["id", "name", "email", "phone", "event_id", "event_name", "college", "registered_at"]
+USER_LIST_FIELDS = ["id", "name", "email", "college", "phone", "event_id", "event", "registered_at", "created_date"]
+
+def users_with_events(db: Session):
+    return db.query(User, Event.name.label("event_name")).outerjoin(Event, User.eventId == Event.id)
+
+def filter_users(db: Session, query, college: Optional[str] = None, event: Optional[str] = None, search: Optional[str] = None):
+    if college:
+        query = query.filter(college_filter(db, college))
+    if event:
+        event_obj = db.query(Event.id).filter(Event.name == event).first()
+        if event_obj:
+            query = query.filter(User.eventId == event_obj.id)
+    if search:
+        # The index only matches word prefixes for one- and two-character queries; listings want substrings
+        user_ids = user_search_index.matches(db, search, limit=USER_SEARCH_MAX_RESULTS) if len(search.strip()) >= 3 else None
+        if user_ids is not None:
+            query = query.filter(User.id.in_(user_ids))
+        else:
+            # Short query, index still warming up, or too many matches for an IN list
+            query = query.filter(
+                User.name.contains(search) |
+                User.email.contains(search) |
+                User.college_name.contains(search)
+            )
+    return query
+
+def sort_users(query, sort: str):
+    column = USER_SORT_COLUMNS[sort.lstrip("-")]
+    if sort.startswith("-"):
+        return query.order_by(column.desc(), User.id.desc())
+    return query.order_by(column.asc(), User.id.asc())
+
+def projection(serialize: Callable, fields: Optional[str], allowed: List[str]) -> Callable:
+    """Wrap a row serializer so it only returns the requested comma-separated fields"""
+    if not fields:
+        return serialize
+    wanted = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in wanted if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return lambda row: {field: value for field, value in serialize(row).items() if field in wanted}
+
+def _sort_value(user, sort_key: str):
+    if sort_key == "id":
+        return user.id
+    if sort_key == "created_at":
+        return user.created_at.isoformat() if user.created_at else None
+    return getattr(user, sort_key) or ""
+
+def encode_user_cursor(user, sort: str) -> str:
+    raw = json.dumps([sort, _sort_value(user, sort.lstrip("-")), user.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def apply_user_cursor(query, cursor: str, sort: str):
+    try:
+        cursor_sort, value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        if cursor_sort != sort:
+            raise ValueError("cursor was issued for another sort order")
+        if sort.lstrip("-") == "created_at" and value is not None:
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    column = USER_SORT_COLUMNS[sort.lstrip("-")]
+    # Only created_at can be NULL here. MySQL and SQLite sort NULLs before every value, so they
+    # open an ascending listing and close a descending one.
+    if value is None:
+        if sort.startswith("-"):
+            return query.filter(column.is_(None), User.id < user_id)
+        return query.filter(or_(column.isnot(None), User.id > user_id))
+    if sort.startswith("-"):
+        return query.filter(or_(column < value, column.is_(None), and_(column == value, User.id < user_id)))
+    return query.filter(or_(column > value, and_(column == value, User.id > user_id)))
+
+def estimated_user_count(db: Session) -> Optional[int]:
+    """Row estimate from MySQL table statistics; None on other databases"""
+    if db.bind.dialect.name != "mysql":
+        return None
+    row = db.execute(text(
+        "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users'"
+    )).first()
+    return int(row[0]) if row and row[0] is not None else None
+
+def count_users(db: Session, filtered_query, filtered: bool):
+    """Return (count, is_estimate); unfiltered listings use table statistics instead of COUNT(*)"""
+    if not filtered:
+        estimate = estimated_user_count(db)
+        if estimate is not None:
+            return estimate, True
+    # The outer join to events never adds rows, so count users alone
+    count = filtered_query.with_entities(func.count(User.id)).order_by(None).scalar()
+    return count, False
+
+def paginate_users(db: Session, query, serialize: Callable, limit: int, cursor: Optional[str], sort: str, filtered: bool):
+    """One keyset page of a user listing: (items, next_cursor, count, count_is_estimate).
+
+    The count is only computed for the first page; later pages return None.
+    """
+    count, estimated = (None, False) if cursor else count_users(db, query, filtered)
+    if cursor:
+        query = apply_user_cursor(query, cursor, sort)
+    rows = sort_users(query, sort).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_user_cursor(rows[-1].User, sort) if has_more else None
+    return [serialize(row) for row in rows], next_cursor, count, estimated
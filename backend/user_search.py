@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, User
+from app_logging import get_logger
+
+logger = get_logger("user_search")
+
+# New and edited users (possibly written by other workers) are picked up this often
+USER_SEARCH_REFRESH_SECONDS = float(os.getenv("USER_SEARCH_REFRESH_SECONDS", "5"))
+# Full rebuilds drop users deleted by other workers and compact stale postings
+USER_SEARCH_REBUILD_SECONDS = float(os.getenv("USER_SEARCH_REBUILD_SECONDS", "900"))
+USER_SEARCH_MAX_RESULTS = int(os.getenv("USER_SEARCH_MAX_RESULTS", "1000"))
+# Bounds per query: candidates substring-checked and matches ranked, newest users first
+USER_SEARCH_SCAN_LIMIT = 50000
+USER_SEARCH_RANK_LIMIT = 500
+USER_SEARCH_SCAN_CHUNK = 2000
+
+# Marks the start of a word so one- and two-character queries can match word prefixes
+WORD_START = "\x02"
+
+# Separates the fields in the combined text used for fast substring checks
+FIELD_SEPARATOR = "\x1f"
+
+# Match quality, best first; name beats email beats college within each tier
+EXACT, FIELD_PREFIX, WORD_PREFIX, SUBSTRING = 0, 1, 2, 3
+
+def _grams(text: str) -> set:
+    grams = set()
+    if not text:
+        return grams
+    padded = WORD_START + text
+    grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    for word in text.split():
+        grams.add(WORD_START + word[:1])
+        grams.add(WORD_START + word[:2])
+    return grams
+
+def _query_grams(query: str) -> List[str]:
+    if len(query) < 3:
+        # Short queries only match word prefixes
+        return [WORD_START + query]
+    return list({query[i:i + 3] for i in range(len(query) - 2)})
+
+def _match_rank(query: str, fields: Tuple[str, str, str]) -> Optional[Tuple[int, int, int]]:
+    best = None
+    word_start = " " + query
+    for position, field in enumerate(fields):
+        if not field or query not in field:
+            continue
+        if field == query:
+            tier = EXACT
+        elif field.startswith(query):
+            tier = FIELD_PREFIX
+        elif word_start in field:
+            tier = WORD_PREFIX
+        elif len(query) < 3:
+            continue
+        else:
+            tier = SUBSTRING
+        rank = (tier, position, len(field))
+        if best is None or rank < best:
+            best = rank
+    return best
+
+class UserSearchIndex:
+    """In-process trigram index over user name, email and college.
+
+    Postings are append-only arrays of user ids; edits and deletes leave stale
+    entries behind that are filtered out when candidates are verified against
+    the current text, and dropped on the next rebuild.
+    """
+
+    def __init__(self):
+        self._docs: Dict[int, Tuple[str, str, str]] = {}
+        self._texts: Dict[int, str] = {}
+        self._postings: Dict[str, array] = {}
+        self._posting_count = 0
+        self._lock = threading.Lock()
+        self._max_id = 0
+        self._synced_at: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._last_rebuild = 0.0
+        self._stale = 0
+        self._sync_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, user_id: int, name: Optional[str], email: Optional[str], college: Optional[str]) -> None:
+        fields = ((name or "").lower(), (email or "").lower(), (college or "").lower())
+        with self._lock:
+            previous = self._docs.get(user_id)
+            if previous == fields:
+                return
+            old_grams = set().union(*(_grams(field) for field in previous)) if previous else set()
+            new_grams = set().union(*(_grams(field) for field in fields))
+            self._docs[user_id] = fields
+            self._texts[user_id] = FIELD_SEPARATOR + FIELD_SEPARATOR.join(fields)
+            for gram in new_grams - old_grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array("I")
+                postings.append(user_id)
+            self._posting_count += len(new_grams - old_grams)
+            self._stale += len(old_grams - new_grams)
+            self._max_id = max(self._max_id, user_id)
+
+    def add_user(self, user) -> None:
+        self.add(user.id, user_display_text(user), user.email, user.college_name)
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            fields = self._docs.pop(user_id, None)
+            self._texts.pop(user_id, None)
+            if fields is not None:
+                self._stale += len(set().union(*(_grams(field) for field in fields)))
+
+    def _candidates(self, query: str):
+        """The rarest gram's postings, which a substring check then filters"""
+        return min((self._postings.get(gram, ()) for gram in _query_grams(query)), key=len)
+
+    def _verify(self, query: str, user_ids) -> List[int]:
+        texts = self._texts
+        if len(query) < 3:
+            field_start, word_start = FIELD_SEPARATOR + query, " " + query
+            return [user_id for user_id in user_ids if field_start in texts.get(user_id, "") or word_start in texts.get(user_id, "")]
+        return [user_id for user_id in user_ids if query in texts.get(user_id, "")]
+
+    def search_ids(self, query: str, limit: int = 20) -> List[int]:
+        """Ids of users matching query, best matches first"""
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+
+        postings = self._candidates(query)
+        matches = {}
+        # Scan newest users first and stop once there are enough matches to rank;
+        # very common queries therefore rank the most recent registrations
+        end = len(postings)
+        while end > 0 and end > len(postings) - USER_SEARCH_SCAN_LIMIT and len(matches) < USER_SEARCH_RANK_LIMIT:
+            chunk = postings[max(end - USER_SEARCH_SCAN_CHUNK, 0):end]
+            end -= USER_SEARCH_SCAN_CHUNK
+            # Postings may repeat an id after edits
+            matches.update(dict.fromkeys(reversed(self._verify(query, chunk))))
+
+        ranked = []
+        docs = self._docs
+        for user_id in list(matches)[:USER_SEARCH_RANK_LIMIT]:
+            fields = docs.get(user_id)
+            if fields is None:
+                continue
+            rank = _match_rank(query, fields)
+            if rank is not None:
+                ranked.append((rank, user_id))
+        ranked.sort()
+        return [user_id for _, user_id in ranked[:limit]]
+
+    def match_ids(self, query: str, limit: int) -> Optional[List[int]]:
+        """Ids of every user matching query, unranked; None when there are more than limit"""
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        matches = set()
+        postings = self._candidates(query)
+        for start in range(0, len(postings), USER_SEARCH_SCAN_CHUNK):
+            matches.update(self._verify(query, postings[start:start + USER_SEARCH_SCAN_CHUNK]))
+            if len(matches) > limit:
+                return None
+        return sorted(matches)
+
+    def rebuild(self, db: Session) -> None:
+        fresh = UserSearchIndex()
+        started = datetime.now()
+        for user in db.query(User.id, User.name, User.first_name, User.last_name, User.email, User.college_name).yield_per(5000):
+            fresh.add_user(user)
+        with self._lock:
+            self._docs, self._texts, self._postings = fresh._docs, fresh._texts, fresh._postings
+            self._max_id = fresh._max_id
+            self._posting_count = fresh._posting_count
+            self._stale = 0
+            self._synced_at = started
+            self._last_rebuild = self._last_refresh = time.monotonic()
+
+    def refresh(self, db: Session) -> None:
+        """Index users registered or edited since the last sync"""
+        started = datetime.now()
+        columns = (User.id, User.name, User.first_name, User.last_name, User.email, User.college_name)
+        for user in db.query(*columns).filter(User.id > self._max_id).yield_per(5000):
+            self.add_user(user)
+        if self._synced_at is not None:
+            for user in db.query(*columns).filter(User.updated_at >= self._synced_at).yield_per(5000):
+                self.add_user(user)
+        self._synced_at = started
+        self._last_refresh = time.monotonic()
+
+    def start_rebuild(self) -> None:
+        """Rebuild from the database in a background thread unless a sync is already running"""
+        if self._sync_lock.acquire(blocking=False):
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    def _rebuild_in_background(self) -> None:
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+        except Exception:
+            logger.exception("Error rebuilding user search index")
+        finally:
+            db.close()
+            self._sync_lock.release()
+
+    def sync(self, db: Session) -> bool:
+        """Catch up with the database; False while the index is first being built"""
+        if not self._last_rebuild:
+            self.start_rebuild()
+            return False
+
+        now = time.monotonic()
+        # Rebuild once about a quarter of the postings are stale
+        too_stale = self._stale > max(self._posting_count // 4, 10000)
+        if too_stale or now - self._last_rebuild > USER_SEARCH_REBUILD_SECONDS:
+            self.start_rebuild()
+        elif now - self._last_refresh > USER_SEARCH_REFRESH_SECONDS and self._sync_lock.acquire(blocking=False):
+            # Only one request catches up at a time; the others search the current index
+            try:
+                self.refresh(db)
+            finally:
+                self._sync_lock.release()
+        return True
+
+    def search(self, db: Session, query: str, limit: int = 20) -> Optional[List[int]]:
+        """Best matching ids for typeahead, or None while the index is first being built.
+
+        Very common queries only rank the most recent matches; use matches() to filter listings.
+        """
+        return self.search_ids(query, limit) if self.sync(db) else None
+
+    def matches(self, db: Session, query: str, limit: int = USER_SEARCH_MAX_RESULTS) -> Optional[List[int]]:
+        """Every matching id, or None while the index is first being built or when more than limit users match"""
+        return self.match_ids(query, limit) if self.sync(db) else None
+
+def user_display_text(user) -> str:
+    return user.name or f"{user.first_name or ''} {user.last_name or ''}".strip()
+
+user_search_index = UserSearchIndex()